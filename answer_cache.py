@@ -0,0 +1,125 @@
+import os
+import json
+import math
+import time
+import hashlib
+import sqlite3
+import threading
+from array import array
+from typing import List, Optional
+
+ANSWER_CACHE_PATH = os.getenv("RAG_ANSWER_CACHE", "vector_store/answer_cache.sqlite3")
+# Minimum cosine similarity between question embeddings for a cached answer to be reused
+ANSWER_CACHE_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_SIZE = int(os.getenv("RAG_ANSWER_CACHE_SIZE", "1000"))
+
+
+def doc_id(doc) -> str:
+    """Stable ID for a retrieved chunk: the vector store ID, else a content hash"""
+    if getattr(doc, "id", None):
+        return str(doc.id)
+    digest = hashlib.sha256(doc.page_content.encode("utf-8"))
+    digest.update(json.dumps(doc.metadata, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def context_key(chunk_ids: List[str], prompt_version: str, extra: str = "", model: str = "") -> str:
+    """
+    Everything besides the question that determines an answer: the set of
+    retrieved chunks, the prompt template version, any extra prompt input
+    such as conversation history, and the model that writes the answer.
+    """
+    digest = hashlib.sha256(prompt_version.encode("utf-8"))
+    for chunk_id in sorted(set(chunk_ids)):
+        digest.update(b"\0" + chunk_id.encode("utf-8"))
+    digest.update(b"\0\0" + extra.encode("utf-8"))
+    digest.update(b"\0\0\0" + model.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class SemanticAnswerCache:
+    """
+    Persistent cache of LLM answers.
+
+    An answer is reused when a new question was answered against the same
+    context key and its embedding is within `threshold` cosine similarity of
+    the cached question. Entries live in SQLite, so several processes can
+    share the cache, and are evicted least-recently-used beyond `maxsize`.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = ANSWER_CACHE_PATH,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        maxsize: int = ANSWER_CACHE_SIZE
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path) if path else ""
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "id INTEGER PRIMARY KEY, key TEXT NOT NULL, question TEXT NOT NULL, "
+            "vector BLOB NOT NULL, answer TEXT NOT NULL, used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_key ON answers (key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_used ON answers (used)")
+        self._conn.commit()
+
+    def lookup(self, vector: List[float], key: str) -> Optional[str]:
+        """Return the best cached answer for this context above the threshold"""
+        with self._lock:
+            best, best_score = None, self.threshold
+            rows = self._conn.execute("SELECT id, vector, answer FROM answers WHERE key = ?", (key,))
+            for row_id, blob, answer in rows:
+                cached = array("f")
+                cached.frombytes(blob)
+                score = cosine(vector, cached)
+                if score >= best_score:
+                    best, best_score = (row_id, answer), score
+            if best is None:
+                return None
+            self._conn.execute("UPDATE answers SET used = ? WHERE id = ?", (time.time(), best[0]))
+            self._conn.commit()
+            return best[1]
+
+    def store(self, question: str, vector: List[float], key: str, answer: str):
+        # An empty reply is a failed generation, not an answer worth repeating
+        if not answer or not answer.strip():
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO answers (key, question, vector, answer, used) VALUES (?, ?, ?, ?, ?)",
+                (key, question, array("f", vector).tobytes(), answer, time.time())
+            )
+            # Least recently used entries beyond maxsize, whichever process wrote them
+            self._conn.execute(
+                "DELETE FROM answers WHERE id IN "
+                "(SELECT id FROM answers ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,)
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,20 +1,19 @@
 import streamlit as st
 import os
 import shutil
+import time
 from pathlib import Path
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 from dotenv import load_dotenv
 import google.genai as genai
-from loaders.text_loader import load_text_file
-from loaders.pdf_loader import load_pdf_file
-from loaders.docx_loader import load_docx_file
-from loaders.pptx_loader import load_pptx_file
-from loaders.json_loader import load_json_file
-from loaders.xml_loader import load_xml_file
-from loaders.csv_loader import load_csv_file
-from loaders.database_loader import load_database_file
+from embedding import create_embeddings, EMBEDDING_MODEL
+from retrieval_cache import RetrievalCache, bump_generation
+from answer_cache import SemanticAnswerCache, context_key, doc_id
+from bm25_index import RETRIEVAL_MODE, load_index, lexical_search, hybrid_search
+from sharded_store import open_store, store_count
+from filters import parse_query, format_where
+from context_builder import build_context, estimate_tokens
+from numpy_store import VECTOR_BACKEND, NumpyVectorStore, index_stamp
+from ingest import ingest, SUPPORTED_EXTENSIONS
 import warnings
 
 warnings.filterwarnings("ignore")
@@ -25,7 +24,10 @@ DATA_DIR = "data"
 VECTOR_DB_DIR = "vector_store/chroma"
 api_key = os.getenv("GOOGLE_API_KEY")
 MODEL_NAME = "gemini-2.0-flash"
-EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Bump whenever the prompt in query_documents() changes so cached answers are not reused
+PROMPT_VERSION = "app-v2"
+# Lexical retrieval never loads the embedding model
+LEXICAL_ONLY = RETRIEVAL_MODE == "lexical"
 
 # Initialize Streamlit config
 st.set_page_config(
@@ -42,6 +44,10 @@ if "documents_loaded" not in st.session_state:
     st.session_state.documents_loaded = False
 if "query_result" not in st.session_state:
     st.session_state.query_result = None
+if "time_to_first_token" not in st.session_state:
+    st.session_state.time_to_first_token = None
+if "context_stats" not in st.session_state:
+    st.session_state.context_stats = None
 if "embeddings" not in st.session_state:
     st.session_state.embeddings = None
 if "conversation_history" not in st.session_state:
@@ -50,100 +56,63 @@ if "conversation_history" not in st.session_state:
 
 @st.cache_resource
 def get_embeddings():
-    """Get embedding model with caching"""
+    """Get embedding model with caching (chunk vectors are also cached on disk)"""
     try:
-        embeddings = HuggingFaceEmbeddings(
-            model_name=EMBEDDING_MODEL,
-            model_kwargs={"trust_remote_code": True},
-            encode_kwargs={"normalize_embeddings": False}
-        )
-        return embeddings
+        return create_embeddings(EMBEDDING_MODEL)
     except Exception as e:
         st.error(f"Error loading embeddings: {e}")
         return None
 
 
+@st.cache_resource
+def get_retrieval_cache():
+    """Query-vector and search-result cache shared across Streamlit sessions"""
+    return RetrievalCache(VECTOR_DB_DIR)
+
+
+@st.cache_resource
+def get_answer_cache():
+    """Persistent semantic cache of LLM answers"""
+    return SemanticAnswerCache()
+
+
 def get_chroma_db():
-    """Get or create Chroma database"""
+    """Get or create Chroma database (a ShardedStore if ingest.py sharded it)"""
     try:
-        return Chroma(
-            persist_directory=VECTOR_DB_DIR,
-            embedding_function=get_embeddings()
-        )
+        return open_store(VECTOR_DB_DIR, None if LEXICAL_ONLY else get_embeddings())
     except Exception as e:
         st.error(f"Error connecting to vector store: {e}")
         return None
 
 
-def load_all_documents():
-    """Load all documents from data directory supporting multiple formats"""
-    try:
-        docs = []
-        if not os.path.exists(DATA_DIR):
-            st.warning(f"Data directory '{DATA_DIR}' not found")
-            return []
-        
-        file_count = 0
-        for file in os.listdir(DATA_DIR):
-            path = os.path.join(DATA_DIR, file)
-            
-            # Skip directories
-            if os.path.isdir(path):
-                continue
-            
-            try:
-                if file.endswith(".txt") or file.endswith(".md"):
-                    doc = load_text_file(path)
-                    docs.append(doc)
-                    file_count += 1
-                
-                elif file.endswith(".pdf"):
-                    file_docs = load_pdf_file(path)
-                    docs.extend(file_docs)
-                    file_count += 1
-                
-                elif file.endswith(".docx"):
-                    file_docs = load_docx_file(path)
-                    docs.extend(file_docs)
-                    file_count += 1
-                
-                elif file.endswith(".pptx"):
-                    file_docs = load_pptx_file(path)
-                    docs.extend(file_docs)
-                    file_count += 1
-                
-                elif file.endswith(".json"):
-                    file_docs = load_json_file(path)
-                    docs.extend(file_docs)
-                    file_count += 1
-                
-                elif file.endswith(".xml"):
-                    file_docs = load_xml_file(path)
-                    docs.extend(file_docs)
-                    file_count += 1
-                
-                elif file.endswith(".csv"):
-                    file_docs = load_csv_file(path)
-                    docs.extend(file_docs)
-                    file_count += 1
-                
-                elif file.endswith(".db") or file.endswith(".sqlite") or file.endswith(".sqlite3"):
-                    file_docs = load_database_file(path)
-                    docs.extend(file_docs)
-                    file_count += 1
-            
-            except Exception as e:
-                st.error(f"Error loading {file}: {e}")
-                continue
-        
-        if file_count == 0:
-            st.warning("No documents found in data directory")
-        
-        return docs
-    except Exception as e:
-        st.error(f"Error loading documents: {e}")
+@st.cache_resource(max_entries=1)
+def get_numpy_store(stamp):
+    """Memory-mapped vector index, reopened (and the old one dropped) whenever its export stamp changes"""
+    return NumpyVectorStore.open(VECTOR_DB_DIR, None if LEXICAL_ONLY else get_embeddings())
+
+
+def get_search_db():
+    """Store used for similarity search: the numpy index if enabled and exported, else Chroma"""
+    if VECTOR_BACKEND == "numpy":
+        stamp = index_stamp(VECTOR_DB_DIR)
+        if stamp is not None:
+            return get_numpy_store(stamp)
+    return get_chroma_db()
+
+
+def get_data_paths():
+    """List supported files in the data directory, in sorted order"""
+    if not os.path.exists(DATA_DIR):
+        st.warning(f"Data directory '{DATA_DIR}' not found")
         return []
 
+    return [
+        os.path.join(DATA_DIR, file)
+        for file in sorted(os.listdir(DATA_DIR))
+        if file.endswith(SUPPORTED_EXTENSIONS)
+        and not os.path.isdir(os.path.join(DATA_DIR, file))
+    ]
+
 
 def save_uploaded_file(uploaded_file):
     """Save uploaded file to data directory"""
@@ -161,32 +130,35 @@ def save_uploaded_file(uploaded_file):
 
 
 def ingest_documents():
-    """Ingest documents into vector store"""
+    """
+    Ingest new and changed files from data/ with ingest.ingest: unchanged
+    files are skipped via the manifest and chunks keep stable IDs, so
+    running it again never duplicates the corpus.
+    """
     try:
-        st.info("Loading documents...")
-        raw_docs = load_all_documents()
-        
-        if not raw_docs:
+        if not get_data_paths():
             st.warning("No documents to ingest")
             return False
         
-        texts = [d["content"] for d in raw_docs]
-        metadatas = [d["metadata"] for d in raw_docs]
-        
-        st.info(f"Splitting {len(texts)} documents into chunks...")
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500,
-            chunk_overlap=100
+        # ingest() streams each file through chunking and embedding in
+        # bounded batches, so memory does not grow with the corpus
+        st.info("Generating embeddings and storing in vector database...")
+        bar = st.progress(0.0)
+        summary = ingest(
+            embeddings=get_embeddings(),
+            progress=lambda done, total, file: bar.progress(done / total, text=f"Processed {done}/{total} files")
         )
-        chunks = splitter.create_documents(texts, metadatas)
-        st.success(f"Created {len(chunks)} chunks")
+        for file, error in summary["errors"]:
+            st.error(f"Error loading {file}: {error}")
         
-        st.info("Generating embeddings and storing in vector database...")
-        embeddings = get_embeddings()
-        Chroma.from_documents(
-            documents=chunks,
-            embedding=embeddings,
-            persist_directory=VECTOR_DB_DIR
+        if not summary["files"] and not summary["removed"]:
+            if not summary["errors"]:
+                st.info("Vector store is up to date. Nothing to ingest.")
+                st.session_state.documents_loaded = True
+            return not summary["errors"]
+        st.success(
+            f"Created {summary['chunks']} chunks from {summary['files']} files"
+            + (f", removed {summary['removed']} deleted files" if summary["removed"] else "")
         )
         
         st.success("Ingestion complete! Vector database ready.")
@@ -197,21 +169,35 @@ def ingest_documents():
         return False
 
 
-def query_documents(question: str):
-    """Query documents with LLM"""
+def query_documents(question: str, placeholder=None):
+    """
+    Query documents with LLM.
+
+    When a Streamlit placeholder is given the answer is streamed into it as
+    it is generated, and the time to first token is kept in session state.
+    Filter terms such as `source:notes.pdf type:pptx` restrict the search.
+    """
+    started = time.perf_counter()
+    st.session_state.context_stats = None
+    question, where = parse_query(question)
+    if not question:
+        return "Please add a question after the filters."
     try:
-        db = get_chroma_db()
+        db = get_search_db()
         if db is None:
             return "Error: Vector store not available. Please ingest documents first."
         
-        embeddings = get_embeddings()
-        db = Chroma(
-            persist_directory=VECTOR_DB_DIR,
-            embedding_function=embeddings
-        )
-        
-        docs = db.similarity_search(question, k=4)
-        context = "\n\n".join([d.page_content for d in docs])
+        cache = get_retrieval_cache()
+        embed = lambda: cache.query_vector(question, get_embeddings().embed_query)
+        index = None if RETRIEVAL_MODE == "dense" else load_index(VECTOR_DB_DIR)
+        if index is None or not len(index):
+            search = lambda: db.similarity_search_by_vector(embed(), k=4, filter=where)
+        elif LEXICAL_ONLY:
+            search = lambda: lexical_search(db, index, question, 4, where)
+        else:
+            search = lambda: hybrid_search(db, index, question, embed(), 4, where=where)
+        docs = cache.search(question, 4, search, format_where(where))
+        context, stats = build_context(docs)
         
         if not context.strip():
             return "No relevant documents found for this query."
@@ -227,21 +213,52 @@ Context:
 Question:
 {question}
 """
+        stats.prompt_tokens = estimate_tokens(prompt)
+        stats.raw_prompt_tokens = stats.prompt_tokens + stats.raw_tokens - stats.tokens
+        st.session_state.context_stats = stats
+        
+        # The answer cache matches questions by embedding, so lexical mode skips it
+        answers = get_answer_cache()
+        answer_key = context_key([doc_id(d) for d in docs], PROMPT_VERSION, model=MODEL_NAME)
+        question_vector = None if LEXICAL_ONLY else embed()
+        cached_answer = None
+        if question_vector is not None:
+            cached_answer = answers.lookup(question_vector, answer_key)
+        if cached_answer is not None:
+            st.session_state.time_to_first_token = time.perf_counter() - started
+            return cached_answer
         
         try:
-            genai.configure(api_key=api_key)
             client = genai.Client(api_key=api_key)
-            response = client.models.generate_content(
-                model=MODEL_NAME,
-                contents=prompt
-            )
-            
-            if hasattr(response, "text") and response.text:
-                return response.text
-            try:
-                return response.candidates[0].content.parts[0].text
-            except (AttributeError, IndexError, TypeError):
-                return str(response)
+            if placeholder is not None:
+                answer = ""
+                for chunk in client.models.generate_content_stream(
+                    model=MODEL_NAME,
+                    contents=prompt
+                ):
+                    if not chunk.text:
+                        continue
+                    if not answer:
+                        st.session_state.time_to_first_token = time.perf_counter() - started
+                    answer += chunk.text
+                    placeholder.markdown(answer + "▌")
+            else:
+                response = client.models.generate_content(
+                    model=MODEL_NAME,
+                    contents=prompt
+                )
+                
+                if hasattr(response, "text") and response.text:
+                    answer = response.text
+                else:
+                    try:
+                        answer = response.candidates[0].content.parts[0].text
+                    except (AttributeError, IndexError, TypeError):
+                        answer = str(response)
+                st.session_state.time_to_first_token = time.perf_counter() - started
+            if question_vector is not None:
+                answers.store(question, question_vector, answer_key, answer)
+            return answer
         except Exception as e:
             # Fallback to extractive search
             err_summary = f"{e.__class__.__name__}"
@@ -282,9 +299,7 @@ def get_document_list():
         if db is None:
             return 0
         
-        collection = db._collection
-        count = collection.count()
-        return count
+        return store_count(db)
     except Exception as e:
         st.error(f"Error getting document count: {e}")
         return 0
@@ -295,6 +310,7 @@ def delete_vector_store():
     try:
         if os.path.exists(VECTOR_DB_DIR):
             shutil.rmtree(VECTOR_DB_DIR)
+            bump_generation(VECTOR_DB_DIR)
             st.success("Vector store deleted successfully")
             st.session_state.documents_loaded = False
             return True
@@ -347,6 +363,7 @@ with tab1:
     question = st.text_area(
         "Enter your question:",
         placeholder="e.g., What is parthenogenesis?",
+        help="Add filters to search only some documents, e.g. source:notes.pdf type:pptx page:3",
         height=100
     )
     
@@ -354,14 +371,20 @@ with tab1:
     with col1:
         search_button = st.button("Search", use_container_width=True)
     
+    answer_area = st.empty()
     if search_button and question:
         with st.spinner("Searching..."):
-            result = query_documents(question)
+            result = query_documents(question, placeholder=answer_area)
             st.session_state.query_result = result
     
     if st.session_state.query_result:
-        st.markdown("### Answer:")
-        st.info(st.session_state.query_result)
+        with answer_area.container():
+            st.markdown("### Answer:")
+            st.info(st.session_state.query_result)
+            if st.session_state.time_to_first_token is not None:
+                st.caption(f"First token after {st.session_state.time_to_first_token:.2f}s")
+            if st.session_state.context_stats is not None:
+                st.caption(st.session_state.context_stats.summary())
 
 
 # ============ TAB 2: UPLOAD & INGEST ============
@@ -370,7 +393,7 @@ with tab2:
     
     uploaded_files = st.file_uploader(
         "Choose files to upload (PDF, Word, PPT, TXT, JSON, XML, CSV, SQLite)",
-        type=["txt", "md", "pdf", "docx", "pptx", "json", "xml", "csv", "db", "sqlite", "sqlite3"],
+        type=[ext.lstrip(".") for ext in SUPPORTED_EXTENSIONS],
         accept_multiple_files=True
     )
     
@@ -410,7 +433,7 @@ with tab2:
         files = os.listdir(DATA_DIR)
         if files:
             for f in files:
-                if f.endswith(('.txt', '.md', '.pdf', '.docx', '.pptx', '.json', '.xml', '.csv', '.db', '.sqlite', '.sqlite3')):
+                if f.endswith(SUPPORTED_EXTENSIONS):
                     size = os.path.getsize(os.path.join(DATA_DIR, f)) / 1024
                     col1, col2, col3 = st.columns([2, 1, 1])
                     with col1:
@@ -0,0 +1,92 @@
+"""
+Embedding backend benchmark: sentence-transformers (PyTorch) against the
+ONNX Runtime export in onnx_embedding.py, float32 and int8.
+
+Reports documents per second for each backend and the cosine similarity
+of the ONNX vectors to the PyTorch ones. Exits non-zero with --check if
+any ONNX variant falls below the parity tolerance:
+
+    python benchmarks/embedding_backends.py
+    python benchmarks/embedding_backends.py --texts 2000 --threads 4 --check
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from embedding import EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE, _load_model
+from onnx_embedding import OnnxEmbeddings, ONNX_PARITY_TOLERANCE, parity_check
+
+WORDS = (
+    "cell membrane nucleus mitosis meiosis gamete zygote embryo budding fission "
+    "regeneration species habitat population hormone enzyme protein tissue organ "
+    "reproduction fertilisation development offspring genetic variation evolution"
+).split()
+
+
+def sample_texts(count: int, seed: int = 0) -> list:
+    """Synthetic chunks from a few words up to roughly a full model window"""
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(5, 180))) for _ in range(count)]
+
+
+def throughput(embeddings, texts: list) -> float:
+    embeddings.embed_documents(texts[:8])  # warm up
+    started = time.perf_counter()
+    embeddings.embed_documents(texts)
+    elapsed = time.perf_counter() - started
+    return len(texts) / elapsed if elapsed else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--texts", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads (0 = library default)")
+    parser.add_argument("--tolerance", type=float, default=ONNX_PARITY_TOLERANCE)
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 if parity fails")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    texts = sample_texts(args.texts)
+    reference = _load_model(args.model, False, args.batch_size, "torch", args.threads)
+    backends = {
+        "torch": reference,
+        "onnx-fp32": OnnxEmbeddings(args.model, batch_size=args.batch_size, threads=args.threads, quantized=False),
+        "onnx-int8": OnnxEmbeddings(args.model, batch_size=args.batch_size, threads=args.threads, quantized=True),
+    }
+
+    print("=" * 60)
+    print("Embedding Backend Benchmark")
+    print("=" * 60)
+    results = {}
+    baseline = None
+    for name, embeddings in backends.items():
+        rate = throughput(embeddings, texts)
+        baseline = baseline or rate
+        result = {"docs_per_second": rate, "speedup": rate / baseline}
+        line = f"{name:<10} {rate:9.1f} docs/s  ({result['speedup']:.2f}x)"
+        if name != "torch":
+            parity = parity_check(embeddings, reference, texts[:200], args.tolerance)
+            result["parity"] = parity
+            mark = "✓" if parity["passed"] else "✗"
+            line += f"  {mark} cosine min {parity['min_cosine']:.4f} mean {parity['mean_cosine']:.4f}"
+        results[name] = result
+        print(line)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.check and not all(r["parity"]["passed"] for r in results.values() if "parity" in r):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
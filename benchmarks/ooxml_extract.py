@@ -0,0 +1,129 @@
+"""
+DOCX / PPTX extraction benchmark: python-docx and python-pptx object models
+against the streaming OOXML fast path in loaders/ooxml.py.
+
+Generates a large report and deck (or uses the files given), checks that
+both paths produce identical documents and reports the median time of
+each:
+
+    python benchmarks/ooxml_extract.py
+    python benchmarks/ooxml_extract.py --paragraphs 20000 --slides 500
+    python benchmarks/ooxml_extract.py data/report.docx data/deck.pptx
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from loaders.docx_loader import load_docx_file
+from loaders.pptx_loader import load_pptx_file
+
+
+def make_docx(path: str, paragraphs: int, tables: int, rows: int):
+    """A report with text paragraphs and tables containing merged cells"""
+    from docx import Document
+
+    doc = Document()
+    for i in range(paragraphs):
+        para = doc.add_paragraph(f"Paragraph {i}: the quick brown fox jumps over the lazy dog. ")
+        para.add_run("Second run\twith a tab.")
+    for t in range(tables):
+        table = doc.add_table(rows=rows, cols=4)
+        for r, row in enumerate(table.rows):
+            for c, cell in enumerate(row.cells):
+                cell.text = f"T{t} R{r} C{c}"
+        table.cell(0, 0).merge(table.cell(0, 1))
+        table.cell(1, 3).merge(table.cell(min(3, rows - 1), 3))
+    doc.save(path)
+
+
+def make_pptx(path: str, slides: int):
+    """A deck of title-and-content slides, every fifth with a table"""
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    prs = Presentation()
+    layout = prs.slide_layouts[1]
+    for i in range(slides):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {i}"
+        body = slide.placeholders[1].text_frame
+        body.text = "First point"
+        for j in range(4):
+            body.add_paragraph().text = f"Point {j} on slide {i}"
+        if i % 5 == 0:
+            shape = slide.shapes.add_table(3, 3, Inches(1), Inches(4), Inches(6), Inches(1.5))
+            for r, row in enumerate(shape.table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = f"{r},{c}"
+    prs.save(path)
+
+
+def median_seconds(fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def compare(path: str, loader, runs: int) -> dict:
+    object_model = loader(path, fast=False)
+    fast = loader(path, fast=True)
+    slow_seconds = median_seconds(lambda: loader(path, fast=False), runs)
+    fast_seconds = median_seconds(lambda: loader(path, fast=True), runs)
+    return {
+        "file": os.path.basename(path),
+        "documents": len(fast),
+        "identical": object_model == fast,
+        "object_model_seconds": slow_seconds,
+        "fast_seconds": fast_seconds,
+        "speedup": slow_seconds / fast_seconds if fast_seconds else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="DOCX/PPTX files to use instead of generated ones")
+    parser.add_argument("--paragraphs", type=int, default=5000)
+    parser.add_argument("--tables", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--slides", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = args.files
+        if not files:
+            files = [os.path.join(tmp, "report.docx"), os.path.join(tmp, "deck.pptx")]
+            make_docx(files[0], args.paragraphs, args.tables, args.rows)
+            make_pptx(files[1], args.slides)
+
+        results = []
+        print("=" * 60)
+        print("OOXML Extraction Benchmark")
+        print("=" * 60)
+        for path in files:
+            loader = load_pptx_file if path.lower().endswith(".pptx") else load_docx_file
+            result = compare(path, loader, args.runs)
+            results.append(result)
+            mark = "✓" if result["identical"] else "✗"
+            print(f"{mark} {result['file']}: {result['documents']} documents")
+            print(f"    object model {result['object_model_seconds'] * 1000:9.1f} ms")
+            print(f"    fast path    {result['fast_seconds'] * 1000:9.1f} ms  ({result['speedup']:.1f}x)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Cold-start benchmark for the entry-point modules.
+
+Imports each module in a fresh interpreter several times and reports the
+median wall time, plus the slowest imports from `python -X importtime`.
+Results can be saved as JSON and compared against an earlier run to track
+startup regressions:
+
+    python benchmarks/startup_time.py --json startup.json
+    python benchmarks/startup_time.py --compare startup.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["ingest", "query", "loaders.registry"]
+
+
+def time_import(module: str, runs: int) -> float:
+    """Median seconds to start an interpreter and import module"""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT, check=True)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def slowest_imports(module: str, top: int) -> list:
+    """(cumulative microseconds, package) for the slowest imports of module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:   self_us | cumulative_us | package"
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Compare against results saved with --json")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    print("=" * 60)
+    print("Startup Time Benchmark")
+    print("=" * 60)
+    for module in MODULES:
+        seconds = time_import(module, args.runs)
+        results[module] = seconds
+        line = f"{module:<20} {seconds * 1000:8.1f} ms"
+        if module in baseline:
+            line += f"  ({(seconds - baseline[module]) * 1000:+.1f} ms vs baseline)"
+        print(line)
+        for cumulative_us, name in slowest_imports(module, args.top):
+            print(f"    {cumulative_us / 1000:8.1f} ms  {name}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
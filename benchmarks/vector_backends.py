@@ -0,0 +1,187 @@
+"""
+Vector backend benchmark: Chroma against the memory-mapped numpy index in
+numpy_store.py, stored as float32 / float16 or compressed (int8, PCA,
+PCA + int8, each with and without an exact re-score of the candidates).
+
+Queries are stored vectors with a little noise added, so no embedding model
+is needed. Each backend's top-k is compared with an exact brute-force
+search to report recall@k, alongside median query latency, the time to
+open the store and the memory scanned per query versus float32:
+
+    python benchmarks/vector_backends.py --synthetic 20000
+    python benchmarks/vector_backends.py --store vector_store/chroma --queries 200
+    python benchmarks/vector_backends.py --store vector_store/chroma --pca-dim 96 --rescore 50
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from numpy_store import (
+    NumpyVectorStore, COMPRESSIONS, CODES_FILE, VECTORS_FILE, SQ_NORMS_FILE,
+    export_from_chroma, write_index, index_dir
+)
+
+
+def synthetic_store(directory: str, count: int, dim: int, seed: int = 0):
+    """
+    A Chroma store of clustered unit vectors whose variance decays across
+    dimensions, like sentence embeddings (isotropic noise would make any
+    projection look useless)
+    """
+    from langchain_chroma import Chroma
+
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, count // 50), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.5 * rng.standard_normal((count, dim)).astype(np.float32)
+    vectors *= np.exp(-np.arange(dim) / (dim / 8)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    db = Chroma(persist_directory=directory)
+    for start in range(0, count, 5000):
+        stop = min(count, start + 5000)
+        db._collection.add(
+            ids=[f"chunk-{i}" for i in range(start, stop)],
+            embeddings=vectors[start:stop].tolist(),
+            documents=[f"text {i}" for i in range(start, stop)],
+            metadatas=[{"source": f"doc-{i // 100}.pdf"} for i in range(start, stop)]
+        )
+    return db
+
+
+def convert(store: NumpyVectorStore, directory: str, dtype: str, compression: str = "none", pca_dim: int = 128) -> str:
+    """Rewrite an exported float32 index with another dtype or compression"""
+    found = store.get()
+    rows = zip(found["ids"], found["documents"], found["metadatas"], store.vectors)
+    return write_index(
+        directory, rows, len(store), store.vectors.shape[1], dtype,
+        compression, keep_exact=True, pca_dim=pca_dim
+    )
+
+
+def disk_bytes(directory: str, exact: bool = True) -> int:
+    """Size of an index on disk, optionally without the full vectors kept for re-scoring"""
+    names = set(os.listdir(directory))
+    if not exact and CODES_FILE in names:
+        names -= {VECTORS_FILE, SQ_NORMS_FILE}
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in names)
+
+
+def recall(found: list, exact: np.ndarray) -> float:
+    return len(set(found) & set(exact.tolist())) / len(exact)
+
+
+def measure(search, queries: np.ndarray, truth: list) -> dict:
+    latencies, recalls = [], []
+    for query, exact in zip(queries, truth):
+        started = time.perf_counter()
+        rows = search(query)
+        latencies.append(time.perf_counter() - started)
+        recalls.append(recall(rows, exact))
+    return {
+        "recall": float(np.mean(recalls)),
+        "median_ms": statistics.median(latencies) * 1000,
+        "p95_ms": float(np.percentile(latencies, 95)) * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", help="Existing Chroma persist directory")
+    parser.add_argument("--synthetic", type=int, default=20000, help="Vectors to generate when no --store is given")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--pca-dim", type=int, default=128)
+    parser.add_argument("--rescore", type=int, default=20, help="Candidates re-scored exactly in the re-scored variants")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    from langchain_chroma import Chroma
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.store:
+            db = Chroma(persist_directory=args.store)
+        else:
+            db = synthetic_store(os.path.join(tmp, "chroma"), args.synthetic, args.dim)
+
+        # Exported into the temporary directory, leaving the store untouched
+        export_from_chroma(db, tmp, dtype="float32", compression="none")
+        store = NumpyVectorStore(index_dir(tmp))
+        vectors = np.asarray(store.vectors, dtype=np.float64)
+
+        rng = np.random.default_rng(1)
+        picked = rng.integers(0, len(vectors), args.queries)
+        queries = (vectors[picked] + args.noise * rng.standard_normal((args.queries, vectors.shape[1]))).astype(np.float32)
+        truth = [
+            np.argsort(((vectors - query) ** 2).sum(axis=1), kind="stable")[:args.k]
+            for query in queries
+        ]
+
+        row_of = store._row_of
+        backends = {
+            "chroma": lambda query: [
+                row_of(chunk_id) for chunk_id in
+                db._collection.query(query_embeddings=[query.tolist()], n_results=args.k, include=[])["ids"][0]
+            ]
+        }
+
+        variants = [("numpy-float32", index_dir(tmp), 0)]
+        variants.append(("numpy-float16", convert(store, os.path.join(tmp, "float16"), "float16"), 0))
+        for compression in COMPRESSIONS[1:]:
+            directory = convert(store, os.path.join(tmp, compression), "float32", compression, args.pca_dim)
+            variants.append((f"numpy-{compression}", directory, 0))
+            variants.append((f"numpy-{compression}+rescore", directory, args.rescore))
+
+        stores = {}
+        for name, directory, rescore in variants:
+            started = time.perf_counter()
+            numpy_store = NumpyVectorStore(directory, rescore=rescore)
+            stores[name] = {
+                "store": numpy_store,
+                "open_ms": (time.perf_counter() - started) * 1000,
+                # Without re-scoring the full vectors need not be kept
+                "disk_bytes": disk_bytes(directory, exact=bool(rescore))
+            }
+            backends[name] = lambda query, s=numpy_store: [row for row, _ in s.search_rows(query, args.k)]
+
+        baseline = store.scan_bytes
+        print("=" * 60)
+        print(f"Vector Backend Benchmark ({len(vectors)} vectors x {vectors.shape[1]}, k={args.k})")
+        print("=" * 60)
+        print(f"  {'backend':24} {'recall':>7} {'median':>9} {'p95':>9} {'open':>8} {'scanned':>9} {'disk':>9} {'saved':>6}")
+        results = []
+        for name, search in backends.items():
+            result = {"backend": name, **measure(search, queries, truth)}
+            line = f"  {name:24} {result['recall']:7.3f} {result['median_ms']:6.2f} ms {result['p95_ms']:6.2f} ms"
+            if name in stores:
+                scanned = stores[name]["store"].scan_bytes
+                result.update({
+                    "open_ms": stores[name]["open_ms"],
+                    "scan_bytes": scanned,
+                    "disk_bytes": stores[name]["disk_bytes"],
+                    "memory_saved": 1 - scanned / baseline
+                })
+                line += (
+                    f" {result['open_ms']:5.2f} ms {scanned / 2**20:6.1f} MB"
+                    f" {result['disk_bytes'] / 2**20:6.1f} MB {result['memory_saved']:6.0%}"
+                )
+            results.append(result)
+            print(line)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+import os
+import re
+import math
+import heapq
+import pickle
+import threading
+from array import array
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from filters import FieldIndex, matches
+
+# dense: embeddings only, lexical: BM25 only (no embedding model), hybrid: both fused
+RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "dense")
+INDEX_FILENAME = "bm25_index.pkl"
+RRF_K = 60
+# Lexical candidates fetched per result when a filter can only be checked afterwards
+FILTER_OVERFETCH = 10
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this "
+    "to was were will with what which who how when where why".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords or single characters"""
+    return [
+        token for token in _TOKEN_RE.findall(text.lower())
+        if len(token) > 1 and token not in _STOPWORDS
+    ]
+
+
+def index_path(vector_db_dir: str) -> str:
+    """The index lives inside the store directory, so deleting the store removes it"""
+    return os.path.join(vector_db_dir, INDEX_FILENAME)
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index over vector store chunks.
+
+    Postings are kept in two flat arrays (chunk positions and term
+    frequencies) with a term -> (offset, length) directory, which pickles
+    compactly and loads without rebuilding per-term lists. A FieldIndex
+    over the same positions resolves metadata filters.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.doc_lens = array("I")
+        self.terms: Dict[str, Tuple[int, int]] = {}
+        self.post_docs = array("I")
+        self.post_tfs = array("H")
+        self.avg_len = 0.0
+        # None for indexes saved before filters existed
+        self.fields: Optional[FieldIndex] = None
+
+    @classmethod
+    def build(cls, chunks: Iterable[tuple], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """Build from (chunk_id, text) or (chunk_id, text, metadata) tuples"""
+        index = cls(k1, b)
+        index.fields = FieldIndex()
+        postings = defaultdict(list)
+        for position, (chunk_id, text, *metadata) in enumerate(chunks):
+            counts = Counter(tokenize(text))
+            index.ids.append(chunk_id)
+            index.fields.add(position, metadata[0] if metadata else None)
+            index.doc_lens.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings[term].append((position, min(tf, 0xFFFF)))
+
+        for term in sorted(postings):
+            entries = postings[term]
+            index.terms[term] = (len(index.post_docs), len(entries))
+            index.post_docs.extend(position for position, _ in entries)
+            index.post_tfs.extend(tf for _, tf in entries)
+
+        if index.ids:
+            index.avg_len = sum(index.doc_lens) / len(index.ids)
+        return index
+
+    @classmethod
+    def build_from_store(cls, db, page_size: int = 1000) -> "BM25Index":
+        """Build from every chunk in a Chroma (or sharded) store, paging through it"""
+        from sharded_store import iter_store
+
+        return cls.build(iter_store(db, ["documents", "metadatas"], page_size))
+
+    def update(self, removed_ids: Iterable[str], chunks: Iterable[tuple]):
+        """
+        Drop chunks by ID and add (chunk_id, text, metadata) tuples in place,
+        touching only the postings of those chunks. An added ID that is
+        already indexed replaces the old entry.
+        """
+        postings = defaultdict(list)
+        new_ids, new_lens, new_metadata = [], [], []
+        for chunk_id, text, *metadata in chunks:
+            counts = Counter(tokenize(text))
+            position = len(new_ids)
+            new_ids.append(chunk_id)
+            new_metadata.append(metadata[0] if metadata else None)
+            new_lens.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings[term].append((position, min(tf, 0xFFFF)))
+
+        drop = set(removed_ids) | set(new_ids)
+        keep = np.fromiter((chunk_id not in drop for chunk_id in self.ids), dtype=bool, count=len(self.ids))
+        # Old position -> new position, -1 for dropped chunks; order is kept,
+        # so every term's postings stay sorted
+        positions = np.where(keep, np.cumsum(keep) - 1, -1)
+        base = int(keep.sum())
+
+        old_docs = positions[np.frombuffer(self.post_docs, dtype=np.uint32)] if len(self.post_docs) else np.empty(0, dtype=np.int64)
+        old_tfs = np.frombuffer(self.post_tfs, dtype=np.uint16)
+        kept = old_docs >= 0
+
+        terms: Dict[str, Tuple[int, int]] = {}
+        post_docs, post_tfs = array("I"), array("H")
+        for term in sorted(self.terms.keys() | postings.keys()):
+            start = len(post_docs)
+            if term in self.terms:
+                offset, length = self.terms[term]
+                mask = kept[offset:offset + length]
+                post_docs.extend(old_docs[offset:offset + length][mask].tolist())
+                post_tfs.extend(old_tfs[offset:offset + length][mask].tolist())
+            for position, tf in postings.get(term, ()):
+                post_docs.append(base + position)
+                post_tfs.append(tf)
+            if len(post_docs) > start:
+                terms[term] = (start, len(post_docs) - start)
+
+        self.ids = [chunk_id for chunk_id, k in zip(self.ids, keep) if k] + new_ids
+        self.doc_lens = array("I", (length for length, k in zip(self.doc_lens, keep) if k))
+        self.doc_lens.extend(new_lens)
+        self.terms, self.post_docs, self.post_tfs = terms, post_docs, post_tfs
+        self.fields.remap(positions)
+        for position, metadata in enumerate(new_metadata, base):
+            self.fields.add(position, metadata)
+        self.avg_len = sum(self.doc_lens) / len(self.ids) if self.ids else 0.0
+
+    def candidates(self, where: Optional[dict]) -> tuple:
+        """Positions allowed by a where clause (see FieldIndex.candidates)"""
+        if not where:
+            return None, True
+        if self.fields is None:
+            return None, False
+        return self.fields.candidates(where)
+
+    def search(self, query: str, k: int = 4, allowed=None) -> List[Tuple[str, float]]:
+        """Top-k (chunk_id, score) pairs for a query, optionally among allowed positions only"""
+        n = len(self.ids)
+        if not n or (allowed is not None and not len(allowed)):
+            return []
+        if allowed is not None:
+            allowed = set(allowed.tolist()) if hasattr(allowed, "tolist") else set(allowed)
+
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            entry = self.terms.get(term)
+            if entry is None:
+                continue
+            offset, df = entry
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for i in range(offset, offset + df):
+                position = self.post_docs[i]
+                if allowed is not None and position not in allowed:
+                    continue
+                tf = self.post_tfs[i]
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lens[position] / self.avg_len)
+                scores[position] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.ids[position], score) for position, score in best]
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self.__dict__, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        index = cls()
+        with open(path, "rb") as f:
+            index.__dict__.update(pickle.load(f))
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+_loaded: Dict[str, Tuple[float, BM25Index]] = {}
+_loaded_lock = threading.Lock()
+
+
+def load_index(vector_db_dir: str) -> Optional[BM25Index]:
+    """
+    Load a store's BM25 index, reusing the in-memory copy until the file
+    changes. Returns None if the store has no index yet.
+    """
+    path = index_path(vector_db_dir)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        index = BM25Index.load(path)
+        _loaded[path] = (mtime, index)
+        return index
+
+
+def rebuild_index(db, vector_db_dir: str) -> BM25Index:
+    """Rebuild and persist the BM25 index for a store after ingestion"""
+    index = BM25Index.build_from_store(db)
+    index.save(index_path(vector_db_dir))
+    return index
+
+
+def update_index(
+    db,
+    vector_db_dir: str,
+    removed_ids: List[str],
+    added_ids: List[str],
+    shards: Optional[List[str]] = None
+) -> BM25Index:
+    """
+    Apply one ingest run to a store's BM25 index: drop the removed chunks and
+    index the added ones, read by ID from the shards they were written to
+    (all shards if None). Falls back to a full
+    rebuild when there is no index yet, it predates filters, or it does not
+    match the store's chunk count (e.g. after an interrupted run).
+    """
+    from sharded_store import iter_chunks, store_count
+
+    path = index_path(vector_db_dir)
+    if not os.path.exists(path):
+        return rebuild_index(db, vector_db_dir)
+    # A private copy: load_index's cached one may be serving queries
+    index = BM25Index.load(path)
+    if index.fields is None:
+        return rebuild_index(db, vector_db_dir)
+    index.update(removed_ids, iter_chunks(db, added_ids, ["documents", "metadatas"], shards))
+    if len(index) != store_count(db):
+        return rebuild_index(db, vector_db_dir)
+    index.save(path)
+    return index
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RRF_K) -> List[str]:
+    """Fuse ranked ID lists: each ID scores sum(1 / (k + rank)) over the lists"""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, 1):
+            scores[chunk_id] += 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def fetch_documents(db, ids: List[str]) -> list:
+    """Load chunks from the store by ID, preserving the order of ids"""
+    from langchain_core.documents import Document
+
+    if not ids:
+        return []
+    found = db.get(ids=ids, include=["documents", "metadatas"])
+    by_id = {
+        chunk_id: Document(page_content=text, metadata=metadata or {}, id=chunk_id)
+        for chunk_id, text, metadata in zip(found["ids"], found["documents"], found["metadatas"])
+    }
+    return [by_id[chunk_id] for chunk_id in ids if chunk_id in by_id]
+
+
+def _lexical_ids(db, index: BM25Index, question: str, k: int, where: Optional[dict]) -> List[str]:
+    """
+    BM25 top-k IDs among chunks matching where. Indexed fields restrict the
+    search up front; other conditions are checked on an over-fetched
+    candidate list.
+    """
+    allowed, exact = index.candidates(where)
+    if exact:
+        return [chunk_id for chunk_id, _ in index.search(question, k, allowed)]
+    ranked = [chunk_id for chunk_id, _ in index.search(question, k * FILTER_OVERFETCH, allowed)]
+    found = db.get(ids=ranked, include=["metadatas"]) if ranked else {"ids": [], "metadatas": []}
+    keep = {chunk_id for chunk_id, metadata in zip(found["ids"], found["metadatas"]) if matches(metadata, where)}
+    return [chunk_id for chunk_id in ranked if chunk_id in keep][:k]
+
+
+def lexical_search(db, index: BM25Index, question: str, k: int = 4, where: Optional[dict] = None) -> list:
+    """BM25-only retrieval; does not touch the embedding model"""
+    return fetch_documents(db, _lexical_ids(db, index, question, k, where))
+
+
+def hybrid_search(
+    db,
+    index: BM25Index,
+    question: str,
+    vector: List[float],
+    k: int = 4,
+    candidates: int = 20,
+    where: Optional[dict] = None
+) -> list:
+    """Fuse dense and BM25 candidate rankings with reciprocal rank fusion"""
+    dense_docs = db.similarity_search_by_vector(vector, k=max(k, candidates), filter=where)
+    dense_ids = [str(d.id) for d in dense_docs if getattr(d, "id", None)]
+    if not dense_ids:
+        # Store results without IDs cannot be fused; keep the dense ranking
+        return dense_docs[:k]
+    lexical_ids = _lexical_ids(db, index, question, max(k, candidates), where)
+
+    fused = reciprocal_rank_fusion([dense_ids, lexical_ids])[:k]
+    by_id = {str(d.id): d for d in dense_docs if getattr(d, "id", None)}
+    missing = [chunk_id for chunk_id in fused if chunk_id not in by_id]
+    for doc in fetch_documents(db, missing):
+        by_id[doc.id] = doc
+    return [by_id[chunk_id] for chunk_id in fused if chunk_id in by_id]
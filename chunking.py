@@ -0,0 +1,195 @@
+import os
+import re
+import json
+from typing import List, Optional
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# "characters": RecursiveCharacterTextSplitter(500, 100) as before;
+# "tokens": TokenChunker, packed to the embedding model's window
+CHUNKER = os.getenv("RAG_CHUNKER", "characters")
+CHAR_CHUNK_SIZE = 500
+CHAR_CHUNK_OVERLAP = 100
+# Token window per chunk including special tokens; 0 reads the model's max_seq_length
+CHUNK_MAX_TOKENS = int(os.getenv("RAG_CHUNK_MAX_TOKENS", "0"))
+# Tokens of trailing context repeated at the start of the next chunk
+CHUNK_OVERLAP_TOKENS = int(os.getenv("RAG_CHUNK_OVERLAP_TOKENS", "0"))
+DEFAULT_MAX_SEQ_LENGTH = 256
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=\S)")
+
+
+class ChunkStats:
+    """Per-run totals reported by TokenChunker"""
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.documents = 0
+        self.chunks = 0
+        self.tokens = 0
+        self.oversize_units = 0
+        self.oversize_tokens = 0
+
+    @property
+    def fill(self) -> float:
+        """Mean share of the token window used per chunk"""
+        return self.tokens / (self.chunks * self.budget) if self.chunks else 0.0
+
+    def summary(self) -> str:
+        line = (
+            f"{self.chunks} chunks from {self.documents} documents, "
+            f"{self.tokens} tokens embedded, {self.fill:.0%} mean window fill"
+        )
+        if self.oversize_units:
+            line += (
+                f", {self.oversize_units} over-long passages split "
+                f"({self.oversize_tokens} tokens that would have been truncated)"
+            )
+        return line
+
+
+class TokenChunker:
+    """
+    Splits documents into chunks measured in the embedding model's tokens.
+
+    Text is cut into units that are never split across chunks when they fit:
+    sentences within paragraphs, and whole rows of tables (lines with
+    " | " cells, as produced by the DOCX/PPTX/CSV loaders). Units are packed
+    greedily until the next one would overflow the model's window, so chunks
+    are neither truncated by the model nor padded with unused capacity. A
+    single unit longer than the window is split on token boundaries.
+
+    Drop-in for a LangChain text splitter in ingest.iter_chunks: exposes
+    create_documents(texts, metadatas).
+    """
+
+    def __init__(self, tokenizer, max_tokens: int, overlap_tokens: int = CHUNK_OVERLAP_TOKENS):
+        self.tokenizer = tokenizer
+        # Room left after [CLS]/[SEP] (or the model's equivalents)
+        special = len(tokenizer.encode("", add_special_tokens=True).ids)
+        self.budget = max(1, max_tokens - special)
+        self.overlap_tokens = min(overlap_tokens, self.budget // 2)
+        self.stats = ChunkStats(self.budget)
+
+    def _units(self, text: str) -> List[tuple]:
+        """(separator, text) units: sentences, table rows and paragraph breaks"""
+        units = []
+        for paragraph in _PARAGRAPH_RE.split(text):
+            lines = [line for line in paragraph.splitlines() if line.strip()]
+            if not lines:
+                continue
+            is_table = len(lines) > 1 and sum(" | " in line for line in lines) >= len(lines) - 1
+            if is_table and " | " not in lines[0]:
+                # Keep a "TABLE:" style heading with the first row
+                lines = [lines[0] + "\n" + lines[1]] + lines[2:]
+            pieces = lines if is_table else _SENTENCE_RE.split(paragraph.strip())
+            separator = "\n" if is_table else " "
+            for i, piece in enumerate(pieces):
+                units.append(("\n\n" if i == 0 else separator, piece))
+        return units
+
+    def _split_long(self, text: str, encoding) -> List[tuple]:
+        """Cut one over-long unit into windows of at most budget tokens"""
+        offsets = encoding.offsets
+        pieces = []
+        for start in range(0, len(offsets), self.budget):
+            window = offsets[start:start + self.budget]
+            pieces.append((text[window[0][0]:window[-1][1]], len(window)))
+        self.stats.oversize_units += 1
+        self.stats.oversize_tokens += max(0, len(offsets) - self.budget)
+        return pieces
+
+    def split_text(self, text: str) -> List[str]:
+        units = self._units(text)
+        if not units:
+            return []
+        encodings = self.tokenizer.encode_batch(
+            [unit for _, unit in units], add_special_tokens=False
+        )
+
+        chunks = []
+        current = []   # (separator, text, tokens)
+        used = 0
+        carried = 0    # leading units of current repeated from the previous chunk
+
+        def flush():
+            nonlocal current, used, carried
+            chunks.append("".join(
+                (separator if i else "") + unit for i, (separator, unit, _) in enumerate(current)
+            ))
+            self.stats.tokens += used
+            # Carry whole trailing units forward as overlap
+            keep, kept_tokens = 0, 0
+            for _, _, tokens in reversed(current):
+                if kept_tokens + tokens > self.overlap_tokens:
+                    break
+                keep += 1
+                kept_tokens += tokens
+            current = current[len(current) - keep:] if keep else []
+            used, carried = kept_tokens, keep
+
+        for (separator, unit), encoding in zip(units, encodings):
+            count = len(encoding.ids)
+            pieces = [(unit, count)] if count <= self.budget else self._split_long(unit, encoding)
+            for piece, piece_tokens in pieces:
+                if used + piece_tokens > self.budget and len(current) > carried:
+                    flush()
+                # Overlap must never push a unit over the window
+                if used + piece_tokens > self.budget:
+                    current, used, carried = [], 0, 0
+                current.append((separator, piece, piece_tokens))
+                used += piece_tokens
+                separator = " "
+
+        if len(current) > carried:
+            flush()
+
+        self.stats.chunks += len(chunks)
+        self.stats.documents += 1
+        return chunks
+
+    def create_documents(self, texts: List[str], metadatas: Optional[List[dict]] = None) -> list:
+        from langchain_core.documents import Document
+
+        metadatas = metadatas or [{}] * len(texts)
+        return [
+            Document(page_content=chunk, metadata=dict(metadata))
+            for text, metadata in zip(texts, metadatas)
+            for chunk in self.split_text(text)
+        ]
+
+
+def model_max_tokens(model_name: str = EMBEDDING_MODEL) -> int:
+    """The sentence-transformers max_seq_length of a model, if it can be found"""
+    try:
+        from huggingface_hub import hf_hub_download
+        with open(hf_hub_download(model_name, "sentence_bert_config.json"), "r", encoding="utf-8") as f:
+            return int(json.load(f)["max_seq_length"])
+    except Exception:
+        return DEFAULT_MAX_SEQ_LENGTH
+
+
+def chunker_signature(chunker: str = CHUNKER, model_name: str = EMBEDDING_MODEL) -> str:
+    """Identifies the chunking settings; stored chunks are rebuilt when it changes"""
+    if chunker == "tokens":
+        return f"tokens:{model_name}:{CHUNK_MAX_TOKENS or 'auto'}:{CHUNK_OVERLAP_TOKENS}"
+    return f"characters:{CHAR_CHUNK_SIZE}:{CHAR_CHUNK_OVERLAP}"
+
+
+def create_splitter(chunker: str = CHUNKER, model_name: str = EMBEDDING_MODEL):
+    """Build the configured splitter; both expose create_documents(texts, metadatas)"""
+    if chunker == "tokens":
+        from tokenizers import Tokenizer
+        tokenizer = Tokenizer.from_pretrained(model_name)
+        # Lengths are measured here; the shipped tokenizer.json may truncate
+        tokenizer.no_truncation()
+        tokenizer.no_padding()
+        return TokenChunker(tokenizer, CHUNK_MAX_TOKENS or model_max_tokens(model_name))
+    if chunker != "characters":
+        raise ValueError(f"Unknown chunker: {chunker}")
+
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHAR_CHUNK_SIZE,
+        chunk_overlap=CHAR_CHUNK_OVERLAP
+    )
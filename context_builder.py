@@ -0,0 +1,221 @@
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Prompt tokens given to retrieved context and to conversation history
+CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", "1000"))
+HISTORY_TOKENS = int(os.getenv("RAG_HISTORY_TOKENS", "400"))
+# Rough characters per Gemini token for English text; only used for budgeting
+CHARS_PER_TOKEN = 4
+
+# Metadata that places a chunk: chunks are only merged within one location
+LOCATION_FIELDS = ("source", "page", "slide", "table")
+# Shortest shared text taken as chunk overlap rather than a coincidence
+MIN_OVERLAP_CHARS = 20
+# Consecutive chunks of one location are expected to overlap, so for them
+# any shared text starting at a word counts
+ADJACENT_MIN_OVERLAP_CHARS = 1
+# Longest overlap looked for; the character splitter repeats up to 100
+MAX_OVERLAP_CHARS = 1000
+
+_PIECE_RE = re.compile(r"(?<=[.!?])\s+(?=\S)|\n+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate prompt tokens of a text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class ContextStats:
+    """What packing did to one prompt"""
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.chunks = 0
+        self.passages = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.raw_tokens = 0
+        self.tokens = 0
+        self.raw_prompt_tokens = 0
+        self.prompt_tokens = 0
+
+    @property
+    def saved(self) -> int:
+        """Prompt tokens saved against joining chunks and history verbatim"""
+        return self.raw_prompt_tokens - self.prompt_tokens
+
+    def summary(self) -> str:
+        line = (
+            f"{self.chunks} chunks packed into {self.passages} passages, "
+            f"~{self.prompt_tokens} prompt tokens (~{self.saved} saved)"
+        )
+        if self.duplicates:
+            line += f", {self.duplicates} repeated sentences dropped"
+        if self.dropped:
+            line += f", {self.dropped} sentences over the {self.budget}-token budget"
+        return line
+
+
+def _location(doc) -> tuple:
+    metadata = doc.metadata or {}
+    return tuple(metadata.get(field) for field in LOCATION_FIELDS)
+
+
+def _position(doc) -> Optional[Tuple[str, int]]:
+    """(file prefix, chunk number) from an ingest chunk ID such as notes.pdf:1a2b...:7"""
+    prefix, _, number = str(getattr(doc, "id", None) or "").rpartition(":")
+    return (prefix, int(number)) if prefix and number.isdigit() else None
+
+
+def _overlap(head: str, tail: str, minimum: int = MIN_OVERLAP_CHARS, word_start: bool = False) -> int:
+    """
+    Length of the longest suffix of head, at least minimum characters, that
+    starts tail; with word_start only suffixes beginning a word count
+    """
+    probe = tail[:minimum]
+    if len(probe) < minimum:
+        return 0
+    window = max(0, len(head) - MAX_OVERLAP_CHARS)
+    start = head.find(probe, window)
+    while start != -1:
+        if (not word_start or start == 0 or head[start - 1].isspace()) and tail.startswith(head[start:]):
+            return len(head) - start
+        start = head.find(probe, start + 1)
+    return 0
+
+
+def _join(head: str, tail: str, adjacent: bool) -> Optional[str]:
+    """head and tail as one passage, or None if they do not touch"""
+    if tail in head:
+        return head
+    if head in tail:
+        return tail
+    shared = _overlap(head, tail)
+    if not shared and adjacent:
+        shared = _overlap(head, tail, ADJACENT_MIN_OVERLAP_CHARS, word_start=True)
+    if shared:
+        return head + tail[shared:]
+    if adjacent:
+        return head + ("\n" if "\n" in head or "\n" in tail else " ") + tail
+    return None
+
+
+def merge_chunks(docs: list) -> List[Tuple[int, str]]:
+    """
+    Merge retrieved chunks that overlap or follow each other in one source
+    location into passages. Returns (rank, text) pairs, where rank is the best
+    retrieval rank among a passage's chunks.
+    """
+    groups: Dict[tuple, List[tuple]] = {}
+    for rank, doc in enumerate(docs):
+        groups.setdefault(_location(doc), []).append((rank, _position(doc), doc.page_content.strip()))
+
+    passages = []
+    for members in groups.values():
+        # Document order when the IDs give it, else retrieval order
+        if all(position is not None for _, position, _ in members):
+            members.sort(key=lambda member: member[1])
+        rank, position, text = members[0]
+        for next_rank, next_position, next_text in members[1:]:
+            adjacent = (
+                position is not None and next_position is not None
+                and position[0] == next_position[0] and next_position[1] == position[1] + 1
+            )
+            joined = _join(text, next_text, adjacent)
+            if joined is None:
+                passages.append((rank, text))
+                rank, text = next_rank, next_text
+            else:
+                rank, text = min(rank, next_rank), joined
+            position = next_position
+        passages.append((rank, text))
+    passages.sort(key=lambda passage: passage[0])
+    return passages
+
+
+def _pieces(text: str) -> List[Tuple[str, str]]:
+    """(piece, separator before it): sentences and lines, so tables lose repeated rows only"""
+    pieces, start, separator = [], 0, ""
+    for match in _PIECE_RE.finditer(text):
+        pieces.append((text[start:match.start()], separator))
+        start, separator = match.end(), match.group(0)
+    pieces.append((text[start:], separator))
+    return [(piece, separator) for piece, separator in pieces if piece.strip()]
+
+
+def build_context(docs: list, budget: int = CONTEXT_TOKENS) -> Tuple[str, ContextStats]:
+    """
+    Pack retrieved chunks (best first) into at most budget tokens.
+
+    Overlapping and adjacent chunks from the same source location are merged,
+    sentences already in the context are dropped, and passages are added in
+    retrieval order, a sentence at a time, until the budget is spent.
+    """
+    stats = ContextStats(budget)
+    stats.chunks = len(docs)
+    stats.raw_tokens = estimate_tokens("\n\n".join(d.page_content for d in docs))
+
+    seen = set()
+    passages = []
+    used = 0
+    full = False
+    for _, text in merge_chunks(docs):
+        kept = []
+        for piece, separator in _pieces(text):
+            key = " ".join(piece.lower().split())
+            if key in seen:
+                stats.duplicates += 1
+                continue
+            seen.add(key)
+            cost = estimate_tokens((separator if kept else "") + piece)
+            if full or used + cost > budget:
+                if not used and not kept:
+                    # A single over-long sentence still leads the context
+                    piece, cost = piece[:budget * CHARS_PER_TOKEN], budget
+                else:
+                    full = True
+                    stats.dropped += 1
+                    continue
+            kept.append((separator if kept else "") + piece)
+            used += cost
+        if kept:
+            passages.append("".join(kept))
+
+    context = "\n\n".join(passages)
+    stats.passages = len(passages)
+    stats.tokens = estimate_tokens(context)
+    return context, stats
+
+
+def _truncate(text: str, tokens: int) -> str:
+    """text cut to about tokens tokens, at a word boundary"""
+    limit = tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(None, 1)[0] if " " in text[:limit] else text[:limit]
+    return cut + " …"
+
+
+def format_history(exchanges: List[Dict[str, str]], budget: Optional[int] = HISTORY_TOKENS) -> str:
+    """
+    The "Previous conversation" prompt section. With a budget, the newest
+    exchanges are kept first and long answers are shortened to fit; None
+    includes every exchange in full.
+    """
+    if not exchanges:
+        return ""
+    lines = []
+    remaining = budget
+    for exchange in reversed(exchanges):
+        question, answer = exchange["question"], exchange["answer"]
+        if remaining is not None:
+            remaining -= estimate_tokens(question) + 8
+            if remaining <= 0:
+                break
+            answer = _truncate(answer, remaining)
+            remaining -= estimate_tokens(answer)
+        lines.append(f"User: {question}\nAssistant: {answer}\n\n")
+    if not lines:
+        return ""
+    return "Previous conversation:\n" + "".join(reversed(lines))
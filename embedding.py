@@ -0,0 +1,304 @@
+import os
+import hashlib
+import sqlite3
+import threading
+import multiprocessing
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Kept next to (not inside) the Chroma directory so that deleting or
+# rebuilding the vector store does not throw the cached vectors away
+EMBEDDING_CACHE_PATH = os.getenv("RAG_EMBEDDING_CACHE", "vector_store/embedding_cache.sqlite3")
+# Worker processes for embedding, each with its own model copy (1 = in-process, 0 = CPU count)
+EMBEDDING_WORKERS = int(os.getenv("RAG_EMBEDDING_WORKERS", "1"))
+# Intra-op threads per worker (torch or ONNX Runtime); 0 splits the cores evenly between workers
+EMBEDDING_THREADS = int(os.getenv("RAG_EMBEDDING_THREADS", "0"))
+# Texts per sentence-transformers encode batch
+EMBEDDING_BATCH_SIZE = int(os.getenv("RAG_EMBEDDING_BATCH_SIZE", "32"))
+# "torch" (sentence-transformers) or "onnx" (int8 ONNX Runtime export, see onnx_embedding.py)
+EMBEDDING_BACKEND = os.getenv("RAG_EMBEDDING_BACKEND", "torch")
+
+# SQLite's default limit on bound parameters is 999 on older builds
+_SQL_BATCH = 500
+
+
+def cache_key(model_name: str, normalize: bool, text: str, backend: str = "torch", quantized: bool = True) -> str:
+    """Content address of an embedding: model, backend (and ONNX variant), normalize flag and chunk text"""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    # Other backends give slightly different vectors; torch keys predate the field
+    if backend != "torch":
+        digest.update(b"\0backend=" + backend.encode("utf-8"))
+    # So do the int8 and float32 ONNX exports; int8 keys predate this field
+    if backend == "onnx" and not quantized:
+        digest.update(b"\0quantized=0")
+    digest.update(b"\0normalize=1\0" if normalize else b"\0normalize=0\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed map from cache key to a float32 vector"""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors for whichever keys are present"""
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = keys[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch
+                )
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        """Store vectors, replacing any existing entries"""
+        rows = [(key, array("f", vector).tobytes()) for key, vector in items.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves embed_documents from an EmbeddingCache and
+    only sends cache misses to the underlying model.
+
+    Queries are passed straight through; they are short and rarely repeat
+    verbatim across ingestion runs.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        normalize: bool,
+        cache: EmbeddingCache,
+        backend: str = "torch",
+        quantized: bool = True
+    ):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.normalize = normalize
+        self.cache = cache
+        self.backend = backend
+        self.quantized = quantized
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [cache_key(self.model_name, self.normalize, t, self.backend, self.quantized) for t in texts]
+        found = self.cache.get_many(list(set(keys)))
+
+        # Embed each distinct missing text once, even if it repeats in the batch
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(computed)
+            found.update(computed)
+
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
+
+    def close(self):
+        if hasattr(self.underlying, "close"):
+            self.underlying.close()
+        self.cache.close()
+
+
+def _load_model(
+    model_name: str,
+    normalize: bool,
+    batch_size: int,
+    backend: str = EMBEDDING_BACKEND,
+    threads: int = 0
+) -> Embeddings:
+    if backend == "onnx":
+        from onnx_embedding import OnnxEmbeddings
+        return OnnxEmbeddings(model_name, normalize, batch_size, threads)
+    if backend != "torch":
+        raise ValueError(f"Unknown embedding backend: {backend}")
+
+    # Imported lazily: pulls in sentence-transformers and torch
+    from langchain_huggingface import HuggingFaceEmbeddings
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={"trust_remote_code": True},
+        encode_kwargs={"normalize_embeddings": normalize, "batch_size": batch_size}
+    )
+
+
+_worker_model: Optional[Embeddings] = None
+
+
+def _init_embedding_worker(model_name: str, normalize: bool, threads: int, batch_size: int, backend: str):
+    """Load a private model copy in a freshly spawned worker process"""
+    global _worker_model
+    # Must be set before torch is imported to size its thread pools
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    _worker_model = _load_model(model_name, normalize, batch_size, backend, threads)
+
+
+def _embed_documents_in_worker(texts: List[str]) -> List[List[float]]:
+    return _worker_model.embed_documents(texts)
+
+
+def _embed_query_in_worker(text: str) -> List[float]:
+    return _worker_model.embed_query(text)
+
+
+class ProcessPoolEmbeddings(Embeddings):
+    """
+    Embeddings computed by a pool of worker processes, each holding its own
+    copy of the model and a fixed number of torch threads, so encoding
+    scales with cores instead of contending for one interpreter.
+
+    Each embed_documents call is split into shards of at most batch_size
+    texts spread across the workers; vectors come back in input order.
+    """
+
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        normalize: bool = False,
+        workers: int = 2,
+        threads: int = EMBEDDING_THREADS,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        backend: str = EMBEDDING_BACKEND
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        # spawn, not fork: a forked copy of a process that already
+        # initialised torch's thread pools can deadlock
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_embedding_worker,
+            initargs=(model_name, normalize, self.threads, batch_size, backend)
+        )
+
+    def _shards(self, texts: List[str]) -> List[List[str]]:
+        # Small calls are still spread over every worker
+        size = max(1, min(self.batch_size, -(-len(texts) // self.workers)))
+        return [texts[i:i + size] for i in range(0, len(texts), size)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for shard in self._pool.map(_embed_documents_in_worker, self._shards(list(texts))):
+            vectors.extend(shard)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._pool.submit(_embed_query_in_worker, text).result()
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+def resolve_embedding_workers(workers: Optional[int] = None) -> int:
+    """Embedding process count: argument, then RAG_EMBEDDING_WORKERS, then CPU count"""
+    if workers is None:
+        workers = EMBEDDING_WORKERS
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def create_embeddings(
+    model_name: str = EMBEDDING_MODEL,
+    normalize: bool = False,
+    cache_path: Optional[str] = EMBEDDING_CACHE_PATH,
+    workers: Optional[int] = None,
+    backend: str = EMBEDDING_BACKEND
+) -> Embeddings:
+    """
+    Build the embedding model (RAG_EMBEDDING_BACKEND: sentence-transformers
+    or the int8 ONNX export), wrapped in the persistent embedding cache.
+    Pass cache_path=None to disable the cache. With more than one worker
+    the model runs in a ProcessPoolEmbeddings pool.
+    """
+    workers = resolve_embedding_workers(workers)
+    if workers > 1:
+        embeddings = ProcessPoolEmbeddings(model_name, normalize, workers, backend=backend)
+    else:
+        embeddings = _load_model(model_name, normalize, EMBEDDING_BATCH_SIZE, backend, EMBEDDING_THREADS)
+    if not cache_path:
+        return embeddings
+    quantized = True
+    if backend == "onnx":
+        from onnx_embedding import ONNX_QUANTIZED
+        quantized = ONNX_QUANTIZED
+    return CachedEmbeddings(embeddings, model_name, normalize, EmbeddingCache(cache_path), backend, quantized)
+
+
+def iter_embedded(embeddings: Embeddings, batches: Iterable[list], prefetch: int = 2):
+    """
+    Yield (batch, vectors) for batches of Documents, in input order.
+
+    Embedding runs on a background thread up to prefetch batches ahead of
+    the consumer, so writing one batch to the store overlaps with encoding
+    the next (and with loading and chunking, which happen as batches are
+    drawn from the iterator).
+    """
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        for batch in batches:
+            texts = [doc.page_content for doc in batch]
+            pending.append((batch, executor.submit(embeddings.embed_documents, texts)))
+            if len(pending) > prefetch:
+                batch, future = pending.popleft()
+                yield batch, future.result()
+        while pending:
+            batch, future = pending.popleft()
+            yield batch, future.result()
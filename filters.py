@@ -0,0 +1,206 @@
+import os
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Metadata fields accepted as `field:value` terms in a question, with the
+# type their values are stored as
+FILTER_FIELDS = {
+    "source": str,
+    "type": str,
+    "page": int,
+    "slide": int,
+    "table": str,
+    "rows": int,
+}
+# Fields with precomputed chunk sets; conditions on any other field are
+# checked chunk by chunk against the stored metadata
+INDEXED_FIELDS = tuple(
+    field.strip()
+    for field in os.getenv("RAG_FILTER_INDEX_FIELDS", ",".join(FILTER_FIELDS)).split(",")
+    if field.strip()
+)
+
+_FILTER_RE = re.compile(
+    r'(?<!\S)(' + "|".join(FILTER_FIELDS) + r'):(?:"([^"]*)"|(\S+))(?!\S)',
+    re.IGNORECASE
+)
+
+
+def parse_query(text: str) -> Tuple[str, Optional[dict]]:
+    """
+    Split `field:value` filter terms off a question.
+
+    Returns (question, where), where is a Chroma where clause or None.
+    Values with spaces can be quoted (source:"annual report.pdf"); repeating
+    a field matches any of its values (type:pdf type:docx). Terms whose
+    value does not fit the field's type are left in the question.
+    """
+    values: Dict[str, List] = {}
+
+    def take(match) -> str:
+        field = match.group(1).lower()
+        raw = match.group(2) if match.group(2) is not None else match.group(3)
+        try:
+            value = FILTER_FIELDS[field](raw)
+        except ValueError:
+            return match.group(0)
+        if value not in values.setdefault(field, []):
+            values[field].append(value)
+        return ""
+
+    question = " ".join(_FILTER_RE.sub(take, text).split())
+    clauses = [
+        {field: found[0] if len(found) == 1 else {"$in": found}}
+        for field, found in values.items()
+    ]
+    if not clauses:
+        return question, None
+    return question, clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def format_where(where: Optional[dict]) -> str:
+    """A where clause from parse_query written back as filter terms"""
+    if not where:
+        return ""
+    terms = []
+    for clause in where.get("$and", [where]):
+        for field, condition in clause.items():
+            found = condition["$in"] if isinstance(condition, dict) else [condition]
+            terms.extend(
+                f'{field}:"{value}"' if " " in str(value) else f"{field}:{value}"
+                for value in found
+            )
+    return " ".join(terms)
+
+
+def pinned_values(where: Optional[dict], field: str) -> Optional[set]:
+    """Values a Chroma where clause restricts field to, or None if it does not"""
+    if not where:
+        return None
+    if "$and" in where:
+        pinned = None
+        for clause in where["$and"]:
+            values = pinned_values(clause, field)
+            if values is not None:
+                pinned = values if pinned is None else pinned & values
+        return pinned
+    if "$or" in where:
+        alternatives = [pinned_values(clause, field) for clause in where["$or"]]
+        if any(values is None for values in alternatives):
+            return None
+        return set().union(*alternatives)
+    condition = where.get(field)
+    if condition is None:
+        return None
+    if not isinstance(condition, dict):
+        return {condition}
+    if "$eq" in condition:
+        return {condition["$eq"]}
+    if "$in" in condition:
+        return set(condition["$in"])
+    return None
+
+
+def matches(metadata: Optional[dict], where: Optional[dict]) -> bool:
+    """Evaluate the equality / $in / $and / $or subset of Chroma where clauses"""
+    if not where:
+        return True
+    metadata = metadata or {}
+    if "$and" in where:
+        return all(matches(metadata, clause) for clause in where["$and"])
+    if "$or" in where:
+        return any(matches(metadata, clause) for clause in where["$or"])
+    for field, condition in where.items():
+        value = metadata.get(field)
+        if isinstance(condition, dict):
+            if "$eq" in condition and value != condition["$eq"]:
+                return False
+            if "$ne" in condition and value == condition["$ne"]:
+                return False
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$nin" in condition and value in condition["$nin"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FieldIndex:
+    """
+    Precomputed chunk sets for filtering: for each indexed metadata field,
+    value -> sorted positions of the chunks carrying it. Positions are
+    whatever the owning index numbers chunks by (BM25 postings, rows of the
+    numpy export), so a filter resolves to a candidate set with a few set
+    operations instead of a pass over every chunk's metadata.
+    """
+
+    def __init__(self, fields: Iterable[str] = INDEXED_FIELDS):
+        self.fields = tuple(fields)
+        self.postings: Dict[str, Dict[object, array]] = {field: {} for field in self.fields}
+
+    def add(self, position: int, metadata: Optional[dict]):
+        metadata = metadata or {}
+        for field in self.fields:
+            value = metadata.get(field)
+            if value is not None:
+                self.postings[field].setdefault(value, array("I")).append(position)
+
+    def remap(self, positions: np.ndarray):
+        """
+        Renumber chunks after the owner drops some: positions[old] is the new
+        position, or -1 for a dropped chunk. Order is kept, so postings stay
+        sorted.
+        """
+        for field in self.fields:
+            postings = self.postings[field]
+            for value in list(postings):
+                mapped = positions[np.frombuffer(postings[value], dtype=np.uint32)]
+                mapped = mapped[mapped >= 0]
+                if not len(mapped):
+                    del postings[value]
+                    continue
+                kept = array("I")
+                kept.frombytes(mapped.astype(np.uint32).tobytes())
+                postings[value] = kept
+
+    def candidates(self, where: Optional[dict]) -> Tuple[Optional[np.ndarray], bool]:
+        """
+        (positions, exact) for a where clause, positions as a sorted array.
+        positions is None when no indexed field is constrained; exact is
+        False when other conditions remain to be checked against each
+        candidate's metadata.
+        """
+        if not where:
+            return None, True
+        positions = None
+        for field in self.fields:
+            values = pinned_values(where, field)
+            if values is None:
+                continue
+            lists = [
+                np.frombuffer(self.postings[field][value], dtype=np.uint32)
+                for value in values if value in self.postings[field]
+            ]
+            if not lists:
+                found = np.empty(0, dtype=np.int64)
+            elif len(lists) == 1:
+                found = lists[0].astype(np.int64)
+            else:
+                # A chunk has one value per field, so the lists are disjoint
+                found = np.sort(np.concatenate(lists)).astype(np.int64)
+            positions = found if positions is None else np.intersect1d(positions, found, assume_unique=True)
+        exact = positions is not None and all(self._resolved(clause) for clause in where.get("$and", [where]))
+        return positions, exact
+
+    def _resolved(self, clause: dict) -> bool:
+        """Whether the postings alone decide a clause: equality or $in on an indexed field"""
+        if len(clause) != 1:
+            return False
+        field, condition = next(iter(clause.items()))
+        if field not in self.fields:
+            return False
+        return not isinstance(condition, dict) or set(condition) <= {"$eq", "$in"}
@@ -1,128 +1,691 @@
 import os
+import json
+import queue
+import pickle
+import hashlib
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-
-from loaders.text_loader import load_text_file
-from loaders.pdf_loader import load_pdf_file
-from loaders.docx_loader import load_docx_file
-from loaders.pptx_loader import load_pptx_file
-from loaders.json_loader import load_json_file
-from loaders.xml_loader import load_xml_file
-from loaders.csv_loader import load_csv_file
-from loaders.database_loader import load_database_file
+from typing import Callable, Optional
+
+from retrieval_cache import bump_generation
+from bm25_index import rebuild_index, update_index
+from chunking import create_splitter, chunker_signature
+from sharded_store import ShardedStore, shard_layout, stored_layout, open_store, create_store, delete_chunks
+from loaders import registry
 
 DATA_DIR = "data"
 VECTOR_DB_DIR = "vector_store/chroma"
+# Kept inside the vector store so deleting the store also resets the manifest
+MANIFEST_PATH = os.path.join(VECTOR_DB_DIR, "ingest_manifest.json")
+MANIFEST_VERSION = 1
+SUPPORTED_EXTENSIONS = registry.supported_extensions()
+# Process pool size for document loading; 0 means one worker per CPU
+LOAD_WORKERS = int(os.getenv("RAG_LOAD_WORKERS", "0"))
+# Chunks embedded and written to the vector store per add_documents call
+INGEST_BATCH_SIZE = int(os.getenv("RAG_INGEST_BATCH_SIZE", "64"))
+# Documents per message when a worker streams a file back, and messages a
+# worker may run ahead of the consumer before it waits
+STREAM_PART_DOCS = 32
+STREAM_QUEUE_PARTS = 4
+# Re-read a changed database only from the checkpoints of its last ingest
+# (rows added) and keep its older chunks. Edits noticed through
+# RAG_DB_CHANGED_COLUMN re-read the whole file; deleted rows are not
+# noticed, so this suits append-mostly tables
+DB_INCREMENTAL = os.getenv("RAG_DB_INCREMENTAL", "0") == "1"
 
-def load_documents():
-    """Load documents from data directory supporting multiple file types"""
-    docs = []
-    
+def load_file(path: str) -> list:
+    """
+    Load a single file into a list of documents using the loader registry.
+    Each loader (and its parsing library) is imported on first use only.
+    """
+    return registry.load_file(path)
+
+
+def _init_load_worker(page_workers: int):
+    """
+    Pool initializer: grant a PDF parsed in this worker page_workers page
+    extraction processes (read by loaders.pdf_loader)
+    """
+    os.environ["RAG_PDF_NESTED_PAGE_WORKERS"] = str(page_workers)
+
+
+def _load_pool(workers: int, context) -> ProcessPoolExecutor:
+    """
+    Loader pool of workers processes. The cores left over when there are
+    fewer files than CPUs are split between the workers, so a PDF still
+    extracts its pages in parallel when few files are loaded together.
+    """
+    page_workers = max(1, (os.cpu_count() or 1) // workers)
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_load_worker,
+        initargs=(page_workers,)
+    )
+
+
+def _load_file_isolated(path: str) -> tuple:
+    """Run load_file and capture failures so one bad file never sinks the batch"""
+    try:
+        return path, load_file(path), None
+    except Exception as e:
+        # Return the message rather than the exception: not every exception
+        # raised by a loader can be pickled back from a worker process
+        return path, [], f"{e.__class__.__name__}: {e}"
+
+
+def resolve_load_workers(max_workers: Optional[int] = None) -> int:
+    """Worker count for parallel loading: argument, then RAG_LOAD_WORKERS, then CPU count"""
+    if max_workers is None:
+        max_workers = LOAD_WORKERS
+    if max_workers <= 0:
+        max_workers = os.cpu_count() or 1
+    return max_workers
+
+
+def iter_load_files(paths: list, max_workers: Optional[int] = None, max_pending: Optional[int] = None):
+    """
+    Load files on a process pool, yielding (path, docs, error) tuples in
+    completion order. error is None on success.
+
+    At most max_pending files (default: twice the worker count) are in flight
+    or waiting to be consumed, so a slow consumer throttles parsing instead of
+    letting loaded documents pile up in memory. With a single worker (or a
+    single file) the files are loaded inline.
+    """
+    workers = min(resolve_load_workers(max_workers), len(paths))
+
+    if workers <= 1:
+        for path in paths:
+            yield _load_file_isolated(path)
+        return
+
+    if max_pending is None:
+        max_pending = workers * 2
+
+    remaining = iter(paths)
+    # spawn, not fork: ingest loads the embedding model (and torch's thread
+    # pools) before it loads files, and a forked copy of that can deadlock
+    with _load_pool(workers, multiprocessing.get_context("spawn")) as pool:
+        futures = {}
+
+        def submit_next():
+            path = next(remaining, None)
+            if path is not None:
+                futures[pool.submit(_load_file_isolated, path)] = path
+
+        for _ in range(max_pending):
+            submit_next()
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = futures.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker itself died (e.g. BrokenProcessPool)
+                    result = (path, [], f"{e.__class__.__name__}: {e}")
+                yield result
+                submit_next()
+
+
+def _put(parts, cancel, message) -> bool:
+    """Queue a message for the consumer unless it cancelled; False once cancelled"""
+    while not cancel.is_set():
+        try:
+            parts.put(message, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _stream_file_isolated(path: str, parts, cancel, since=None):
+    """
+    Run a file's streaming loader in a worker process, sending its documents
+    back through the parts queue in lists of STREAM_PART_DOCS. The last
+    message is ("done", loader state) or ("error", exception). Stops early
+    once the consumer sets cancel.
+    """
+    try:
+        stream = registry.stream_file(path, since)
+        for part in batched(stream, STREAM_PART_DOCS):
+            if not _put(parts, cancel, ("docs", part)):
+                return
+        _put(parts, cancel, ("done", stream.state))
+    except Exception as e:
+        try:
+            pickle.dumps(e)
+        except Exception:
+            # Not every exception a loader raises can be sent to the consumer
+            e = RuntimeError(f"{e.__class__.__name__}: {e}")
+        _put(parts, cancel, ("error", e))
+
+
+class _WorkerStream:
+    """
+    The documents of one file, as its worker streams them back (see
+    _stream_file_isolated); state as in registry.DocumentStream
+    """
+
+    def __init__(self, parts, cancel, future):
+        self.parts = parts
+        self.cancel = cancel
+        self.future = future
+        self.state = None
+        self._buffer = deque()
+        self._finished = False
+
+    def __iter__(self):
+        return self
+
+    def _next_message(self) -> tuple:
+        while True:
+            try:
+                return self.parts.get(timeout=0.5)
+            except queue.Empty:
+                if not self.future.done():
+                    continue
+            # The worker has exited; anything it sent is already queued
+            try:
+                return self.parts.get_nowait()
+            except queue.Empty:
+                return "error", self.future.exception() or RuntimeError("loader worker exited early")
+
+    def __next__(self) -> dict:
+        while not self._buffer:
+            if self._finished:
+                raise StopIteration
+            kind, payload = self._next_message()
+            if kind == "docs":
+                self._buffer.extend(payload)
+                continue
+            self._finished = True
+            if kind == "error":
+                raise payload
+            self.state = payload
+        return self._buffer.popleft()
+
+    def close(self):
+        """Stop the worker if the documents were not all consumed"""
+        if not self._finished:
+            self._finished = True
+            self.cancel.set()
+
+
+def iter_file_documents(
+    paths: list,
+    max_workers: Optional[int] = None,
+    max_pending: Optional[int] = None,
+    since: Optional[dict] = None
+):
+    """
+    Yield (path, docs, error) for every path, parsing files on a process
+    pool. Files with a streaming loader (PDF, CSV, JSON, XML, databases)
+    are parsed by a worker too, but send their documents back as they are
+    read: docs is an iterator the caller consumes, loader errors surface
+    while iterating, and docs.state holds the loader's state once it is
+    exhausted. since maps paths to the state their last stream ended with,
+    for incremental reads. Other files arrive whole, in completion order.
+
+    A streamed file is yielded as soon as its worker starts, and the worker
+    runs at most STREAM_QUEUE_PARTS messages ahead of the caller, so memory
+    stays bounded however large the file. At most max_pending files (default:
+    twice the worker count) are in flight. With a single worker (or a single
+    file) files are loaded inline, where a PDF extracts its pages on a pool
+    of its own; on the pool, a PDF gets the worker's share of the cores
+    (see _load_pool).
+    """
+    workers = min(resolve_load_workers(max_workers), len(paths))
+    streamed = {path for path in paths if registry.get_streaming_loader(path)}
+    since = since or {}
+
+    if workers <= 1:
+        for path in paths:
+            if path in streamed:
+                yield path, registry.stream_file(path, since.get(path)), None
+            else:
+                yield _load_file_isolated(path)
+        return
+
+    if max_pending is None:
+        max_pending = workers * 2
+
+    context = multiprocessing.get_context("spawn")
+    # Queues handed to pool workers must be manager proxies
+    manager = context.Manager() if streamed else None
+    remaining = iter(paths)
+    try:
+        with _load_pool(workers, context) as pool:
+            futures = {}
+            streams = deque()
+
+            def submit_next():
+                path = next(remaining, None)
+                if path is None:
+                    return
+                if path in streamed:
+                    parts, cancel = manager.Queue(STREAM_QUEUE_PARTS), manager.Event()
+                    future = pool.submit(_stream_file_isolated, path, parts, cancel, since.get(path))
+                    streams.append((path, _WorkerStream(parts, cancel, future)))
+                else:
+                    futures[pool.submit(_load_file_isolated, path)] = path
+
+            for _ in range(max_pending):
+                submit_next()
+
+            try:
+                while futures or streams:
+                    done = [future for future in futures if future.done()]
+                    if not done and streams:
+                        # Consume a stream while the pool keeps parsing the other files
+                        path, stream = streams.popleft()
+                        try:
+                            yield path, stream, None
+                        finally:
+                            stream.close()
+                        submit_next()
+                        continue
+                    if not done:
+                        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path = futures.pop(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            # The worker itself died (e.g. BrokenProcessPool)
+                            result = (path, [], f"{e.__class__.__name__}: {e}")
+                        yield result
+                        submit_next()
+            finally:
+                # Streams never handed out would otherwise wait for a reader forever
+                for _, stream in streams:
+                    stream.close()
+    finally:
+        if manager is not None:
+            manager.shutdown()
+
+
+def iter_chunks(raw_docs, splitter):
+    """Lazily split loaded documents into chunks, one source document at a time"""
+    for doc in raw_docs:
+        yield from splitter.create_documents([doc["content"]], [doc["metadata"]])
+
+
+def batched(iterable, size: int):
+    """Group an iterable into lists of at most size items"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def list_data_files() -> list:
+    """
+    List files in the data directory that have a registered loader
+    (directories and other files are skipped, so they are never hashed)
+    """
     if not os.path.exists(DATA_DIR):
         print(f"Data directory '{DATA_DIR}' not found. Creating it...")
         os.makedirs(DATA_DIR)
         return []
 
-    for file in os.listdir(DATA_DIR):
+    # Looked up now rather than at import so later registrations count
+    supported = registry.supported_extensions()
+    return sorted(
+        file for file in os.listdir(DATA_DIR)
+        if os.path.splitext(file)[1].lower() in supported
+        and not os.path.isdir(os.path.join(DATA_DIR, file))
+    )
+
+
+def load_documents(max_workers: Optional[int] = None):
+    """Load documents from data directory supporting multiple file types"""
+    paths = [os.path.join(DATA_DIR, file) for file in list_data_files()]
+    loaded = {}
+
+    for path, file_docs, error in iter_load_files(paths, max_workers):
+        file = os.path.basename(path)
+        if error:
+            print(f"✗ Error loading {file}: {error}")
+            continue
+        print(f"✓ Loaded: {file} ({len(file_docs)} documents)")
+        loaded[path] = file_docs
+
+    # Results arrive in completion order; assemble them in file order so the
+    # output does not depend on scheduling
+    docs = []
+    for path in paths:
+        docs.extend(loaded.get(path, []))
+    return docs
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file's content, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest() -> dict:
+    """
+    Load the ingestion manifest stored inside the vector store directory.
+    Maps each source file to its size, mtime, content hash and chunk IDs.
+    """
+    if not os.path.exists(MANIFEST_PATH):
+        return {"version": MANIFEST_VERSION, "files": {}}
+
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"✗ Ignoring unreadable manifest {MANIFEST_PATH}: {e}")
+        return {"version": MANIFEST_VERSION, "files": {}}
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "files": {}}
+    return manifest
+
+
+def save_manifest(manifest: dict):
+    """Atomically write the ingestion manifest"""
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def plan_changes(manifest: dict, files: list) -> tuple:
+    """
+    Compare data files against the manifest.
+
+    Size and mtime are checked first; the content hash is only computed when
+    they differ, so unchanged files cost a single stat() call.
+
+    Returns:
+        (to_ingest, removed, touched) where to_ingest is a list of
+        (file, stat, sha256) tuples for new or changed files, removed is a
+        list of file names no longer present, and touched maps file names
+        whose metadata changed but content did not to their new stat.
+    """
+    entries = manifest["files"]
+    to_ingest = []
+    touched = {}
+
+    for file in files:
         path = os.path.join(DATA_DIR, file)
-        
-        # Skip directories
-        if os.path.isdir(path):
+        stat = os.stat(path)
+        entry = entries.get(file)
+
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
             continue
 
-        try:
-            if file.endswith(".txt") or file.endswith(".md"):
-                doc = load_text_file(path)
-                docs.append(doc)
-                print(f"✓ Loaded: {file}")
-            
-            elif file.endswith(".pdf"):
-                file_docs = load_pdf_file(path)
-                docs.extend(file_docs)
-                print(f"✓ Loaded: {file} ({len(file_docs)} pages)")
-            
-            elif file.endswith(".docx"):
-                file_docs = load_docx_file(path)
-                docs.extend(file_docs)
-                print(f"✓ Loaded: {file}")
-            
-            elif file.endswith(".pptx"):
-                file_docs = load_pptx_file(path)
-                docs.extend(file_docs)
-                print(f"✓ Loaded: {file} ({len(file_docs)} slides)")
-            
-            elif file.endswith(".json"):
-                file_docs = load_json_file(path)
-                docs.extend(file_docs)
-                print(f"✓ Loaded: {file}")
-            
-            elif file.endswith(".xml"):
-                file_docs = load_xml_file(path)
-                docs.extend(file_docs)
-                print(f"✓ Loaded: {file}")
-            
-            elif file.endswith(".csv"):
-                file_docs = load_csv_file(path)
-                docs.extend(file_docs)
-                print(f"✓ Loaded: {file}")
-            
-            elif file.endswith(".db") or file.endswith(".sqlite") or file.endswith(".sqlite3"):
-                file_docs = load_database_file(path)
-                docs.extend(file_docs)
-                print(f"✓ Loaded: {file} ({len(file_docs)} tables)")
-        
-        except Exception as e:
-            print(f"✗ Error loading {file}: {e}")
+        digest = file_hash(path)
+        if entry and entry["sha256"] == digest:
+            touched[file] = stat
             continue
 
-    return docs
+        to_ingest.append((file, stat, digest))
 
-def ingest():
-    print("\n" + "="*60)
-    print("RAG Document Ingestion Pipeline")
-    print("="*60 + "\n")
-    
-    print("Loading documents...")
-    raw_docs = load_documents()
-    
-    if not raw_docs:
-        print("No documents found to ingest!")
-        return
-    
-    print(f"\nTotal documents loaded: {len(raw_docs)}")
+    present = set(files)
+    removed = [file for file in entries if file not in present]
+    return to_ingest, removed, touched
 
-    texts = [d["content"] for d in raw_docs]
-    metadatas = [d["metadata"] for d in raw_docs]
 
-    print("\nChunking documents...")
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=100
-    )
+def chunk_ids_for(file: str, digest: str, count: int, start: int = 0) -> list:
+    """Deterministic chunk IDs derived from the file name and content hash"""
+    return [f"{file}:{digest[:16]}:{i}" for i in range(start, start + count)]
 
-    chunks = splitter.create_documents(texts, metadatas)
-    print(f"✓ Created {len(chunks)} chunks")
 
-    print("\nGenerating embeddings...")
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={"trust_remote_code": True},
-        encode_kwargs={"normalize_embeddings": False}
+def store_embedded(db, docs: list, ids: list, vectors: list) -> list:
+    """
+    Write chunks whose vectors were computed ahead of time straight to the
+    Chroma collection (or the shards of a ShardedStore), bypassing the
+    store's own embedding call. Returns the shards written, if sharded.
+    """
+    if isinstance(db, ShardedStore):
+        return db.upsert(docs, ids, vectors)
+    db._collection.upsert(
+        ids=ids,
+        embeddings=vectors,
+        documents=[doc.page_content for doc in docs],
+        metadatas=[doc.metadata for doc in docs]
     )
+    return []
 
-    print("Storing in vector database...")
-    Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        persist_directory=VECTOR_DB_DIR
-    )
+
+def store_file(db, embeddings, splitter, raw_docs, file: str, digest: str, batch_size: int, start: int = 0) -> tuple:
+    """
+    Chunk, embed and store one file's documents in bounded batches, numbering
+    chunk IDs from start. Returns (chunk_ids, shards written). On failure the
+    chunks stored so far are deleted again, so the file is retried on the
+    next run.
+    """
+    from embedding import iter_embedded
+
+    ids = []
+    shards = set()
+    try:
+        batches = batched(iter_chunks(raw_docs, splitter), batch_size)
+        for batch, vectors in iter_embedded(embeddings, batches):
+            batch_ids = chunk_ids_for(file, digest, len(batch), start=start + len(ids))
+            shards.update(store_embedded(db, batch, batch_ids, vectors))
+            ids.extend(batch_ids)
+    except Exception:
+        if ids:
+            delete_chunks(db, ids, sorted(shards))
+        raise
+    return ids, sorted(shards)
+
+
+def ingest(
+    batch_size: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    embeddings=None,
+    progress: Optional[Callable[[int, int, str], None]] = None
+) -> dict:
+    """
+    Incrementally ingest data/ into the vector store.
+
+    Files stream through load -> chunk -> embed -> store one bounded batch at
+    a time, so peak memory depends on batch_size and the loader window rather
+    than on corpus size. The manifest is checkpointed after every file.
+
+    Pass embeddings to reuse a model the caller already holds (it is not
+    closed here). progress(done, total, file) is called as each file
+    finishes, failed or not. Returns a summary: files ingested, files
+    removed, chunks embedded and (file, error) pairs for failed files.
+    """
+    # Heavy dependencies are imported here rather than at module level so
+    # that loader worker processes and `import ingest` stay cheap
+    from embedding import create_embeddings
+    from numpy_store import VECTOR_BACKEND, NUMPY_COMPRESSION, export_from_chroma, update_export
+
+    batch_size = batch_size or INGEST_BATCH_SIZE
+    summary = {"files": 0, "removed": 0, "chunks": 0, "errors": []}
 
     print("\n" + "="*60)
-    print("✓ Ingestion Complete!")
-    print(f"Vector DB ready at: {VECTOR_DB_DIR}")
+    print("RAG Document Ingestion Pipeline")
     print("="*60 + "\n")
 
+    manifest = load_manifest()
+    files = list_data_files()
+
+    print("Checking for changes...")
+    to_ingest, removed, touched = plan_changes(manifest, files)
+    unchanged = len(files) - len(to_ingest) - len(touched)
+    print(f"✓ {len(to_ingest)} new/changed, {len(removed)} removed, {unchanged + len(touched)} unchanged")
+
+    for file, stat in touched.items():
+        manifest["files"][file]["size"] = stat.st_size
+        manifest["files"][file]["mtime"] = stat.st_mtime
+
+    # Stores from before the chunker switch were built with the character splitter
+    signature = chunker_signature()
+    changed = []
+    if manifest.get("chunker", chunker_signature("characters")) != signature:
+        changed.append("Chunking settings")
+    layout = shard_layout()
+    if stored_layout(VECTOR_DB_DIR) != layout:
+        changed.append("Shard layout")
+    if changed:
+        queued = {file for file, _, _ in to_ingest}
+        rechunk = [
+            (file, os.stat(os.path.join(DATA_DIR, file)), entry["sha256"])
+            for file, entry in manifest["files"].items()
+            if file not in queued and file not in removed
+        ]
+        if rechunk:
+            print(f"✓ {' and '.join(changed)} changed, re-ingesting {len(rechunk)} unchanged files")
+        to_ingest += rechunk
+    manifest["chunker"] = signature
+
+    if not to_ingest and not removed:
+        if touched:
+            save_manifest(manifest)
+        print("\nVector store is up to date. Nothing to ingest.")
+        return summary
+
+    owns_embeddings = embeddings is None
+    if owns_embeddings:
+        embeddings = create_embeddings()
+    try:
+        # Stale chunks are deleted from the store as it is laid out on disk,
+        # then new ones are written with the configured layout
+        db = open_store(VECTOR_DB_DIR, embeddings)
+
+        # Changed databases with checkpoints are read from them, keeping their
+        # chunks if only rows were appended (the loader reads the whole file
+        # otherwise); not after a re-chunk or layout change, which rewrite
+        # every file
+        incremental = {}
+        if DB_INCREMENTAL and not changed:
+            incremental = {
+                file: manifest["files"][file] for file, _, _ in to_ingest
+                if "since" in manifest["files"].get(file, {})
+            }
+
+        # Drop chunks of files that were removed or are about to be replaced
+        stale_files = removed + [
+            file for file, _, _ in to_ingest if file in manifest["files"] and file not in incremental
+        ]
+        removed_ids, added_ids, added_shards = [], [], set()
+        for file in stale_files:
+            entry = manifest["files"][file]
+            stale_ids = entry["chunk_ids"]
+            if stale_ids:
+                delete_chunks(db, stale_ids, entry.get("shards"))
+                removed_ids.extend(stale_ids)
+            del manifest["files"][file]
+            print(f"✓ Removed {len(stale_ids)} chunks of {file}")
+
+        if stored_layout(VECTOR_DB_DIR) != layout:
+            db = create_store(VECTOR_DB_DIR, embeddings)
+
+        splitter = create_splitter()
+
+        pending = {os.path.join(DATA_DIR, file): (file, stat, digest) for file, stat, digest in to_ingest}
+        since = {os.path.join(DATA_DIR, file): entry["since"] for file, entry in incremental.items()}
+
+        total_chunks = 0
+        loaded = iter_file_documents(list(pending), max_workers, since=since)
+        for done, (path, raw_docs, error) in enumerate(loaded, 1):
+            file, stat, digest = pending[path]
+            if error:
+                print(f"✗ Error loading {file}: {error}")
+                summary["errors"].append((file, error))
+            else:
+                previous = incremental.get(file)
+                try:
+                    start = len(previous["chunk_ids"]) if previous else 0
+                    ids, shards = store_file(db, embeddings, splitter, raw_docs, file, digest, batch_size, start)
+                except Exception as e:
+                    print(f"✗ Error ingesting {file}: {e}")
+                    summary["errors"].append((file, f"{e.__class__.__name__}: {e}"))
+                else:
+                    total_chunks += len(ids)
+                    added_ids.extend(ids)
+                    added_shards.update(shards)
+                    summary["files"] += 1
+                    print(f"✓ Embedded {file} ({len(ids)} chunks)")
+
+                    state = getattr(raw_docs, "state", None)
+                    if previous and state and state.get("incremental"):
+                        ids = previous["chunk_ids"] + ids
+                        shards = sorted(set(previous.get("shards", [])) | set(shards))
+                    elif previous:
+                        # The loader read the whole file after all
+                        delete_chunks(db, previous["chunk_ids"], previous.get("shards"))
+                        removed_ids.extend(previous["chunk_ids"])
+                        print(f"✓ Removed {len(previous['chunk_ids'])} chunks of {file}")
+
+                    # Record each file as soon as it is stored so an interrupted run
+                    # resumes where it stopped
+                    manifest["files"][file] = {
+                        "size": stat.st_size,
+                        "mtime": stat.st_mtime,
+                        "sha256": digest,
+                        "chunk_ids": ids
+                    }
+                    if shards:
+                        manifest["files"][file]["shards"] = shards
+                    if state is not None:
+                        # Where an incremental read of the file starts next time
+                        manifest["files"][file]["since"] = state
+                    save_manifest(manifest)
+            if progress is not None:
+                progress(done, len(pending), file)
+
+        save_manifest(manifest)
+
+        # Added chunks are read back from the shards they were written to only
+        written = sorted(added_shards) if isinstance(db, ShardedStore) else None
+        if changed:
+            print("\nRebuilding BM25 index...")
+            index = rebuild_index(db, VECTOR_DB_DIR)
+        else:
+            print("\nUpdating BM25 index...")
+            index = update_index(db, VECTOR_DB_DIR, removed_ids, added_ids, written)
+        print(f"✓ Indexed {len(index)} chunks ({len(index.terms)} terms)")
+
+        if VECTOR_BACKEND == "numpy":
+            exported = None if changed else update_export(db, VECTOR_DB_DIR, removed_ids, added_ids, written)
+            if exported is None:
+                print("Exporting memory-mapped vector index...")
+                exported = export_from_chroma(db, VECTOR_DB_DIR)
+                print(f"✓ Exported {exported} vectors (compression: {NUMPY_COMPRESSION})")
+            else:
+                print(f"✓ Updated memory-mapped vector index ({exported} vectors)")
+
+        # Invalidate cached search results in running query processes
+        bump_generation(VECTOR_DB_DIR)
+
+        print("\n" + "="*60)
+        print("✓ Ingestion Complete!")
+        print(f"Embedded {total_chunks} chunks from {len(to_ingest)} files")
+        if hasattr(splitter, "stats"):
+            print(f"Chunking: {splitter.stats.summary()}")
+        if hasattr(embeddings, "hits"):
+            print(f"Embedding cache: {embeddings.hits} hits, {embeddings.misses} computed")
+        print(f"Vector DB ready at: {VECTOR_DB_DIR}")
+        print("="*60 + "\n")
+        summary["removed"] = len(removed)
+        summary["chunks"] = total_chunks
+        return summary
+    finally:
+        # Also on failure: the model may hold worker processes or sessions
+        if owns_embeddings and hasattr(embeddings, "close"):
+            embeddings.close()
+
 if __name__ == "__main__":
     ingest()
@@ -1,6 +1,16 @@
+import os
 from pathlib import Path
 from sqlalchemy import inspect, text, create_engine
-from typing import Optional, List
+from sqlalchemy.exc import SQLAlchemyError
+from typing import Optional, List, Dict, Any
+
+# Rows per keyset page (and per emitted document) when streaming tables
+DB_BATCH_ROWS = 200
+# Column holding a row's last change (e.g. updated_at) in tables that have
+# it; incremental reads use it to notice edited rows, which make the whole
+# database be read again. Edits to other tables go unnoticed.
+DB_CHANGED_COLUMN = os.getenv("RAG_DB_CHANGED_COLUMN") or None
+
 
 class DatabaseLoader:
     """Loader for SQLite and SQL databases"""
@@ -8,6 +18,10 @@ class DatabaseLoader:
     def __init__(self, db_path: str = "data/data.db"):
         self.db_path = db_path
         self.engine = None
+        self._inspector = None
+        # table -> {"key_column", "key", "changed_column", "changed"}:
+        # where iter_table stopped reading
+        self.checkpoints: Dict[str, Dict[str, Any]] = {}
 
     def connect(self, db_path: Optional[str] = None):
         """Connect to SQLite database"""
@@ -15,10 +29,24 @@ class DatabaseLoader:
             path = db_path or self.db_path
             connection_string = f"sqlite:///{path}"
             self.engine = create_engine(connection_string)
+            self._inspector = None
             return True
         except Exception as e:
             raise ValueError(f"Failed to connect to database: {e}")
 
+    @property
+    def inspector(self):
+        """Schema inspector, created once per connection"""
+        if not self.engine:
+            raise RuntimeError("Not connected to database. Call connect() first.")
+        if self._inspector is None:
+            self._inspector = inspect(self.engine)
+        return self._inspector
+
+    def quote(self, identifier: str) -> str:
+        """Quote a table or column name for the connected dialect"""
+        return self.engine.dialect.identifier_preparer.quote(identifier)
+
     def load_table(self, table_name: str, limit: int = 100) -> list:
         """Load data from a specific table"""
         if not self.engine:
@@ -27,17 +55,17 @@ class DatabaseLoader:
         try:
             with self.engine.connect() as conn:
                 # Get table schema
-                inspector = inspect(self.engine)
-                columns = inspector.get_columns(table_name)
+                columns = self.inspector.get_columns(table_name)
                 column_names = [col['name'] for col in columns]
+                table = self.quote(table_name)
 
                 # Get row count
-                row_count_result = conn.execute(text(f"SELECT COUNT(*) FROM {table_name}"))
+                row_count_result = conn.execute(text(f"SELECT COUNT(*) FROM {table}"))
                 row_count = row_count_result.scalar()
 
                 # Get sample data
-                query = f"SELECT * FROM {table_name} LIMIT {limit}"
-                result = conn.execute(text(query))
+                query = f"SELECT * FROM {table} LIMIT :limit"
+                result = conn.execute(text(query), {"limit": limit})
                 rows = result.fetchall()
 
                 # Format as readable text
@@ -54,7 +82,7 @@ class DatabaseLoader:
 
                 content_parts.append("\nSAMPLE DATA:")
                 for row in rows:
-                    row_text = " | ".join([f"{col_names[i]}: {val}" for i, val in enumerate(row)])
+                    row_text = " | ".join([f"{column_names[i]}: {val}" for i, val in enumerate(row)])
                     content_parts.append(f"  {row_text}")
 
                 if row_count > limit:
@@ -84,11 +112,152 @@ class DatabaseLoader:
             raise RuntimeError("Not connected to database. Call connect() first.")
 
         try:
-            inspector = inspect(self.engine)
-            return inspector.get_table_names()
+            return self.inspector.get_table_names()
         except Exception as e:
             raise ValueError(f"Error listing tables: {e}")
 
+    def key_column(self, table_name: str) -> str:
+        """
+        Column used for keyset pagination: the single-column primary key if
+        there is one, otherwise SQLite's rowid.
+        """
+        primary_key = self.inspector.get_pk_constraint(table_name).get("constrained_columns") or []
+        if len(primary_key) == 1:
+            return primary_key[0]
+
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text(f"SELECT rowid FROM {self.quote(table_name)} LIMIT 0"))
+        except SQLAlchemyError:
+            raise ValueError(
+                f"Table {table_name} has no single-column primary key or rowid to paginate on"
+            )
+        return "rowid"
+
+    def _paging_columns(self, table_name: str, changed_column: Optional[str]) -> tuple:
+        """(key column, changed_column if the table has it, else None)"""
+        column_names = [col["name"] for col in self.inspector.get_columns(table_name)]
+        return self.key_column(table_name), changed_column if changed_column in column_names else None
+
+    def resumable(self, table_name: str, since: Optional[Dict[str, Any]], changed_column: Optional[str] = None) -> bool:
+        """
+        Whether rows read after the checkpoint since can simply be added to
+        those read before it. Not if the checkpoint was taken on other
+        columns, or if changed_column shows a row at or below the
+        checkpoint's key was edited after it: then the table must be read
+        whole. Without changed_column, edits go unnoticed.
+        """
+        if not since:
+            return False
+        key, changed_column = self._paging_columns(table_name, changed_column)
+        if since.get("key_column") != key or since.get("changed_column") != changed_column:
+            return False
+        if changed_column is None or since.get("key") is None:
+            return True
+
+        key_sql = self.quote(key) if key != "rowid" else "rowid"
+        changed_sql = self.quote(changed_column)
+        params = {"key": since["key"]}
+        if since.get("changed") is None:
+            edited = f"{changed_sql} IS NOT NULL"
+        else:
+            edited = f"{changed_sql} > :changed"
+            params["changed"] = since["changed"]
+        query = f"SELECT 1 FROM {self.quote(table_name)} WHERE {edited} AND {key_sql} <= :key LIMIT 1"
+        with self.engine.connect() as conn:
+            return conn.execute(text(query), params).first() is None
+
+    def iter_table(
+        self,
+        table_name: str,
+        batch_size: int = DB_BATCH_ROWS,
+        since: Optional[Dict[str, Any]] = None,
+        changed_column: Optional[str] = None
+    ):
+        """
+        Stream an entire table as documents of batch_size rows.
+
+        Pages are fetched with keyset pagination (WHERE key > last ORDER BY
+        key LIMIT n) on a streaming cursor, so memory stays flat and later
+        pages cost no more than earlier ones.
+
+        Incremental mode: pass since, the checkpoint a previous run left in
+        self.checkpoints[table_name], to read only rows with a key above the
+        last one seen (new rows). Check resumable() first: rows edited in
+        place are not read again. If the table has changed_column (e.g.
+        updated_at), the checkpoint also keeps its largest value, which is
+        how resumable() notices edits; rows where it stays NULL are not
+        noticed.
+        """
+        if not self.engine:
+            raise RuntimeError("Not connected to database. Call connect() first.")
+
+        column_names = [col["name"] for col in self.inspector.get_columns(table_name)]
+        key, changed_column = self._paging_columns(table_name, changed_column)
+        table = self.quote(table_name)
+        key_sql = self.quote(key) if key != "rowid" else "rowid"
+
+        if changed_column:
+            select = f"SELECT {key_sql} AS __key, {self.quote(changed_column)} AS __changed, * FROM {table}"
+        else:
+            select = f"SELECT {key_sql} AS __key, * FROM {table}"
+        last_key = since.get("key") if since else None
+        checkpoint = {
+            "key_column": key,
+            "key": last_key,
+            "changed_column": changed_column,
+            "changed": since.get("changed") if since and changed_column else None
+        }
+        self.checkpoints[table_name] = dict(checkpoint)
+        source = f"{Path(self.db_path).name}::{table_name}"
+        params: Dict[str, Any] = {"limit": batch_size}
+
+        with self.engine.connect().execution_options(stream_results=True) as conn:
+            while True:
+                where = ""
+                if last_key is not None:
+                    where = f"WHERE {key_sql} > :key"
+                    params["key"] = last_key
+                result = conn.execute(text(f"{select} {where} ORDER BY {key_sql} LIMIT :limit"), params)
+
+                lines = []
+                first_key = None
+                for row in result:
+                    mapping = row._mapping
+                    if first_key is None:
+                        first_key = mapping["__key"]
+                    last_key = mapping["__key"]
+                    if changed_column:
+                        changed = mapping["__changed"]
+                        if changed is not None and (checkpoint["changed"] is None or changed > checkpoint["changed"]):
+                            checkpoint["changed"] = changed
+                    lines.append(" | ".join(f"{col}: {mapping[col]}" for col in column_names))
+
+                if not lines:
+                    break
+
+                checkpoint["key"] = last_key
+                self.checkpoints[table_name] = dict(checkpoint)
+                yield {
+                    "content": "\n".join(
+                        [f"TABLE: {table_name} ({key} {first_key} to {last_key})",
+                         f"Columns: {', '.join(column_names)}",
+                         "-" * 80] + lines
+                    ),
+                    "metadata": {
+                        "source": source,
+                        "type": "database_table",
+                        "table": table_name,
+                        "key_column": key,
+                        "key_start": str(first_key),
+                        "key_end": str(last_key),
+                        "rows": len(lines)
+                    }
+                }
+
+                if len(lines) < batch_size:
+                    break
+
     def load_all_tables(self, limit: int = 50) -> list:
         """Load all tables from the database"""
         try:
@@ -127,3 +296,49 @@ def load_database_file(file_path: str, table_name: Optional[str] = None) -> list
 
     except Exception as e:
         raise ValueError(f"Error loading database: {e}")
+
+
+def iter_database_documents(
+    file_path: str,
+    batch_size: int = DB_BATCH_ROWS,
+    since: Optional[Dict[str, Any]] = None,
+    changed_column: Optional[str] = DB_CHANGED_COLUMN
+):
+    """
+    Stream every row of every table in a SQLite file, one document per
+    batch_size rows.
+
+    Returns (as the generator's return value) the state to pass as since on
+    the next run: {"tables": table -> checkpoint, "incremental": bool}.
+    With since, only rows added after those checkpoints are read (see
+    DatabaseLoader.iter_table), as long as every table allows it (see
+    DatabaseLoader.resumable) and none was dropped; otherwise every table is
+    read whole. "incremental" is False when the documents replace, rather
+    than add to, those of the previous run.
+    """
+    path = Path(file_path)
+
+    if not path.exists():
+        raise FileNotFoundError(f"Database file {file_path} not found")
+
+    tables = (since or {}).get("tables", {})
+    loader = DatabaseLoader(str(path))
+    loader.connect(str(path))
+    try:
+        table_names = loader.list_tables()
+        # Decided for the whole file: its previous documents are either all
+        # kept or all replaced
+        incremental = since is not None and set(tables) <= set(table_names) and all(
+            loader.resumable(table_name, checkpoint, changed_column)
+            for table_name, checkpoint in tables.items()
+        )
+        for table_name in table_names:
+            yield from loader.iter_table(
+                table_name,
+                batch_size=batch_size,
+                since=tables.get(table_name) if incremental else None,
+                changed_column=changed_column
+            )
+    finally:
+        loader.engine.dispose()
+    return {"tables": loader.checkpoints, "incremental": incremental}
@@ -1,16 +1,23 @@
 from pathlib import Path
-from docx import Document
 
-def load_docx_file(file_path: str) -> list:
+from loaders.ooxml import OOXML_FAST, extract_docx
+
+def load_docx_file(file_path: str, fast: bool = OOXML_FAST) -> list:
     """
     Extract text from Word (.docx) files.
     Returns list of document chunks with metadata.
+    With fast=True the XML is read directly instead of through python-docx.
     """
     path = Path(file_path)
 
     if not path.exists():
         raise FileNotFoundError(f"{file_path} not found")
 
+    if fast:
+        return extract_docx(file_path)
+
+    from docx import Document
+
     try:
         doc = Document(path)
     except Exception as e:
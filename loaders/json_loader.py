@@ -1,7 +1,44 @@
+import os
 from pathlib import Path
 import json
 from typing import Union
 
+# Records per streamed document; raise it for dumps of many tiny records
+JSON_RECORDS_PER_DOC = int(os.getenv("RAG_JSON_RECORDS_PER_DOC", "1"))
+JSON_READ_SIZE = 1 << 16
+JSON_LINES_EXTENSIONS = (".jsonl", ".ndjson")
+
+
+def flatten_json(obj, parent_key="", depth=0, max_depth=5, max_items=10):
+    """Recursively flatten JSON to readable text; max_items=None keeps every list item"""
+    if depth > max_depth:
+        return ""
+
+    items = []
+
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            key_str = f"{parent_key}.{k}" if parent_key else k
+            if isinstance(v, (dict, list)):
+                items.append(f"{key_str}:")
+                items.append(flatten_json(v, key_str, depth + 1, max_depth, max_items))
+            else:
+                items.append(f"{key_str}: {v}")
+
+    elif isinstance(obj, list):
+        shown = obj if max_items is None else obj[:max_items]
+        for i, item in enumerate(shown):
+            if isinstance(item, (dict, list)):
+                items.append(f"[{i}]:")
+                items.append(flatten_json(item, f"{parent_key}[{i}]", depth + 1, max_depth, max_items))
+            else:
+                items.append(f"[{i}]: {item}")
+        if len(obj) > len(shown):
+            items.append(f"... and {len(obj) - len(shown)} more items")
+
+    return "\n".join(items)
+
+
 def load_json_file(file_path: str) -> list:
     """
     Parse and extract text from JSON files.
@@ -12,49 +49,243 @@ def load_json_file(file_path: str) -> list:
     if not path.exists():
         raise FileNotFoundError(f"{file_path} not found")
 
+    if path.suffix.lower() in JSON_LINES_EXTENSIONS:
+        return list(iter_json_documents(file_path))
+
     try:
         with open(path, "r", encoding="utf-8") as f:
             data = json.load(f)
     except json.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON in {file_path}: {e}")
 
-    def flatten_json(obj, parent_key="", depth=0, max_depth=5):
-        """Recursively flatten JSON to readable text"""
-        if depth > max_depth:
-            return ""
-        
-        items = []
-        
-        if isinstance(obj, dict):
-            for k, v in obj.items():
-                key_str = f"{parent_key}.{k}" if parent_key else k
-                if isinstance(v, (dict, list)):
-                    items.append(f"{key_str}:")
-                    items.append(flatten_json(v, key_str, depth + 1, max_depth))
-                else:
-                    items.append(f"{key_str}: {v}")
-        
-        elif isinstance(obj, list):
-            for i, item in enumerate(obj[:10]):  # Limit to first 10 items
-                if isinstance(item, (dict, list)):
-                    items.append(f"[{i}]:")
-                    items.append(flatten_json(item, f"{parent_key}[{i}]", depth + 1, max_depth))
-                else:
-                    items.append(f"[{i}]: {item}")
-            if len(obj) > 10:
-                items.append(f"... and {len(obj) - 10} more items")
-        
-        return "\n".join(items)
-
     content = flatten_json(data)
-    
+
     docs = [{
         "content": content,
         "metadata": {
             "source": path.name,
             "type": "json",
-            "size": len(str(data))
+            "size": path.stat().st_size
         }
     }]
 
     return docs
+
+
+def _pointer(parent: str, token: Union[str, int]) -> str:
+    """Append a reference token to a JSON pointer (RFC 6901)"""
+    token = str(token).replace("~", "~0").replace("/", "~1")
+    return f"{parent}/{token}"
+
+
+# Characters that can follow a complete number, true, false or null
+_DELIMITERS = frozenset(",]} \t\r\n")
+
+
+class _JSONStream:
+    """
+    Incremental reader over a JSON text file.
+
+    Only the structure of the outer object or array is walked by hand;
+    every value is decoded with json.JSONDecoder.raw_decode from a buffer
+    that grows until the value fits, so memory is bounded by the largest
+    single value rather than the file.
+    """
+
+    def __init__(self, f, read_size: int = JSON_READ_SIZE):
+        self.f = f
+        self.read_size = read_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, minimum: int) -> bool:
+        """Read at least minimum more characters; False at end of file"""
+        if self.eof:
+            return False
+        chunk = self.f.read(max(minimum, self.read_size))
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop consumed text so the buffer only holds the value being parsed
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it ("" at end of file)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill(self.read_size):
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise json.JSONDecodeError(f"Expecting {char!r}", self.buffer, self.pos)
+        self.pos += 1
+
+    def value(self):
+        # Numbers, true, false and null have no closing character: one cut
+        # off by the read ("1." of 1.5, "12" of 123) still decodes, so it is
+        # only accepted once a delimiter or the end of the file follows it
+        scalar = self.peek() not in ('{', '[', '"')
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                if not scalar or self.eof or (end < len(self.buffer) and self.buffer[end] in _DELIMITERS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow geometrically so one large value is not re-parsed too often
+            self._fill(len(self.buffer) - self.pos)
+
+    def iter_array(self, pointer: str):
+        """Yield (pointer, value) for every element of the array at the cursor"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            yield _pointer(pointer, index), self.value()
+            index += 1
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("]")
+            return
+
+    def iter_object(self, pointer: str):
+        """
+        Yield the members of the object at the cursor. Array members are
+        streamed element by element; the other members are grouped into one
+        record at the object's own pointer, emitted before each streamed
+        array and at the end.
+        """
+        self.expect("{")
+        pending = {}
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            if self.peek() == "[":
+                if pending:
+                    yield pointer, pending
+                    pending = {}
+                yield from self.iter_array(_pointer(pointer, key))
+            else:
+                pending[key] = self.value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            break
+        if pending:
+            yield pointer, pending
+
+
+def iter_json_records(file_path: str):
+    """
+    Yield (json_pointer, value) records from a JSON or JSON Lines file.
+
+    JSON Lines files yield one record per non-empty line. A JSON array
+    yields its elements; a JSON object yields the elements of its array
+    members (e.g. the "data" list of an API dump) plus its other members
+    grouped together. Any other top-level value is a single record.
+    """
+    path = Path(file_path)
+
+    with open(path, "r", encoding="utf-8") as f:
+        if path.suffix.lower() in JSON_LINES_EXTENSIONS:
+            index = 0
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield _pointer("", index), json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Invalid JSON on line {line_number} of {file_path}: {e}")
+                index += 1
+            return
+
+        stream = _JSONStream(f)
+        try:
+            first = stream.peek()
+            if first == "[":
+                yield from stream.iter_array("")
+            elif first == "{":
+                yield from stream.iter_object("")
+            elif first:
+                yield "", stream.value()
+            if stream.peek():
+                raise json.JSONDecodeError("Extra data", stream.buffer, stream.pos)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in {file_path}: {e}")
+
+
+def _record_text(pointer: str, value) -> str:
+    """
+    Text of one record. A bare value streamed out of an array is labelled
+    with the array's key, as flatten_json would write it (more[0]: 3), so the
+    chunk still says what the number or string is.
+    """
+    if isinstance(value, (dict, list)):
+        return flatten_json(value, max_items=None)
+    if not pointer:
+        return str(value)
+    parent, _, index = pointer.rpartition("/")
+    key = parent.rpartition("/")[2].replace("~1", "/").replace("~0", "~")
+    return f"{key}[{index}]: {value}"
+
+
+def iter_json_documents(file_path: str, records_per_doc: int = JSON_RECORDS_PER_DOC):
+    """
+    Stream a JSON or JSON Lines file as documents of records_per_doc records
+    each, without loading the whole file. Every document records the JSON
+    pointer of its first record ("" for the top-level value) and its record
+    range.
+    """
+    path = Path(file_path)
+
+    if not path.exists():
+        raise FileNotFoundError(f"{file_path} not found")
+
+    doc_type = "jsonl" if path.suffix.lower() in JSON_LINES_EXTENSIONS else "json"
+    records_per_doc = max(1, records_per_doc)
+    batch = []
+    record_start = 0
+
+    def make_doc():
+        if records_per_doc == 1:
+            content = _record_text(*batch[0])
+        else:
+            content = "\n\n".join(f"{pointer or '(root)'}:\n{_record_text(pointer, value)}" for pointer, value in batch)
+        return {
+            "content": content,
+            "metadata": {
+                "source": path.name,
+                "type": doc_type,
+                "pointer": batch[0][0],
+                "record_start": record_start,
+                "record_end": record_start + len(batch) - 1
+            }
+        }
+
+    for record in iter_json_records(file_path):
+        batch.append(record)
+        if len(batch) >= records_per_doc:
+            yield make_doc()
+            record_start += len(batch)
+            batch = []
+
+    if batch:
+        yield make_doc()
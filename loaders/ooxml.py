@@ -0,0 +1,289 @@
+"""
+Fast text extraction for DOCX and PPTX files.
+
+Reads the document XML parts straight from the zip archive with iterparse
+instead of building python-docx / python-pptx object models. Each body
+paragraph, table or slide shape is processed as soon as its closing tag is
+parsed and then discarded, and the text rules mirror python-docx and
+python-pptx so the resulting documents are identical to the object-model
+loaders.
+"""
+import os
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Set RAG_OOXML_FAST=0 to load DOCX/PPTX through python-docx / python-pptx
+OOXML_FAST = os.getenv("RAG_OOXML_FAST", "1") != "0"
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+TABLE_URI = "http://schemas.openxmlformats.org/drawingml/2006/table"
+
+
+# -- Package parts ---------------------------------------------------------
+
+def _rels_path(part: str) -> str:
+    directory, name = posixpath.split(part)
+    return posixpath.join(directory, "_rels", name + ".rels")
+
+
+def _relationships(archive: zipfile.ZipFile, part: str) -> Dict[str, tuple]:
+    """rId -> (type, target part name) for a part ("" for the package)"""
+    try:
+        root = ET.fromstring(archive.read(_rels_path(part)))
+    except KeyError:
+        return {}
+    base = posixpath.dirname(part)
+    rels = {}
+    for rel in root.iter(PKG_REL + "Relationship"):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target", "")
+        if target.startswith("/"):
+            target = target.lstrip("/")
+        else:
+            target = posixpath.normpath(posixpath.join(base, target))
+        rels[rel.get("Id")] = (rel.get("Type"), target)
+    return rels
+
+
+def _main_part(archive: zipfile.ZipFile) -> str:
+    for rel_type, target in _relationships(archive, "").values():
+        if rel_type == OFFICE_DOCUMENT:
+            return target
+    raise ValueError("package has no main document part")
+
+
+def _iter_children(archive: zipfile.ZipFile, part: str, parent_tag: str):
+    """
+    Stream a part and yield each complete child element of the first
+    parent_tag element (e.g. w:body), clearing it once the caller is done.
+    """
+    depth = 0
+    parent_depth = None
+    parent = None
+    with archive.open(part) as f:
+        for event, element in ET.iterparse(f, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if parent_depth is None and element.tag == parent_tag:
+                    parent_depth = depth
+                    parent = element
+                continue
+            if parent_depth is not None and depth == parent_depth + 1:
+                yield element
+                element.clear()
+                parent.remove(element)
+            elif depth == parent_depth:
+                parent_depth = None
+                parent = None
+            depth -= 1
+
+
+# -- DOCX --------------------------------------------------------------------
+
+def _w_val(element, path: str) -> Optional[str]:
+    found = element.find(path)
+    return None if found is None else found.get(W + "val")
+
+
+def _docx_run_text(run) -> str:
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == W + "t":
+            parts.append(child.text or "")
+        elif tag in (W + "tab", W + "ptab"):
+            parts.append("\t")
+        elif tag == W + "br":
+            # Page and column breaks have no text equivalent
+            if child.get(W + "type", "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag == W + "cr":
+            parts.append("\n")
+        elif tag == W + "noBreakHyphen":
+            parts.append("-")
+    return "".join(parts)
+
+
+def _docx_paragraph_text(paragraph) -> str:
+    parts = []
+    for child in paragraph:
+        if child.tag == W + "r":
+            parts.append(_docx_run_text(child))
+        elif child.tag == W + "hyperlink":
+            parts.extend(_docx_run_text(run) for run in child.findall(W + "r"))
+    return "".join(parts)
+
+
+def _docx_table_rows(table) -> List[List[str]]:
+    """
+    Cell texts per row, one entry per layout-grid column a cell spans
+    (gridSpan). Vertically merged continuation cells (vMerge) repeat the
+    cell that starts the merge, as python-docx does.
+    """
+    grid_rows = []  # per row: {grid offset: (span, text, is_continuation)}
+    rows = []
+    for tr in table.findall(W + "tr"):
+        offset = int(_w_val(tr, f"{W}trPr/{W}gridBefore") or 0)
+        cells = {}
+        for tc in tr.findall(W + "tc"):
+            span = int(_w_val(tc, f"{W}tcPr/{W}gridSpan") or 1)
+            merge = tc.find(f"{W}tcPr/{W}vMerge")
+            continuation = merge is not None and merge.get(W + "val", "continue") == "continue"
+            text = "\n".join(_docx_paragraph_text(p) for p in tc.findall(W + "p"))
+            cells[offset] = (span, text, continuation)
+            offset += span
+        grid_rows.append(cells)
+
+        row = []
+        for offset, (span, text, continuation) in cells.items():
+            if continuation:
+                # Walk up to the cell at the same grid offset that starts the merge
+                for above in reversed(grid_rows[:-1]):
+                    if offset not in above:
+                        break
+                    span, text, continuation = above[offset]
+                    if not continuation:
+                        break
+            row.extend([text.strip()] * span)
+        rows.append(row)
+    return rows
+
+
+def extract_docx(file_path: str) -> list:
+    """Same documents as loaders.docx_loader.load_docx_file, without python-docx"""
+    path = Path(file_path)
+
+    try:
+        archive = zipfile.ZipFile(path)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise ValueError(f"Error reading DOCX file {file_path}: {e}")
+
+    paragraphs = []
+    paragraph_count = 0
+    tables = []
+    with archive:
+        try:
+            part = _main_part(archive)
+            for element in _iter_children(archive, part, W + "body"):
+                if element.tag == W + "p":
+                    paragraph_count += 1
+                    text = _docx_paragraph_text(element)
+                    if text.strip():
+                        paragraphs.append(text)
+                elif element.tag == W + "tbl":
+                    tables.append(_docx_table_rows(element))
+        except (KeyError, ET.ParseError) as e:
+            raise ValueError(f"Error reading DOCX file {file_path}: {e}")
+
+    content_parts = paragraphs + [
+        "TABLE:\n" + "\n".join(" | ".join(row) for row in rows)
+        for rows in tables if rows
+    ]
+
+    if not content_parts:
+        return []
+
+    return [{
+        "content": "\n\n".join(content_parts),
+        "metadata": {
+            "source": path.name,
+            "type": "docx",
+            "paragraphs": paragraph_count,
+            "tables": len(tables)
+        }
+    }]
+
+
+# -- PPTX --------------------------------------------------------------------
+
+def _pptx_text_body(text_body) -> str:
+    """Paragraphs joined by newlines; line breaks become vertical tabs"""
+    if text_body is None:
+        return ""
+    paragraphs = []
+    for paragraph in text_body.findall(A + "p"):
+        parts = []
+        for child in paragraph:
+            if child.tag in (A + "r", A + "fld"):
+                parts.append(child.findtext(A + "t") or "")
+            elif child.tag == A + "br":
+                parts.append("\v")
+        paragraphs.append("".join(parts))
+    return "\n".join(paragraphs)
+
+
+def _pptx_shape_texts(shape) -> List[str]:
+    """Text of one top-level slide shape, as python-pptx's shape.text / shape.table"""
+    texts = []
+    if shape.tag == P + "sp":
+        text = _pptx_text_body(shape.find(P + "txBody"))
+        if text.strip():
+            texts.append(text)
+    elif shape.tag == P + "graphicFrame":
+        data = shape.find(f"{A}graphic/{A}graphicData")
+        if data is not None and data.get("uri") == TABLE_URI:
+            table_text = [
+                " | ".join(
+                    _pptx_text_body(tc.find(A + "txBody")).strip()
+                    for tc in tr.findall(A + "tc")
+                )
+                for tr in data.iterfind(f"{A}tbl/{A}tr")
+            ]
+            if table_text:
+                texts.append("TABLE:\n" + "\n".join(table_text))
+    return texts
+
+
+def slide_parts(archive: zipfile.ZipFile) -> List[str]:
+    """Slide part names in presentation order (p:sldIdLst)"""
+    presentation = _main_part(archive)
+    rels = _relationships(archive, presentation)
+    root = ET.fromstring(archive.read(presentation))
+    slide_ids = root.find(P + "sldIdLst")
+    if slide_ids is None:
+        return []
+    return [rels[sld.get(R + "id")][1] for sld in slide_ids.findall(P + "sldId")]
+
+
+def extract_pptx(file_path: str) -> list:
+    """Same documents as loaders.pptx_loader.load_pptx_file, without python-pptx"""
+    path = Path(file_path)
+
+    try:
+        archive = zipfile.ZipFile(path)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise ValueError(f"Error reading PPTX file {file_path}: {e}")
+
+    docs = []
+    with archive:
+        try:
+            slides = slide_parts(archive)
+            for slide_num, part in enumerate(slides, 1):
+                slide_content = []
+                for shape in _iter_children(archive, part, P + "spTree"):
+                    slide_content.extend(_pptx_shape_texts(shape))
+
+                # Only add non-empty slides
+                if slide_content:
+                    docs.append({
+                        "content": "\n\n".join(slide_content),
+                        "metadata": {
+                            "source": path.name,
+                            "slide": slide_num,
+                            "type": "pptx",
+                            "total_slides": len(slides)
+                        }
+                    })
+        except (KeyError, ET.ParseError) as e:
+            raise ValueError(f"Error reading PPTX file {file_path}: {e}")
+
+    return docs
@@ -1,25 +1,191 @@
+import os
+import hashlib
+import sqlite3
+import threading
+import multiprocessing
 from pathlib import Path
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import pypdf
 from pypdf import PdfReader
 
-def load_pdf_file(file_path: str) -> list:
+# Extracted page text, keyed by file content hash, pypdf version and page.
+# Kept outside the Chroma directory so rebuilding the store reuses it.
+PDF_TEXT_CACHE_PATH = os.getenv("RAG_PDF_TEXT_CACHE", "vector_store/pdf_text_cache.sqlite3")
+# Worker processes for page extraction (0 = CPU count, 1 = serial)
+PDF_PAGE_WORKERS = int(os.getenv("RAG_PDF_PAGE_WORKERS", "0"))
+# Pages per worker task; each task opens the PDF once
+PDF_PAGES_PER_TASK = int(os.getenv("RAG_PDF_PAGES_PER_TASK", "8"))
+# Set in the workers of another process pool (e.g. ingest's file pool) to
+# the page workers a PDF parsed there may start; unset means 1 (serial)
+PDF_NESTED_PAGE_WORKERS_ENV = "RAG_PDF_NESTED_PAGE_WORKERS"
+
+_EXTRACTOR = f"pypdf-{pypdf.__version__}"
+
+
+def _file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PdfTextCache:
+    """SQLite store of extracted text per (file hash, page)"""
+
+    def __init__(self, path: str = PDF_TEXT_CACHE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "file_hash TEXT NOT NULL, extractor TEXT NOT NULL, page INTEGER NOT NULL, "
+            "text TEXT NOT NULL, PRIMARY KEY (file_hash, extractor, page))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "file_hash TEXT NOT NULL, extractor TEXT NOT NULL, pages INTEGER NOT NULL, "
+            "PRIMARY KEY (file_hash, extractor))"
+        )
+        self._conn.commit()
+
+    def page_count(self, file_hash: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pages FROM documents WHERE file_hash = ? AND extractor = ?",
+                (file_hash, _EXTRACTOR)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_pages(self, file_hash: str) -> Dict[int, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page, text FROM pages WHERE file_hash = ? AND extractor = ?",
+                (file_hash, _EXTRACTOR)
+            )
+            return dict(rows.fetchall())
+
+    def put_pages(self, file_hash: str, page_count: int, pages: Dict[int, str]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (file_hash, extractor, pages) VALUES (?, ?, ?)",
+                (file_hash, _EXTRACTOR, page_count)
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (file_hash, extractor, page, text) VALUES (?, ?, ?, ?)",
+                [(file_hash, _EXTRACTOR, page, text) for page, text in pages.items()]
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[PdfTextCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_text_cache() -> Optional[PdfTextCache]:
+    """Process-wide page cache; None when RAG_PDF_TEXT_CACHE is empty"""
+    global _cache
+    if not PDF_TEXT_CACHE_PATH:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = PdfTextCache(PDF_TEXT_CACHE_PATH)
+        return _cache
+
+
+def _extract_pages(path: str, pages: List[int]) -> List[Tuple[int, str]]:
+    """Extract the given 1-based pages; runs in a worker process"""
+    reader = PdfReader(path)
+    return [(page, reader.pages[page - 1].extract_text() or "") for page in pages]
+
+
+def _page_workers(max_workers: Optional[int]) -> int:
+    if max_workers is None:
+        max_workers = PDF_PAGE_WORKERS
+    if max_workers <= 0:
+        max_workers = os.cpu_count() or 1
+    # Inside a worker process (e.g. ingest's file pool) the cores are shared
+    # with the other files being parsed: only use the share granted to it
+    if multiprocessing.parent_process() is not None:
+        try:
+            nested = int(os.environ.get(PDF_NESTED_PAGE_WORKERS_ENV, "1"))
+        except ValueError:
+            nested = 1
+        max_workers = min(max_workers, max(1, nested))
+    return max_workers
+
+
+def _iter_extracted(path: Path, pages: List[int], max_workers: Optional[int] = None):
+    """Yield extracted (page, text) lists task by task, in page order"""
+    tasks = [pages[i:i + PDF_PAGES_PER_TASK] for i in range(0, len(pages), PDF_PAGES_PER_TASK)]
+    workers = min(_page_workers(max_workers), len(tasks))
+    if workers <= 1:
+        for task in tasks:
+            yield _extract_pages(str(path), task)
+        return
+
+    # Spawned, not forked: ingest has loaded torch (and its threads) by now,
+    # and a forked child inherits their locks in whatever state they were
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        yield from pool.map(_extract_pages, repeat(str(path)), tasks)
+
+
+def iter_pdf_documents(file_path: str, max_workers: Optional[int] = None):
+    """
+    Yield one document per non-empty page, in page order.
+
+    Page text is served from the persistent cache when this exact file
+    content was extracted before. Missing pages are extracted in parallel
+    worker processes and cached as each task finishes, so re-ingesting (or
+    re-chunking) never re-runs pypdf and an interrupted run keeps its
+    progress.
+    """
     path = Path(file_path)
 
     if not path.exists():
         raise FileNotFoundError(f"{file_path} not found")
 
-    reader = PdfReader(path)
-    docs = []
+    cache = get_text_cache()
+    digest = _file_hash(path) if cache else None
+    page_count = cache.page_count(digest) if cache else None
+    texts = cache.get_pages(digest) if page_count is not None else {}
 
-    for i, page in enumerate(reader.pages):
-        text = page.extract_text()
+    if page_count is None:
+        page_count = len(PdfReader(path).pages)
+    missing = [page for page in range(1, page_count + 1) if page not in texts]
+    extracted = _iter_extracted(path, missing, max_workers)
+
+    for page in range(1, page_count + 1):
+        while page not in texts:
+            batch = dict(next(extracted))
+            texts.update(batch)
+            if cache:
+                cache.put_pages(digest, page_count, batch)
+
+        text = texts.pop(page)
         if text and text.strip():
-            docs.append({
+            yield {
                 "content": text,
                 "metadata": {
                     "source": path.name,
-                    "page": i + 1,
+                    "page": page,
                     "type": "pdf"
                 }
-            })
+            }
+
 
-    return docs
+def load_pdf_file(file_path: str, max_workers: Optional[int] = None) -> list:
+    """Extract every non-empty page of a PDF, using the page text cache"""
+    return list(iter_pdf_documents(file_path, max_workers))
@@ -1,22 +1,30 @@
 from pathlib import Path
-from pptx import Presentation
 
-def load_pptx_file(file_path: str) -> list:
+from loaders.ooxml import OOXML_FAST, extract_pptx
+
+def load_pptx_file(file_path: str, fast: bool = OOXML_FAST) -> list:
     """
     Extract text from PowerPoint (.pptx) files.
     Returns list of slides with text content and metadata.
+    With fast=True the XML is read directly instead of through python-pptx.
     """
     path = Path(file_path)
 
     if not path.exists():
         raise FileNotFoundError(f"{file_path} not found")
 
+    if fast:
+        return extract_pptx(file_path)
+
+    from pptx import Presentation
+
     try:
         prs = Presentation(path)
     except Exception as e:
         raise ValueError(f"Error reading PPTX file {file_path}: {e}")
 
     docs = []
+    total_slides = len(prs.slides)
 
     for slide_num, slide in enumerate(prs.slides, 1):
         slide_content = []
@@ -44,7 +52,7 @@ def load_pptx_file(file_path: str) -> list:
                     "source": path.name,
                     "slide": slide_num,
                     "type": "pptx",
-                    "total_slides": len(prs.slides)
+                    "total_slides": total_slides
                 }
             })
 
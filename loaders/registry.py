@@ -0,0 +1,227 @@
+import os
+import importlib
+import threading
+from typing import Callable, Dict, Iterable, Optional, Union
+
+# Entry point group third-party packages use to add loaders, e.g. in pyproject.toml:
+#   [project.entry-points."unified_rag.loaders"]
+#   ".epub" = "my_package.epub_loader:load_epub_file"
+ENTRY_POINT_GROUP = "unified_rag.loaders"
+
+# A loader is a callable taking a file path and returning a list of
+# {"content", "metadata"} documents (or a single such dict), or a
+# "module:function" string that is imported on first use.
+Loader = Union[str, Callable]
+
+_BUILTIN_LOADERS = {
+    ".txt": "loaders.text_loader:load_text_file",
+    ".md": "loaders.text_loader:load_text_file",
+    ".pdf": "loaders.pdf_loader:load_pdf_file",
+    ".docx": "loaders.docx_loader:load_docx_file",
+    ".pptx": "loaders.pptx_loader:load_pptx_file",
+    ".json": "loaders.json_loader:load_json_file",
+    ".jsonl": "loaders.json_loader:load_json_file",
+    ".ndjson": "loaders.json_loader:load_json_file",
+    ".xml": "loaders.xml_loader:load_xml_file",
+    ".csv": "loaders.csv_loader:load_csv_file",
+    ".db": "loaders.database_loader:load_database_file",
+    ".sqlite": "loaders.database_loader:load_database_file",
+    ".sqlite3": "loaders.database_loader:load_database_file",
+}
+
+# Loaders that yield documents lazily. Ingestion runs them on its loader
+# pool and takes their documents a batch at a time, so very large files
+# never sit in memory as a whole. A register_loader call for one of these
+# extensions replaces its built-in streaming loader as well.
+_BUILTIN_STREAMING_LOADERS = {
+    ".pdf": "loaders.pdf_loader:iter_pdf_documents",
+    ".csv": "loaders.csv_loader:iter_csv_documents",
+    ".json": "loaders.json_loader:iter_json_documents",
+    ".jsonl": "loaders.json_loader:iter_json_documents",
+    ".ndjson": "loaders.json_loader:iter_json_documents",
+    ".xml": "loaders.xml_loader:iter_xml_documents",
+    ".db": "loaders.database_loader:iter_database_documents",
+    ".sqlite": "loaders.database_loader:iter_database_documents",
+    ".sqlite3": "loaders.database_loader:iter_database_documents",
+}
+# Set RAG_STREAMING_LOADERS=0 to load every file in one piece instead
+STREAMING_LOADERS_ENABLED = os.getenv("RAG_STREAMING_LOADERS", "1") != "0"
+
+_BUILTIN_MIME_TYPES = {
+    "text/plain": ".txt",
+    "text/markdown": ".md",
+    "application/pdf": ".pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation": ".pptx",
+    "application/json": ".json",
+    "application/jsonl": ".jsonl",
+    "application/x-ndjson": ".ndjson",
+    "application/xml": ".xml",
+    "text/xml": ".xml",
+    "text/csv": ".csv",
+    "application/vnd.sqlite3": ".sqlite",
+    "application/x-sqlite3": ".sqlite",
+}
+
+_loaders: Dict[str, Loader] = dict(_BUILTIN_LOADERS)
+_mime_types: Dict[str, Loader] = {
+    mime: _BUILTIN_LOADERS[ext] for mime, ext in _BUILTIN_MIME_TYPES.items()
+}
+_streaming_loaders: Dict[str, Loader] = dict(_BUILTIN_STREAMING_LOADERS)
+_resolved: Dict[str, Callable] = {}
+_lock = threading.Lock()
+_entry_points_loaded = False
+
+
+def _normalize_extension(extension: str) -> str:
+    extension = extension.lower()
+    return extension if extension.startswith(".") else "." + extension
+
+
+def register_loader(
+    extensions: Union[str, Iterable[str]],
+    loader: Loader,
+    mime_types: Iterable[str] = ()
+):
+    """
+    Register a loader for one or more file extensions and MIME types,
+    replacing any existing registration, including a built-in streaming
+    loader for the extension (use register_streaming_loader to stream it).
+    """
+    if isinstance(extensions, str):
+        extensions = [extensions]
+    with _lock:
+        for extension in extensions:
+            extension = _normalize_extension(extension)
+            _loaders[extension] = loader
+            builtin = _BUILTIN_STREAMING_LOADERS.get(extension)
+            if builtin is not None and _streaming_loaders.get(extension) == builtin \
+                    and loader != _BUILTIN_LOADERS.get(extension):
+                del _streaming_loaders[extension]
+        for mime_type in mime_types:
+            _mime_types[mime_type] = loader
+
+
+def register_streaming_loader(extensions: Union[str, Iterable[str]], loader: Loader):
+    """Register a loader that returns an iterator of documents for one or more extensions"""
+    if isinstance(extensions, str):
+        extensions = [extensions]
+    with _lock:
+        for extension in extensions:
+            _streaming_loaders[_normalize_extension(extension)] = loader
+
+
+def load_entry_points():
+    """Register loaders advertised by installed packages (once per process)"""
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return
+
+    try:
+        found = entry_points()
+        if hasattr(found, "select"):
+            found = found.select(group=ENTRY_POINT_GROUP)
+        else:
+            found = found.get(ENTRY_POINT_GROUP, [])
+    except Exception:
+        return
+
+    for entry_point in found:
+        # Store the "module:attr" target so the plugin is only imported when used
+        register_loader(entry_point.name, entry_point.value)
+
+
+def _resolve(loader: Loader) -> Callable:
+    if callable(loader):
+        return loader
+    with _lock:
+        resolved = _resolved.get(loader)
+        if resolved is None:
+            module_name, _, attr = loader.partition(":")
+            resolved = getattr(importlib.import_module(module_name), attr)
+            _resolved[loader] = resolved
+    return resolved
+
+
+def get_loader(path: str, mime_type: Optional[str] = None) -> Optional[Callable]:
+    """
+    Find the loader for a file by extension, falling back to its MIME type
+    (given, or guessed from the name). The loader's module is imported here,
+    the first time it is needed.
+    """
+    load_entry_points()
+    extension = os.path.splitext(path)[1].lower()
+    loader = _loaders.get(extension)
+
+    if loader is None:
+        if mime_type is None:
+            import mimetypes
+            mime_type = mimetypes.guess_type(path)[0]
+        loader = _mime_types.get(mime_type) if mime_type else None
+
+    return _resolve(loader) if loader is not None else None
+
+
+def get_streaming_loader(path: str) -> Optional[Callable]:
+    """The streaming loader for a file, or None if it has none or streaming is disabled"""
+    if not STREAMING_LOADERS_ENABLED:
+        return None
+    # Plugins registered for a streamed extension take it over
+    load_entry_points()
+    loader = _streaming_loaders.get(os.path.splitext(path)[1].lower())
+    return _resolve(loader) if loader is not None else None
+
+
+class DocumentStream:
+    """
+    A streaming loader's documents. Once they are exhausted, state holds
+    what the loader returned (e.g. a database's checkpoints for the next
+    incremental read), or None.
+    """
+
+    def __init__(self, docs: Iterable[dict]):
+        self._docs = iter(docs)
+        self.state = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> dict:
+        try:
+            return next(self._docs)
+        except StopIteration as stop:
+            self.state = stop.value
+            raise
+
+
+def stream_file(path: str, since=None) -> Optional[DocumentStream]:
+    """
+    Open a file with its streaming loader, or None if it has none. since,
+    the state a previous stream of the file ended with, is passed to the
+    loader so it can read only what changed.
+    """
+    loader = get_streaming_loader(path)
+    if loader is None:
+        return None
+    return DocumentStream(loader(path) if since is None else loader(path, since=since))
+
+
+def supported_extensions() -> tuple:
+    """All registered extensions, e.g. for filtering directory listings"""
+    load_entry_points()
+    return tuple(sorted(_loaders))
+
+
+def load_file(path: str) -> list:
+    """Load a file with its registered loader; unsupported files yield no documents"""
+    loader = get_loader(path)
+    if loader is None:
+        return []
+    docs = loader(path)
+    return [docs] if isinstance(docs, dict) else list(docs)
@@ -1,6 +1,54 @@
+import os
 from pathlib import Path
 import xml.etree.ElementTree as ET
 from xml.dom import minidom
+from typing import Optional
+
+# Tag of the repeating record element for streaming; unset means every
+# child of the root element is a record
+XML_RECORD_TAG = os.getenv("RAG_XML_RECORD_TAG") or None
+
+
+def _local_name(tag: str) -> str:
+    """Tag without its {namespace} prefix"""
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else str(tag)
+
+
+def _format_element(element, level=0, counter=None):
+    """Recursively extract text from XML elements as indented pseudo-tags"""
+    lines = []
+    indent = "  " * level
+    if counter is not None:
+        counter[0] += 1
+
+    # Add element tag and attributes
+    attrs = " ".join([f'{k}="{v}"' for k, v in element.attrib.items()])
+    tag_line = f"{indent}<{element.tag} {attrs}>" if attrs else f"{indent}<{element.tag}>"
+    lines.append(tag_line)
+
+    # Add text content if exists
+    if element.text and element.text.strip():
+        lines.append(f"{indent}  {element.text.strip()}")
+
+    # Process child elements
+    for child in element:
+        lines.extend(_format_element(child, level + 1, counter))
+
+    # Add closing tag
+    lines.append(f"{indent}</{element.tag}>")
+
+    return lines
+
+
+def _drop_finished(stack: list):
+    """Detach finished elements kept for the root fallback once a record shows up"""
+    for parent, child in zip(stack, stack[1:]):
+        # Siblings after child may already be parsed, but not yet seen
+        for element in list(parent):
+            if element is child:
+                break
+            parent.remove(element)
+
 
 def load_xml_file(file_path: str) -> list:
     """
@@ -18,30 +66,9 @@ def load_xml_file(file_path: str) -> list:
     except ET.ParseError as e:
         raise ValueError(f"Invalid XML in {file_path}: {e}")
 
-    def extract_text(element, level=0):
-        """Recursively extract text from XML elements"""
-        lines = []
-        indent = "  " * level
-
-        # Add element tag and attributes
-        attrs = " ".join([f'{k}="{v}"' for k, v in element.attrib.items()])
-        tag_line = f"{indent}<{element.tag} {attrs}>" if attrs else f"{indent}<{element.tag}>"
-        lines.append(tag_line)
-
-        # Add text content if exists
-        if element.text and element.text.strip():
-            lines.append(f"{indent}  {element.text.strip()}")
-
-        # Process child elements
-        for child in element:
-            lines.extend(extract_text(child, level + 1))
-
-        # Add closing tag
-        lines.append(f"{indent}</{element.tag}>")
-
-        return lines
-
-    content = "\n".join(extract_text(root))
+    # Count elements while formatting instead of walking the tree twice
+    counter = [0]
+    content = "\n".join(_format_element(root, counter=counter))
 
     docs = [{
         "content": content,
@@ -49,8 +76,88 @@ def load_xml_file(file_path: str) -> list:
             "source": path.name,
             "type": "xml",
             "root_tag": root.tag,
-            "element_count": len(list(root.iter()))
+            "element_count": counter[0]
         }
     }]
 
     return docs
+
+
+def iter_xml_documents(file_path: str, record_tag: Optional[str] = XML_RECORD_TAG):
+    """
+    Stream an XML file as one document per record element.
+
+    Parsing uses iterparse and every finished element is detached from its
+    parent, so memory is bounded by the largest single record rather than
+    the file. Records are elements named record_tag (namespace ignored, not
+    nested inside another record); without record_tag every child of the
+    root is a record. Each document carries its XPath-style location, e.g.
+    /export[1]/record[42].
+
+    A file without records (a lone root, or no element named record_tag)
+    becomes one document of the whole root element, as load_xml_file
+    would produce, so it is never recorded as ingested with no chunks.
+    """
+    path = Path(file_path)
+
+    if not path.exists():
+        raise FileNotFoundError(f"{file_path} not found")
+
+    stack = []        # open elements, root first
+    positions = []    # "name[n]" step for each open element
+    sibling_counts = [{}]
+    record_depth = None
+    record_index = 0
+    root_tag = None
+
+    try:
+        for event, element in ET.iterparse(str(path), events=("start", "end")):
+            if event == "start":
+                name = _local_name(element.tag)
+                counts = sibling_counts[-1]
+                counts[name] = counts.get(name, 0) + 1
+                positions.append(f"{name}[{counts[name]}]")
+                sibling_counts.append({})
+                stack.append(element)
+                if root_tag is None:
+                    root_tag = element.tag
+
+                if record_depth is None:
+                    is_record = (
+                        name == record_tag if record_tag
+                        else len(stack) == 2
+                    )
+                    if is_record:
+                        record_depth = len(stack)
+                        if not record_index:
+                            _drop_finished(stack)
+                continue
+
+            depth = len(stack)
+            # The root stands in for the records if there were none
+            if depth == record_depth or (depth == 1 and not record_index):
+                record_index += 1
+                xpath = "/" + "/".join(positions)
+                yield {
+                    "content": "\n".join(_format_element(element)),
+                    "metadata": {
+                        "source": path.name,
+                        "type": "xml",
+                        "root_tag": root_tag,
+                        "record_tag": _local_name(element.tag),
+                        "record": record_index,
+                        "xpath": xpath
+                    }
+                }
+                record_depth = None
+
+            stack.pop()
+            positions.pop()
+            sibling_counts.pop()
+            # Outside a record nothing needs the finished subtree any more,
+            # unless no record has been found yet and the root may be the fallback
+            if record_depth is None and stack and record_index:
+                element.clear()
+                stack[-1].remove(element)
+    except ET.ParseError as e:
+        raise ValueError(f"Invalid XML in {file_path}: {e}")
@@ -0,0 +1,613 @@
+import os
+import json
+import mmap
+import pickle
+import shutil
+import itertools
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from filters import FieldIndex, matches
+
+# "chroma" queries the Chroma store directly; "numpy" queries the
+# memory-mapped export of it written after every ingestion
+VECTOR_BACKEND = os.getenv("RAG_VECTOR_BACKEND", "chroma")
+# Storage type of the exported vectors: float32 is exact and fastest to score,
+# float16 halves memory and disk at the cost of converting each block on search
+NUMPY_DTYPE = os.getenv("RAG_NUMPY_DTYPE", "float32")
+# Compressed copy of the vectors scanned at query time: "none", "int8"
+# (scalar quantization per dimension), "pca" (projection fitted on the
+# corpus) or "pca-int8" (both)
+NUMPY_COMPRESSION = os.getenv("RAG_NUMPY_COMPRESSION", "none")
+# Output dimensions of the PCA projection
+NUMPY_PCA_DIM = int(os.getenv("RAG_NUMPY_PCA_DIM", "128"))
+# Candidates re-scored against the full vectors after a compressed scan;
+# 0 drops the full vectors from the index entirely
+NUMPY_RESCORE = int(os.getenv("RAG_NUMPY_RESCORE", "0"))
+# Rows scored per matrix-vector product during search
+SEARCH_BLOCK_ROWS = 16384
+# Smaller blocks for float16/int8 data, so each float32 copy stays in cache
+CONVERTED_BLOCK_ROWS = 2048
+# Filters matching more than this share of rows scan every row and mask the
+# rest, which is cheaper than gathering scattered rows
+FILTER_SCAN_FRACTION = 0.5
+# Rows sampled to fit the PCA projection
+PCA_SAMPLE_ROWS = 50000
+# Share of the index one ingest run may change before the export is redone
+# whole, which also refits the compression codec to the new corpus
+UPDATE_MAX_FRACTION = 0.5
+
+INDEX_DIRNAME = "numpy_index"
+INDEX_VERSION = 1
+VECTORS_FILE = "vectors.npy"
+SQ_NORMS_FILE = "sq_norms.npy"
+OFFSETS_FILE = "offsets.npy"
+CODES_FILE = "codes.npy"
+CODE_SQ_NORMS_FILE = "code_sq_norms.npy"
+CODEC_FILE = "codec.npz"
+FIELDS_FILE = "fields.pkl"
+META_FILE = "index.json"
+COMPRESSIONS = ("none", "int8", "pca", "pca-int8")
+
+# String columns, one UTF-8 blob each, in offsets.npy row order
+ID, TEXT, METADATA = 0, 1, 2
+COLUMN_FILES = ("ids.bin", "texts.bin", "metadatas.bin")
+
+
+def index_dir(vector_db_dir: str) -> str:
+    """Kept inside the store directory, so deleting the store removes it"""
+    return os.path.join(vector_db_dir, INDEX_DIRNAME)
+
+
+def index_stamp(vector_db_dir: str) -> Optional[float]:
+    """Modification time of the exported index (changes on every export), or None"""
+    try:
+        return os.stat(os.path.join(index_dir(vector_db_dir), META_FILE)).st_mtime
+    except OSError:
+        return None
+
+
+class Codec:
+    """
+    Compression of stored vectors: an optional PCA projection followed by
+    optional int8 scalar quantization (per-dimension range split into 256
+    levels). Queries are projected the same way and scored directly
+    against the codes, so distances are those between the projections (a
+    lower bound on the full distance) until re-scored.
+    """
+
+    def __init__(self, kind: str, mean=None, components=None, low=None, scale=None):
+        if kind not in COMPRESSIONS or kind == "none":
+            raise ValueError(f"Unknown compression: {kind}")
+        self.kind = kind
+        self.mean = mean
+        self.components = components
+        self.low = low
+        self.scale = scale
+
+    @property
+    def quantized(self) -> bool:
+        return self.kind.endswith("int8")
+
+    @classmethod
+    def fit(cls, vectors, kind: str, pca_dim: int = NUMPY_PCA_DIM, block_rows: int = SEARCH_BLOCK_ROWS) -> "Codec":
+        codec = cls(kind)
+        count = len(vectors)
+        if kind.startswith("pca"):
+            rows = np.arange(count)
+            if count > PCA_SAMPLE_ROWS:
+                rows = np.sort(np.random.default_rng(0).choice(count, PCA_SAMPLE_ROWS, replace=False))
+            sample = np.asarray(vectors[rows], dtype=np.float32)
+            codec.mean = sample.mean(axis=0)
+            _, _, vt = np.linalg.svd(sample - codec.mean, full_matrices=False)
+            codec.components = np.ascontiguousarray(vt[:min(pca_dim, len(vt))], dtype=np.float32)
+        if codec.quantized:
+            # Ranges over every row, so no stored value is clipped
+            low, high = None, None
+            for start in range(0, count, block_rows):
+                block = codec.project(np.asarray(vectors[start:start + block_rows], dtype=np.float32))
+                low = block.min(axis=0) if low is None else np.minimum(low, block.min(axis=0))
+                high = block.max(axis=0) if high is None else np.maximum(high, block.max(axis=0))
+            codec.low = low
+            codec.scale = np.maximum((high - low) / 255.0, 1e-12).astype(np.float32)
+        return codec
+
+    @classmethod
+    def load(cls, path: str) -> "Codec":
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in data.files if name != "kind"}
+            return cls(str(data["kind"]), **arrays)
+
+    def save(self, path: str):
+        arrays = {
+            name: value for name, value in
+            (("mean", self.mean), ("components", self.components), ("low", self.low), ("scale", self.scale))
+            if value is not None
+        }
+        np.savez(path, kind=np.array(self.kind), **arrays)
+
+    @property
+    def dim(self) -> Optional[int]:
+        return None if self.components is None else len(self.components)
+
+    def project(self, x: np.ndarray) -> np.ndarray:
+        return x if self.components is None else (x - self.mean) @ self.components.T
+
+    def encode(self, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(codes, squared norms of the decoded codes) for a block"""
+        projected = self.project(x)
+        if self.quantized:
+            codes = (np.clip(np.rint((projected - self.low) / self.scale), 0, 255) - 128).astype(np.int8)
+        else:
+            codes = projected.astype(np.float32)
+        decoded = self.decode(codes)
+        return codes, (decoded * decoded).sum(axis=1)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        if not self.quantized:
+            return np.asarray(codes, dtype=np.float32)
+        return (codes.astype(np.float32) + 128.0) * self.scale + self.low
+
+    def query(self, vector: np.ndarray) -> Tuple[np.ndarray, float, float]:
+        """
+        (weights, bias, constant) such that the estimated squared distance of
+        a row is sq_norm - 2 * (codes @ weights + bias) + constant.
+        """
+        projected = self.project(vector[None, :])[0]
+        constant = float(projected @ projected)
+        if not self.quantized:
+            return projected, 0.0, constant
+        # decoded . q = codes . (scale * q) + (128 * scale + low) . q
+        return self.scale * projected, float((128.0 * self.scale + self.low) @ projected), constant
+
+
+def compress_index(directory: str, kind: str, keep_exact: bool, pca_dim: int = NUMPY_PCA_DIM, block_rows: int = SEARCH_BLOCK_ROWS):
+    """Add the compressed codes of an index's vectors; drops the vectors unless keep_exact"""
+    vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+    codec = Codec.fit(vectors, kind, pca_dim, block_rows)
+    count = len(vectors)
+    dim = codec.dim or vectors.shape[1]
+    codes = np.lib.format.open_memmap(
+        os.path.join(directory, CODES_FILE), mode="w+",
+        dtype=np.int8 if codec.quantized else np.float32, shape=(count, dim)
+    )
+    sq_norms = np.zeros(count, dtype=np.float32)
+    for start in range(0, count, block_rows):
+        block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+        codes[start:start + len(block)], sq_norms[start:start + len(block)] = codec.encode(block)
+    codes.flush()
+    del codes, vectors
+    np.save(os.path.join(directory, CODE_SQ_NORMS_FILE), sq_norms)
+    codec.save(os.path.join(directory, CODEC_FILE))
+    if not keep_exact:
+        os.remove(os.path.join(directory, VECTORS_FILE))
+        os.remove(os.path.join(directory, SQ_NORMS_FILE))
+
+
+def write_index(
+    directory: str,
+    rows: Iterable[Tuple[str, str, dict, list]],
+    count: int,
+    dim: int,
+    dtype: str = NUMPY_DTYPE,
+    compression: str = NUMPY_COMPRESSION,
+    keep_exact: Optional[bool] = None,
+    pca_dim: int = NUMPY_PCA_DIM
+) -> str:
+    """
+    Write (id, text, metadata, vector) rows as a memory-mappable index.
+
+    Vectors go to an (count, dim) .npy matrix plus their squared norms; ids,
+    texts and JSON metadata are appended to one UTF-8 blob per column, with
+    a (3, count + 1) matrix of end offsets. The index is built in a
+    temporary directory and swapped in whole, so readers never see a
+    partial index (processes with the old files mapped keep reading them).
+
+    With a compression the vectors are also encoded by a Codec fitted on
+    them; the full vectors are kept only for re-scoring (keep_exact,
+    by default whenever RAG_NUMPY_RESCORE is set).
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+    if keep_exact is None:
+        keep_exact = compression == "none" or NUMPY_RESCORE > 0
+    tmp_dir = directory + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    vectors = np.lib.format.open_memmap(
+        os.path.join(tmp_dir, VECTORS_FILE), mode="w+", dtype=dtype, shape=(count, dim)
+    )
+    sq_norms = np.zeros(count, dtype=np.float32)
+    offsets = np.zeros((3, count + 1), dtype=np.int64)
+
+    fields = FieldIndex()
+    written = 0
+    blobs = [open(os.path.join(tmp_dir, name), "wb") for name in COLUMN_FILES]
+    try:
+        for row, (chunk_id, text, metadata, vector) in enumerate(rows):
+            fields.add(row, metadata)
+            vectors[row] = np.asarray(vector, dtype=np.float32)
+            # Norms of the stored (possibly float16) values keep distances consistent
+            stored = vectors[row].astype(np.float32)
+            sq_norms[row] = float(stored @ stored)
+            values = (chunk_id, text or "", json.dumps(metadata or {}, separators=(",", ":")))
+            for column, value in enumerate(values):
+                data = value.encode("utf-8")
+                blobs[column].write(data)
+                offsets[column, row + 1] = offsets[column, row] + len(data)
+            written = row + 1
+    finally:
+        for blob in blobs:
+            blob.close()
+
+    if written != count:
+        raise ValueError(f"expected {count} rows, got {written}")
+    vectors.flush()
+    del vectors
+    np.save(os.path.join(tmp_dir, SQ_NORMS_FILE), sq_norms)
+    np.save(os.path.join(tmp_dir, OFFSETS_FILE), offsets)
+    with open(os.path.join(tmp_dir, FIELDS_FILE), "wb") as f:
+        pickle.dump(fields, f, protocol=pickle.HIGHEST_PROTOCOL)
+    if compression != "none":
+        compress_index(tmp_dir, compression, keep_exact, pca_dim)
+    with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": INDEX_VERSION, "count": count, "dim": dim, "dtype": dtype,
+            "compression": compression, "exact": keep_exact or compression == "none"
+        }, f)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+    return directory
+
+
+def export_from_chroma(
+    db,
+    vector_db_dir: str,
+    dtype: str = NUMPY_DTYPE,
+    page_size: int = 1000,
+    compression: str = NUMPY_COMPRESSION
+) -> int:
+    """Export every chunk of a Chroma (or sharded) store to its numpy index; returns the row count"""
+    from sharded_store import iter_store, store_count
+
+    count = store_count(db)
+    if not count:
+        shutil.rmtree(index_dir(vector_db_dir), ignore_errors=True)
+        return 0
+
+    rows = iter_store(db, ["documents", "metadatas", "embeddings"], page_size)
+    first = next(rows)
+    write_index(index_dir(vector_db_dir), itertools.chain([first], rows), count, len(first[3]), dtype, compression)
+    return count
+
+
+def update_export(
+    db,
+    vector_db_dir: str,
+    removed_ids: List[str],
+    added_ids: List[str],
+    shards: Optional[List[str]] = None,
+    dtype: str = NUMPY_DTYPE,
+    compression: str = NUMPY_COMPRESSION
+) -> Optional[int]:
+    """
+    Apply one ingest run to the store's numpy index: rows of removed or
+    re-added chunks are dropped, the rest copied over in bulk, and the added
+    chunks, read by ID from the shards they were written to, appended (encoded with the existing
+    codec). Returns the row count, or None when the index has to be
+    exported whole: there is none, its settings differ, the run changes
+    more than UPDATE_MAX_FRACTION of it, or it does not match the store.
+    """
+    from sharded_store import iter_chunks, store_count
+
+    old = NumpyVectorStore.open(vector_db_dir)
+    keep_exact = compression == "none" or NUMPY_RESCORE > 0
+    if (
+        old is None or old.meta.get("dtype") != dtype or old.compression != compression
+        or old.meta.get("exact", True) != keep_exact
+        or not os.path.exists(os.path.join(old.directory, FIELDS_FILE))
+    ):
+        return None
+    count, dim = len(old), old.meta["dim"]
+    drop = set(removed_ids) | set(added_ids)
+    if len(drop) > UPDATE_MAX_FRACTION * count:
+        return None
+    keep = np.fromiter((old._string(ID, row) not in drop for row in range(count)), dtype=bool, count=count)
+    kept_rows = np.flatnonzero(keep)
+    added = list(iter_chunks(db, list(added_ids), ["documents", "metadatas", "embeddings"], shards))
+    new_count = len(kept_rows) + len(added)
+    if new_count != store_count(db):
+        return None
+    if not drop and new_count == count:
+        return count
+
+    directory = index_dir(vector_db_dir)
+    tmp_dir = directory + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    base = len(kept_rows)
+    added_vectors = np.asarray([vector for _, _, _, vector in added], dtype=np.float32).reshape(len(added), dim)
+
+    def copy_rows(source, target):
+        for start in range(0, base, SEARCH_BLOCK_ROWS):
+            rows = kept_rows[start:start + SEARCH_BLOCK_ROWS]
+            target[start:start + len(rows)] = source[rows]
+
+    matrices = []
+    if old.vectors is not None:
+        stored = added_vectors.astype(dtype).astype(np.float32)
+        matrices.append((VECTORS_FILE, SQ_NORMS_FILE, old.vectors, old.sq_norms, stored.astype(dtype), (stored * stored).sum(axis=1)))
+    if old.codec is not None:
+        codes, code_sq_norms = old.codec.encode(added_vectors)
+        matrices.append((CODES_FILE, CODE_SQ_NORMS_FILE, old.codes, old.code_sq_norms, codes, code_sq_norms))
+        old.codec.save(os.path.join(tmp_dir, CODEC_FILE))
+    for matrix_file, norms_file, matrix, norms, new_rows, new_norms in matrices:
+        target = np.lib.format.open_memmap(
+            os.path.join(tmp_dir, matrix_file), mode="w+", dtype=matrix.dtype, shape=(new_count, matrix.shape[1])
+        )
+        copy_rows(matrix, target)
+        target[base:] = new_rows
+        target.flush()
+        del target
+        target_norms = np.empty(new_count, dtype=np.float32)
+        copy_rows(norms, target_norms)
+        target_norms[base:] = new_norms
+        np.save(os.path.join(tmp_dir, norms_file), target_norms)
+
+    # String columns: runs of consecutive kept rows are copied as one slice
+    offsets = np.zeros((3, new_count + 1), dtype=np.int64)
+    runs = np.split(kept_rows, np.flatnonzero(np.diff(kept_rows) != 1) + 1)
+    for column, name in enumerate(COLUMN_FILES):
+        values = [
+            (chunk_id, text or "", json.dumps(metadata or {}, separators=(",", ":")))[column].encode("utf-8")
+            for chunk_id, text, metadata, _ in added
+        ]
+        with open(os.path.join(tmp_dir, name), "wb") as blob:
+            for run in runs:
+                if len(run):
+                    blob.write(old._columns[column][int(old.offsets[column, run[0]]):int(old.offsets[column, run[-1] + 1])])
+            for data in values:
+                blob.write(data)
+        lengths = np.concatenate([np.diff(old.offsets[column])[kept_rows], np.array([len(data) for data in values], dtype=np.int64)])
+        offsets[column, 1:] = np.cumsum(lengths)
+    np.save(os.path.join(tmp_dir, OFFSETS_FILE), offsets)
+
+    fields = old.fields
+    fields.remap(np.where(keep, np.cumsum(keep) - 1, -1))
+    for row, (_, _, metadata, _) in enumerate(added, base):
+        fields.add(row, metadata)
+    with open(os.path.join(tmp_dir, FIELDS_FILE), "wb") as f:
+        pickle.dump(fields, f, protocol=pickle.HIGHEST_PROTOCOL)
+    with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({**old.meta, "count": new_count}, f)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+    return new_count
+
+
+class NumpyVectorStore:
+    """
+    Read-only vector store over a memory-mapped numpy index.
+
+    Opening maps the files without reading them, so startup is near zero and
+    every process on the machine shares one copy through the page cache.
+    Search is an exact L2 top-k (the same ranking as Chroma's default
+    distance) computed block by block with matrix-vector products. A
+    compressed index is scanned through its codes instead, optionally
+    re-scoring the best `rescore` candidates against the full vectors.
+
+    Implements the subset of the LangChain Chroma interface the query paths
+    use: similarity_search(_by_vector) and get(ids=... / limit, offset).
+    """
+
+    def __init__(self, directory: str, embedding_function=None, rescore: int = NUMPY_RESCORE):
+        self.directory = directory
+        self.embedding_function = embedding_function
+        self.rescore = rescore
+        with open(os.path.join(directory, META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.compression = self.meta.get("compression", "none")
+        self.vectors = self.sq_norms = self.codec = None
+        if self.meta.get("exact", True):
+            self.vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+            self.sq_norms = np.load(os.path.join(directory, SQ_NORMS_FILE), mmap_mode="r")
+        if self.compression != "none":
+            self.codec = Codec.load(os.path.join(directory, CODEC_FILE))
+            self.codes = np.load(os.path.join(directory, CODES_FILE), mmap_mode="r")
+            self.code_sq_norms = np.load(os.path.join(directory, CODE_SQ_NORMS_FILE), mmap_mode="r")
+        else:
+            self.codes, self.code_sq_norms = self.vectors, self.sq_norms
+        self.offsets = np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode="r")
+        self._columns = [self._map(os.path.join(directory, name)) for name in COLUMN_FILES]
+        self._rows_by_id: Optional[Dict[str, int]] = None
+        self._fields: Optional[FieldIndex] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, vector_db_dir: str, embedding_function=None) -> Optional["NumpyVectorStore"]:
+        """The store's numpy index, or None if it has not been exported"""
+        directory = index_dir(vector_db_dir)
+        if not os.path.exists(os.path.join(directory, META_FILE)):
+            return None
+        return cls(directory, embedding_function)
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    @property
+    def scan_bytes(self) -> int:
+        """Size of the matrix read by every search"""
+        return self.codes.nbytes
+
+    @staticmethod
+    def _map(path: str):
+        with open(path, "rb") as f:
+            # mmap cannot map an empty file
+            if not os.fstat(f.fileno()).st_size:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _string(self, column: int, row: int) -> str:
+        start, end = int(self.offsets[column, row]), int(self.offsets[column, row + 1])
+        return self._columns[column][start:end].decode("utf-8")
+
+    def _document(self, row: int):
+        from langchain_core.documents import Document
+        return Document(
+            page_content=self._string(TEXT, row),
+            metadata=json.loads(self._string(METADATA, row)),
+            id=self._string(ID, row)
+        )
+
+    @property
+    def fields(self) -> FieldIndex:
+        """Row sets per value of the indexed metadata fields, loaded on first use"""
+        if self._fields is None:
+            with self._lock:
+                if self._fields is None:
+                    path = os.path.join(self.directory, FIELDS_FILE)
+                    if os.path.exists(path):
+                        with open(path, "rb") as f:
+                            self._fields = pickle.load(f)
+                    else:
+                        # Exported before filters existed
+                        self._fields = FieldIndex(())
+        return self._fields
+
+    def filter_rows(self, where: Optional[dict]) -> Optional[np.ndarray]:
+        """Sorted rows matching a where clause, or None for every row"""
+        if not where:
+            return None
+        rows, exact = self.fields.candidates(where)
+        if rows is None:
+            rows = np.arange(len(self))
+        if not exact:
+            # Conditions on unindexed fields are checked against the stored metadata
+            rows = np.array(
+                [row for row in rows if matches(json.loads(self._string(METADATA, int(row))), where)],
+                dtype=np.int64
+            )
+        return rows
+
+    def search_rows(
+        self,
+        vector: List[float],
+        k: int = 4,
+        block_rows: Optional[int] = None,
+        rescore: Optional[int] = None,
+        where: Optional[dict] = None
+    ) -> List[Tuple[int, float]]:
+        """Top-k (row, squared L2 distance) pairs, nearest first, among rows matching where"""
+        rows = self.filter_rows(where)
+        if rows is not None and not len(rows):
+            return []
+        mask = None
+        if rows is not None and len(rows) > FILTER_SCAN_FRACTION * len(self):
+            mask = np.zeros(len(self), dtype=bool)
+            mask[rows] = True
+            rows = None
+        count = len(self) if rows is None else len(rows)
+        if not count or k <= 0:
+            return []
+        if block_rows is None:
+            block_rows = SEARCH_BLOCK_ROWS if self.codes.dtype == np.float32 else CONVERTED_BLOCK_ROWS
+        query = np.asarray(vector, dtype=np.float32)
+        rescore = self.rescore if rescore is None else rescore
+        exact_rescore = self.codec is not None and self.vectors is not None and rescore > 0
+        candidates = max(k, rescore) if exact_rescore else k
+
+        if self.codec is None:
+            weights, bias, constant = query, 0.0, float(query @ query)
+        else:
+            weights, bias, constant = self.codec.query(query)
+
+        best_rows = np.empty(0, dtype=np.int64)
+        best_dist = np.empty(0, dtype=np.float32)
+        for start in range(0, count, block_rows):
+            if rows is None:
+                block_ids = np.arange(start, min(count, start + block_rows))
+                block = np.asarray(self.codes[start:start + block_rows], dtype=np.float32)
+                block_sq_norms = self.code_sq_norms[start:start + len(block)]
+            else:
+                # Filtered search only reads the matching rows
+                block_ids = rows[start:start + block_rows]
+                block = np.asarray(self.codes[block_ids], dtype=np.float32)
+                block_sq_norms = self.code_sq_norms[block_ids]
+            # |x - q|^2 = |x|^2 - 2 x.q + |q|^2
+            dist = block_sq_norms - 2.0 * (block @ weights + bias)
+            if mask is not None:
+                dist[~mask[start:start + len(dist)]] = np.inf
+            if len(dist) > candidates:
+                top = np.argpartition(dist, candidates - 1)[:candidates]
+            else:
+                top = np.arange(len(dist))
+            best_rows = np.concatenate([best_rows, block_ids[top]])
+            best_dist = np.concatenate([best_dist, dist[top]])
+            if len(best_dist) > candidates:
+                keep = np.argpartition(best_dist, candidates - 1)[:candidates]
+                best_rows, best_dist = best_rows[keep], best_dist[keep]
+
+        if mask is not None:
+            # Blocks with fewer than k matching rows contribute masked ones
+            keep = np.isfinite(best_dist)
+            best_rows, best_dist = best_rows[keep], best_dist[keep]
+
+        if exact_rescore:
+            # Sorted rows read the memory-mapped vectors front to back
+            order = np.argsort(best_rows)
+            best_rows = best_rows[order]
+            exact = np.asarray(self.vectors[best_rows], dtype=np.float32) - query
+            best_dist = (exact * exact).sum(axis=1)
+            constant = 0.0
+
+        order = np.argsort(best_dist, kind="stable")[:k]
+        return [(int(best_rows[i]), max(0.0, float(best_dist[i]) + constant)) for i in order]
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs) -> list:
+        return [(self._document(row), distance) for row, distance in self.search_rows(embedding, k, where=filter)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs) -> list:
+        return [self._document(row) for row, _ in self.search_rows(embedding, k, where=filter)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs) -> list:
+        if self.embedding_function is None:
+            raise ValueError("NumpyVectorStore needs an embedding_function to search by text")
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k, filter)
+
+    def _row_of(self, chunk_id: str) -> Optional[int]:
+        if self._rows_by_id is None:
+            with self._lock:
+                if self._rows_by_id is None:
+                    self._rows_by_id = {self._string(ID, row): row for row in range(len(self))}
+        return self._rows_by_id.get(chunk_id)
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[dict] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include=None,
+        **kwargs
+    ) -> dict:
+        """Chroma-style get by ids or by position, returning ids, documents and metadatas"""
+        if ids is not None:
+            rows = [row for row in (self._row_of(chunk_id) for chunk_id in ids) if row is not None]
+            if where:
+                rows = [row for row in rows if matches(json.loads(self._string(METADATA, row)), where)]
+        else:
+            matching = self.filter_rows(where)
+            if matching is None:
+                matching = range(len(self))
+            offset = offset or 0
+            rows = [int(row) for row in matching[offset:None if limit is None else offset + limit]]
+        return {
+            "ids": [self._string(ID, row) for row in rows],
+            "documents": [self._string(TEXT, row) for row in rows],
+            "metadatas": [json.loads(self._string(METADATA, row)) for row in rows]
+        }
@@ -0,0 +1,211 @@
+import os
+import re
+import json
+from types import SimpleNamespace
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Exported models live next to the other vector_store caches, one directory per model
+ONNX_MODEL_DIR = os.getenv("RAG_ONNX_DIR", "vector_store/onnx")
+# Set RAG_ONNX_QUANTIZED=0 to run the float32 export instead of the int8 one
+ONNX_QUANTIZED = os.getenv("RAG_ONNX_QUANTIZED", "1") != "0"
+# Minimum cosine similarity to the PyTorch vectors for an export to be accepted
+ONNX_PARITY_TOLERANCE = float(os.getenv("RAG_ONNX_PARITY_TOLERANCE", "0.98"))
+
+CONFIG_FILENAME = "embedding_config.json"
+FP32_FILENAME = "model.onnx"
+INT8_FILENAME = "model.int8.onnx"
+
+PARITY_TEXTS = [
+    "Parthenogenesis is the development of an egg without fertilisation.",
+    "Asexual reproduction produces offspring genetically identical to the parent.",
+    "The table lists each species with its habitat and average lifespan.",
+    "Gemini answers questions using the retrieved context only.",
+    "short",
+    "Binary fission, budding and fragmentation are common in lower animals. " * 8,
+]
+
+
+def onnx_model_dir(model_name: str = EMBEDDING_MODEL) -> str:
+    return os.path.join(ONNX_MODEL_DIR, re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name))
+
+
+def export_onnx(
+    model_name: str = EMBEDDING_MODEL,
+    output_dir: Optional[str] = None,
+    quantized: bool = ONNX_QUANTIZED
+) -> str:
+    """
+    Export a sentence-transformers model's encoder to ONNX, quantize its
+    weights to int8 and record the tokenizer, pooling and normalization
+    settings needed to reproduce the model's vectors without PyTorch.
+
+    The variant that will be used (int8 if quantized, else float32) must
+    pass parity_check against the original model, or the export is
+    rejected with a ValueError. Returns the output directory. Needs torch,
+    onnx and onnxruntime.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    output_dir = output_dir or onnx_model_dir(model_name)
+    os.makedirs(output_dir, exist_ok=True)
+
+    model = SentenceTransformer(model_name, device="cpu", trust_remote_code=True)
+    transformer = model[0]
+    pooling = next((module for module in model if type(module).__name__ == "Pooling"), None)
+    pooling_mode = "cls" if pooling is not None and pooling.pooling_mode_cls_token else "mean"
+    normalize = any(type(module).__name__ == "Normalize" for module in model)
+
+    tokenizer = transformer.tokenizer
+    tokenizer.save_pretrained(output_dir)
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class Encoder(torch.nn.Module):
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, *inputs):
+            return self.auto_model(**dict(zip(input_names, inputs)), return_dict=True).last_hidden_state
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    fp32_path = os.path.join(output_dir, FP32_FILENAME)
+    with torch.no_grad():
+        torch.onnx.export(
+            Encoder(transformer.auto_model.eval()),
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+    quantize_dynamic(fp32_path, os.path.join(output_dir, INT8_FILENAME), weight_type=QuantType.QInt8)
+
+    config_path = os.path.join(output_dir, CONFIG_FILENAME)
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "model_name": model_name,
+            "input_names": input_names,
+            "pooling": pooling_mode,
+            "normalize": normalize,
+            "max_seq_length": model.max_seq_length,
+            "pad_id": tokenizer.pad_token_id or 0,
+            "pad_token": tokenizer.pad_token or "[PAD]"
+        }, f, indent=2)
+
+    reference = SimpleNamespace(embed_documents=lambda texts: model.encode(texts).tolist())
+    parity = parity_check(OnnxEmbeddings(model_name, quantized=quantized, model_dir=output_dir), reference)
+    if not parity["passed"]:
+        # Without a config the directory is not picked up as a usable export
+        os.remove(config_path)
+        raise ValueError(
+            f"{'int8' if quantized else 'float32'} export of {model_name} failed parity: min cosine "
+            f"{parity['min_cosine']:.4f} < {parity['tolerance']}"
+        )
+    return output_dir
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    LangChain embeddings backed by an ONNX Runtime export of a
+    sentence-transformers model (int8-quantized by default).
+
+    Runs on onnxruntime, tokenizers and NumPy only; PyTorch is needed just
+    once, to export the model the first time it is used. Texts are sorted
+    by length before batching so padding is kept to a minimum.
+    """
+
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        normalize: bool = False,
+        batch_size: int = 32,
+        threads: int = 0,
+        quantized: bool = ONNX_QUANTIZED,
+        model_dir: Optional[str] = None
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.quantized = quantized
+        self.model_dir = model_dir or onnx_model_dir(model_name)
+        config_path = os.path.join(self.model_dir, CONFIG_FILENAME)
+        if not os.path.exists(config_path):
+            export_onnx(model_name, self.model_dir, quantized)
+        with open(config_path, "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+
+        # The model's own Normalize layer applies regardless of the flag
+        self.normalize = normalize or self.config["normalize"]
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        model_path = os.path.join(self.model_dir, INT8_FILENAME if quantized else FP32_FILENAME)
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_id"], pad_token=self.config["pad_token"])
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        arrays = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64)
+        }
+        hidden = self.session.run(None, {name: arrays[name] for name in self.config["input_names"]})[0]
+
+        if self.config["pooling"] == "cls":
+            vectors = hidden[:, 0]
+        else:
+            weights = mask[:, :, None].astype(np.float32)
+            vectors = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+
+        if self.normalize:
+            vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Same preprocessing as HuggingFaceEmbeddings
+        texts = [text.replace("\n", " ") for text in texts]
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._encode([texts[i] for i in batch])):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def parity_check(
+    onnx_embeddings: Embeddings,
+    reference: Embeddings,
+    texts: List[str] = PARITY_TEXTS,
+    tolerance: float = ONNX_PARITY_TOLERANCE
+) -> dict:
+    """Cosine similarity of ONNX vectors to the reference (PyTorch) vectors"""
+    a = np.array(onnx_embeddings.embed_documents(texts), dtype=np.float32)
+    b = np.array(reference.embed_documents(texts), dtype=np.float32)
+    cosines = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    return {
+        "texts": len(texts),
+        "min_cosine": float(cosines.min()),
+        "mean_cosine": float(cosines.mean()),
+        "tolerance": tolerance,
+        "passed": bool(cosines.min() >= tolerance)
+    }
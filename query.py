@@ -1,53 +1,232 @@
 import os
+import time
+import threading
 from dotenv import load_dotenv
 load_dotenv()
 
-import google.genai as genai
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
 from typing import List, Dict, Optional
 
+from retrieval_cache import RetrievalCache
+from answer_cache import SemanticAnswerCache, context_key, doc_id
+from bm25_index import RETRIEVAL_MODE, load_index, lexical_search, hybrid_search
+from filters import parse_query, format_where
+from context_builder import build_context, format_history, estimate_tokens
+
 VECTOR_DB_DIR = "vector_store/chroma"
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 
 # Configure Gemini with the new google.genai package
 api_key = os.getenv("GOOGLE_API_KEY")
 # Using a newer supported model
 MODEL_NAME = "gemini-2.0-flash"
+# Bump whenever the prompt in build_prompt() changes so cached answers are not reused
+PROMPT_VERSION = "ask-v2"
 
 # Conversation history for multi-turn support
 conversation_history: List[Dict[str, str]] = []
+_history_lock = threading.Lock()
 
-def ask(question: str, maintain_context: bool = True):
+
+class QueryEngine:
     """
-    Ask a question using RAG with multi-turn conversation support.
-    
-    Args:
-        question: The user's question
-        maintain_context: Whether to use conversation history for context
-    
-    Returns:
-        The LLM response
+    Long-lived holder for the embedding model, the Chroma handle and the
+    Gemini client.
+
+    Each resource (and its library: google-genai, langchain-chroma,
+    sentence-transformers) is imported and created lazily on first use and
+    then reused across questions. Initialization is guarded by a lock so one engine can be
+    shared between threads.
     """
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
-
-    db = Chroma(
-        persist_directory=VECTOR_DB_DIR,
-        embedding_function=embeddings
-    )
-
-    docs = db.similarity_search(question, k=4)
-    context = "\n\n".join([d.page_content for d in docs])
-
-    # Build conversation history string
-    history_text = ""
-    if maintain_context and conversation_history:
-        history_text = "Previous conversation:\n"
-        for exchange in conversation_history[-3:]:  # Keep last 3 exchanges for context
-            history_text += f"User: {exchange['question']}\nAssistant: {exchange['answer']}\n\n"
-
-    prompt = f"""
+
+    def __init__(
+        self,
+        persist_directory: str = VECTOR_DB_DIR,
+        embedding_model: str = EMBEDDING_MODEL,
+        model_name: str = MODEL_NAME,
+        api_key: Optional[str] = api_key,
+        retrieval_mode: str = RETRIEVAL_MODE,
+        vector_backend: Optional[str] = None
+    ):
+        self.persist_directory = persist_directory
+        self.embedding_model = embedding_model
+        self.model_name = model_name
+        self.api_key = api_key
+        self.retrieval_mode = retrieval_mode
+        # None: RAG_VECTOR_BACKEND, read when the store is first opened
+        self.vector_backend = vector_backend
+        self._lock = threading.RLock()
+        self._embeddings = None
+        self._db = None
+        self._numpy_store = None
+        self._numpy_stamp = None
+        self._client = None
+        self.cache = RetrievalCache(persist_directory)
+        self.answers = SemanticAnswerCache()
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    from embedding import create_embeddings
+                    # Honours RAG_EMBEDDING_BACKEND; questions are not disk-cached
+                    self._embeddings = create_embeddings(
+                        self.embedding_model, cache_path=None, workers=1
+                    )
+        return self._embeddings
+
+    @property
+    def db(self):
+        if self.vector_backend is None:
+            from numpy_store import VECTOR_BACKEND
+            self.vector_backend = VECTOR_BACKEND
+        if self.vector_backend == "numpy":
+            store = self._open_numpy_store()
+            if store is not None:
+                return store
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    from sharded_store import open_store
+                    # Lexical-only retrieval never needs the embedding model
+                    self._db = open_store(
+                        self.persist_directory,
+                        None if self.lexical_only else self.embeddings
+                    )
+        return self._db
+
+    def _open_numpy_store(self):
+        """The memory-mapped export of the store, reopened whenever it is re-exported"""
+        from numpy_store import NumpyVectorStore, index_stamp
+
+        stamp = index_stamp(self.persist_directory)
+        if stamp is None:
+            return None
+        with self._lock:
+            if self._numpy_store is None or self._numpy_stamp != stamp:
+                self._numpy_store = NumpyVectorStore.open(
+                    self.persist_directory,
+                    None if self.lexical_only else self.embeddings
+                )
+                self._numpy_stamp = stamp
+            return self._numpy_store
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import google.genai as genai
+                    self._client = genai.Client(api_key=self.api_key)
+        return self._client
+
+    @property
+    def lexical_only(self) -> bool:
+        return self.retrieval_mode == "lexical"
+
+    def warmup(self):
+        """Load the embedding model, open the vector store and create the LLM client"""
+        if not self.lexical_only:
+            self.embeddings.embed_query("warmup")
+        _ = self.db
+        if self.api_key:
+            _ = self.client
+
+    def close(self):
+        """Release the LLM client and the embedding model's workers or sessions, and drop cached handles"""
+        with self._lock:
+            for resource in (self._client, self._embeddings):
+                resource_close = getattr(resource, "close", None)
+                if callable(resource_close):
+                    try:
+                        resource_close()
+                    except Exception:
+                        pass
+            self._client = None
+            self._db = None
+            self._numpy_store = None
+            self._numpy_stamp = None
+            self._embeddings = None
+            self.cache.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def embed_question(self, question: str) -> List[float]:
+        """Embed a question, served from the query-vector cache when possible"""
+        return self.cache.query_vector(question, self.embeddings.embed_query)
+
+    def retrieve(
+        self,
+        question: str,
+        k: int = 4,
+        where: Optional[dict] = None,
+        vector: Optional[List[float]] = None,
+        use_cache: bool = True
+    ) -> list:
+        """
+        Return the top-k chunks for a question using the engine's retrieval
+        mode (dense, lexical or hybrid). Lexical and hybrid fall back to dense
+        search when the store has no BM25 index. A Chroma-style where clause
+        (see filters.parse_query) is pushed down to the store. Pass vector if
+        the question is already embedded. Results are cached per mode and
+        filter until the vector store's generation changes.
+        """
+        index = None if self.retrieval_mode == "dense" else load_index(self.persist_directory)
+        question_vector = lambda: vector if vector is not None else self.embed_question(question)
+
+        if index is None or not len(index):
+            search = lambda: self.db.similarity_search_by_vector(question_vector(), k=k, filter=where)
+        elif self.lexical_only:
+            search = lambda: lexical_search(self.db, index, question, k, where)
+        else:
+            search = lambda: hybrid_search(self.db, index, question, question_vector(), k, where=where)
+        if not use_cache:
+            return search()
+        return self.cache.search(question, k, search, (self.retrieval_mode, format_where(where)))
+
+    def generate(self, prompt: str):
+        """Run a single Gemini generation for a prompt"""
+        return self.client.models.generate_content(
+            model=self.model_name,
+            contents=prompt
+        )
+
+    def generate_stream(self, prompt: str):
+        """Run a streaming Gemini generation, yielding response chunks as they arrive"""
+        return self.client.models.generate_content_stream(
+            model=self.model_name,
+            contents=prompt
+        )
+
+
+_engine: Optional[QueryEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> QueryEngine:
+    """Return the process-wide query engine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = QueryEngine()
+    return _engine
+
+
+def _remember(question: str, answer: str):
+    with _history_lock:
+        conversation_history.append({
+            "question": question,
+            "answer": answer
+        })
+
+def build_prompt(context: str, question: str, history_text: str = "") -> str:
+    """Fill the RAG prompt template (see PROMPT_VERSION)"""
+    return f"""
 You are an academic assistant with access to specific documents.
 Answer ONLY using the context below and previous conversation if provided.
 If the answer is not present, say "Not found in documents".
@@ -62,98 +241,204 @@ Question:
 {question}
 """
 
+
+def _extract_text(response) -> str:
+    """Pull the answer text out of a google.genai response or stream chunk"""
+    if hasattr(response, "text") and response.text:
+        return response.text
+    # Try nested structure for genai responses
     try:
-        client = genai.Client(api_key=api_key)
-        response = client.models.generate_content(
-            model=MODEL_NAME,
-            contents=prompt
-        )
-        # Handle response from google.genai
-        if hasattr(response, "text") and response.text:
-            answer = response.text
-        else:
-            # Try nested structure for genai responses
-            try:
-                answer = response.candidates[0].content.parts[0].text
-            except (AttributeError, IndexError, TypeError):
-                answer = str(response)
-        
-        # Store in conversation history
-        if maintain_context:
-            conversation_history.append({
-                "question": question,
-                "answer": answer
-            })
+        return response.candidates[0].content.parts[0].text or ""
+    except (AttributeError, IndexError, TypeError):
+        return str(response)
+
+
+def _extractive_fallback(question: str, context: str, error: Exception) -> str:
+    """
+    Provide clear error info and a safe extractive fallback using the
+    retrieved documents so the script doesn't crash when the model is
+    unavailable (e.g. model not found / deprecated package).
+    """
+    err_summary = f"{error.__class__.__name__}: {error}"
+    # Smarter extractive fallback: return sentences from context that match
+    # important words from the question, filtering out headers/structure
+    try:
+        sentences = [s.strip() for s in context.replace('\n', ' ').split('.') if s.strip()]
+        q_words = {w.lower() for w in question.split() if len(w) > 3}
         
-        return answer
-    except Exception as e:
-        # Provide clear error info and a safe extractive fallback using the
-        # retrieved documents so the script doesn't crash when the model is
-        # unavailable (e.g. model not found / deprecated package).
-        err_summary = f"{e.__class__.__name__}: {e}"
-        # Smarter extractive fallback: return sentences from context that match
-        # important words from the question, filtering out headers/structure
-        try:
-            sentences = [s.strip() for s in context.replace('\n', ' ').split('.') if s.strip()]
-            q_words = {w.lower() for w in question.split() if len(w) > 3}
-            
-            # Common imperative verbs that indicate headers/instructions
-            imperative_verbs = {'write', 'explain', 'define', 'describe', 'discuss', 'list', 'state', 'mention', 'give', 'what', 'how', 'when', 'where', 'why'}
-            
-            # Filter: keep sentences with keywords, exclude headers and very short ones
-            matches = [
-                s for s in sentences 
-                if any(w in s.lower() for w in q_words) 
-                and len(s) > 20  # Avoid headers
-                and s.lower() != question.lower()  # Don't repeat exact question
-                and not any(s.lower().startswith(verb) for verb in imperative_verbs)  # Exclude imperative headers
-            ]
-            if matches:
-                # Remove duplicates while preserving order
-                seen = set()
-                unique_matches = []
-                for m in matches:
-                    if m not in seen:
-                        seen.add(m)
-                        unique_matches.append(m)
-                answer = "Fallback (extracted from documents): " + " ".join(unique_matches[:3])
-                if maintain_context:
-                    conversation_history.append({
-                        "question": question,
-                        "answer": answer
-                    })
-                return answer
-        except Exception:
-            pass
+        # Common imperative verbs that indicate headers/instructions
+        imperative_verbs = {'write', 'explain', 'define', 'describe', 'discuss', 'list', 'state', 'mention', 'give', 'what', 'how', 'when', 'where', 'why'}
         
-        fallback_answer = f"LLM error ({err_summary}). Fallback: Not found in documents."
+        # Filter: keep sentences with keywords, exclude headers and very short ones
+        matches = [
+            s for s in sentences 
+            if any(w in s.lower() for w in q_words) 
+            and len(s) > 20  # Avoid headers
+            and s.lower() != question.lower()  # Don't repeat exact question
+            and not any(s.lower().startswith(verb) for verb in imperative_verbs)  # Exclude imperative headers
+        ]
+        if matches:
+            # Remove duplicates while preserving order
+            seen = set()
+            unique_matches = []
+            for m in matches:
+                if m not in seen:
+                    seen.add(m)
+                    unique_matches.append(m)
+            return "Fallback (extracted from documents): " + " ".join(unique_matches[:3])
+    except Exception:
+        pass
+    
+    return f"LLM error ({err_summary}). Fallback: Not found in documents."
+
+
+class AskStats:
+    """Timing and context packing of one ask_stream call"""
+
+    def __init__(self):
+        # Seconds from the call to the first answer piece
+        self.ttft: Optional[float] = None
+        # ContextStats of the prompt (see context_builder)
+        self.context = None
+
+
+def ask_stream(
+    question: str,
+    maintain_context: bool = True,
+    stream: bool = True,
+    stats: Optional[AskStats] = None
+):
+    """
+    Ask a question using RAG, yielding the answer as it is generated.
+
+    With stream=True the answer arrives in pieces from Gemini's streaming
+    API; otherwise it is yielded once, when generation completes. Pass an
+    AskStats to get the time to the first piece and what context packing
+    saved for this call; concurrent calls each need their own.
+
+    Args:
+        question: The user's question, optionally with filter terms such as
+            `source:notes.pdf type:pptx` (see filters.parse_query)
+        maintain_context: Whether to use conversation history for context
+        stream: Whether to use streaming generation
+        stats: Filled in with this call's timing and context statistics
+
+    Yields:
+        Pieces of the LLM response
+    """
+    started = time.perf_counter()
+    if stats is None:
+        stats = AskStats()
+    engine = get_engine()
+    question, where = parse_query(question)
+    if not question:
+        yield "Please add a question after the filters."
+        return
+    docs = engine.retrieve(question, k=4, where=where)
+    context, packing = build_context(docs)
+
+    # Conversation history, newest exchanges first within its token budget
+    with _history_lock:
+        recent_history = conversation_history[-3:] if maintain_context else []
+    history_text = format_history(recent_history)
+
+    prompt = build_prompt(context, question, history_text)
+    packing.prompt_tokens = estimate_tokens(prompt)
+    packing.raw_prompt_tokens = estimate_tokens(build_prompt(
+        "\n\n".join(d.page_content for d in docs), question, format_history(recent_history, None)
+    ))
+    stats.context = packing
+
+    # Reuse an earlier answer to a near-identical question over the same chunks
+    # (skipped in lexical mode, which runs without the embedding model)
+    answer_key = context_key([doc_id(d) for d in docs], PROMPT_VERSION, history_text, engine.model_name)
+    question_vector = None if engine.lexical_only else engine.embed_question(question)
+    cached_answer = None
+    if question_vector is not None:
+        cached_answer = engine.answers.lookup(question_vector, answer_key)
+    if cached_answer is not None:
+        stats.ttft = time.perf_counter() - started
         if maintain_context:
-            conversation_history.append({
-                "question": question,
-                "answer": fallback_answer
-            })
-        return fallback_answer
+            _remember(question, cached_answer)
+        yield cached_answer
+        return
+
+    pieces = []
+    try:
+        if stream:
+            responses = engine.generate_stream(prompt)
+        else:
+            responses = [engine.generate(prompt)]
+        for response in responses:
+            # Stream chunks without text (e.g. the final usage chunk) are skipped
+            text = (getattr(response, "text", None) or "") if stream else _extract_text(response)
+            if not text:
+                continue
+            if not pieces:
+                stats.ttft = time.perf_counter() - started
+            pieces.append(text)
+            yield text
+        answer = "".join(pieces)
+        if question_vector is not None:
+            engine.answers.store(question, question_vector, answer_key, answer)
+    except Exception as e:
+        if pieces:
+            # The stream broke after some text was shown; keep what arrived
+            answer = "".join(pieces)
+            note = f"\n[Answer interrupted: {e.__class__.__name__}]"
+            answer += note
+            yield note
+        else:
+            answer = _extractive_fallback(question, context, e)
+            stats.ttft = time.perf_counter() - started
+            yield answer
+
+    # Store in conversation history
+    if maintain_context:
+        _remember(question, answer)
+
+
+def ask(question: str, maintain_context: bool = True):
+    """
+    Ask a question using RAG with multi-turn conversation support.
+    
+    Args:
+        question: The user's question, optionally with filter terms such as
+            `source:notes.pdf type:pptx` (see filters.parse_query)
+        maintain_context: Whether to use conversation history for context
+    
+    Returns:
+        The LLM response
+    """
+    return "".join(ask_stream(question, maintain_context, stream=False))
 
 
 def clear_history():
     """Clear conversation history"""
-    global conversation_history
-    conversation_history = []
+    with _history_lock:
+        conversation_history.clear()
 
 
 def get_history() -> List[Dict[str, str]]:
     """Get current conversation history"""
-    return conversation_history.copy()
+    with _history_lock:
+        return conversation_history.copy()
 
 if __name__ == "__main__":
     print("\n" + "="*60)
     print("RAG Query Assistant - Multi-turn Conversation Mode")
     print("="*60)
-    print("Type 'exit' to quit, 'clear' to clear history, 'history' to see conversation\n")
-    
+    print("Type 'exit' to quit, 'clear' to clear history, 'history' to see conversation")
+    print("Restrict a question with filters, e.g. 'source:notes.pdf type:pptx what is budding?'\n")
+
+    engine = get_engine()
+    print("Loading models...")
+    engine.warmup()
+
     while True:
         q = input("\nYou: ")
         if q.lower() == "exit":
+            engine.close()
             print("Goodbye!")
             break
         elif q.lower() == "clear":
@@ -170,6 +455,14 @@ if __name__ == "__main__":
                 print("No conversation history yet.")
             continue
         
+        _, where = parse_query(q)
+        if where:
+            print(f"\n(searching only {format_where(where)})")
         print("\nAssistant:")
-        answer = ask(q, maintain_context=True)
-        print(answer)
+        started = time.perf_counter()
+        stats = AskStats()
+        for piece in ask_stream(q, maintain_context=True, stats=stats):
+            print(piece, end="", flush=True)
+        print(f"\n\n(first token {stats.ttft or 0:.2f}s, total {time.perf_counter() - started:.2f}s)")
+        if stats.context is not None:
+            print(f"({stats.context.summary()})")
@@ -0,0 +1,271 @@
+import time
+import asyncio
+import argparse
+from itertools import cycle, islice
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from query import (
+    QueryEngine, get_engine, build_prompt, PROMPT_VERSION,
+    _extract_text, _extractive_fallback
+)
+from answer_cache import SemanticAnswerCache, context_key, doc_id
+from retrieval_cache import normalize_question
+from filters import parse_query
+from context_builder import build_context, estimate_tokens
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent embedding requests into micro-batches.
+
+    The first queued question opens a batch; it is flushed once max_batch
+    questions have arrived or max_wait seconds have passed, whichever comes
+    first, and embedded with a single embed_documents call on the executor.
+    """
+
+    def __init__(
+        self,
+        embed_documents: Callable[[List[str]], List[List[float]]],
+        executor: ThreadPoolExecutor,
+        max_batch: int = 32,
+        max_wait: float = 0.01
+    ):
+        self.embed_documents = embed_documents
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def embed(self, text: str) -> List[float]:
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _collect(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            texts = [text for text, _ in batch]
+            try:
+                vectors = await loop.run_in_executor(self.executor, self.embed_documents, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
+
+
+class AsyncQueryService:
+    """
+    asyncio entry point for answering many questions concurrently.
+
+    Question embeddings are micro-batched through an EmbeddingBatcher, while
+    vector search and LLM calls run on a thread pool so they overlap across
+    requests. The service is stateless (no conversation history). Pass llm to
+    replace Gemini, e.g. with stub_llm for local load tests; its answers are
+    then cached in memory only, never in the engine's shared answer cache.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[QueryEngine] = None,
+        llm: Optional[Callable[[str], str]] = None,
+        k: int = 4,
+        max_batch: int = 32,
+        max_wait: float = 0.01,
+        max_workers: int = 16,
+        use_cache: bool = True
+    ):
+        self.engine = engine or get_engine()
+        if llm is None:
+            self.llm = lambda prompt: _extract_text(self.engine.generate(prompt))
+            self.model = self.engine.model_name
+            self.answers = self.engine.answers
+        else:
+            self.llm = llm
+            self.model = getattr(llm, "__qualname__", type(llm).__qualname__)
+            self.answers = SemanticAnswerCache(path=None)
+        self.k = k
+        self.use_cache = use_cache
+        # Prompt tokens sent and saved by context packing, over all questions
+        self.prompt_tokens = 0
+        self.prompt_tokens_saved = 0
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.batcher = EmbeddingBatcher(
+            lambda texts: self.engine.embeddings.embed_documents(texts),
+            self.executor,
+            max_batch=max_batch,
+            max_wait=max_wait
+        )
+
+    async def _embed(self, question: str) -> List[float]:
+        if not self.use_cache:
+            return await self.batcher.embed(question)
+        key = normalize_question(question)
+        vector = self.engine.cache.vectors.get(key)
+        if vector is None:
+            vector = await self.batcher.embed(question)
+            self.engine.cache.vectors.put(key, vector)
+        return vector
+
+    def _search(self, question: str, vector: Optional[List[float]], where: Optional[dict] = None) -> list:
+        # The engine's retrieval mode, with the batched question vector
+        return self.engine.retrieve(question, self.k, where, vector=vector, use_cache=self.use_cache)
+
+    async def ask(self, question: str) -> str:
+        """Answer a single question (filter terms allowed); safe to call concurrently"""
+        loop = asyncio.get_running_loop()
+        question, where = parse_query(question)
+        if not question:
+            return "Please add a question after the filters."
+        # Lexical retrieval runs without the embedding model
+        vector = None if self.engine.lexical_only else await self._embed(question)
+        docs = await loop.run_in_executor(self.executor, self._search, question, vector, where)
+        context, stats = build_context(docs)
+        prompt = build_prompt(context, question)
+        self.prompt_tokens += estimate_tokens(prompt)
+        self.prompt_tokens_saved += stats.raw_tokens - stats.tokens
+
+        answer_key = context_key([doc_id(d) for d in docs], PROMPT_VERSION, model=self.model)
+        # The answer cache matches questions by embedding, so needs a vector
+        use_answers = self.use_cache and vector is not None
+        if use_answers:
+            cached_answer = self.answers.lookup(vector, answer_key)
+            if cached_answer is not None:
+                return cached_answer
+
+        try:
+            answer = await loop.run_in_executor(
+                self.executor, self.llm, prompt
+            )
+        except Exception as e:
+            return _extractive_fallback(question, context, e)
+
+        if use_answers:
+            await loop.run_in_executor(
+                self.executor, self.answers.store, question, vector, answer_key, answer
+            )
+        return answer
+
+    async def ask_many(self, questions: List[str]) -> List[str]:
+        """Answer questions concurrently, returning answers in input order"""
+        return await asyncio.gather(*(self.ask(q) for q in questions))
+
+    async def close(self):
+        await self.batcher.close()
+        self.executor.shutdown(wait=True)
+        if self.answers is not self.engine.answers:
+            self.answers.close()
+
+
+def stub_llm(prompt: str, latency: float = 0.2) -> str:
+    """Stand-in for Gemini that sleeps for a fixed latency and echoes the question"""
+    time.sleep(latency)
+    question = prompt.rsplit("Question:", 1)[-1].strip()
+    return f"Stub answer to: {question}"
+
+
+async def benchmark(service: AsyncQueryService, questions: List[str], concurrency: int) -> dict:
+    """Run questions through the service with bounded concurrency and report throughput"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(question: str):
+        async with semaphore:
+            started = time.perf_counter()
+            await service.ask(question)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in questions))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(questions),
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "throughput_qps": len(questions) / elapsed if elapsed else 0.0,
+        "p50_latency": latencies[len(latencies) // 2] if latencies else 0.0,
+        "p95_latency": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+        "embedding_batches": service.batcher.batches,
+        "mean_batch_size": service.batcher.mean_batch_size,
+        "mean_prompt_tokens": service.prompt_tokens / len(questions) if questions else 0.0,
+        "mean_tokens_saved": service.prompt_tokens_saved / len(questions) if questions else 0.0
+    }
+
+
+async def _main(args):
+    llm = (lambda prompt: stub_llm(prompt, args.stub_latency)) if args.stub else None
+    service = AsyncQueryService(
+        llm=llm,
+        max_batch=args.max_batch,
+        max_wait=args.max_wait,
+        use_cache=not args.no_cache
+    )
+    service.engine.warmup()
+    questions = list(islice(cycle(args.question), args.requests))
+    try:
+        stats = await benchmark(service, questions, args.concurrency)
+    finally:
+        await service.close()
+
+    print("\n" + "="*60)
+    print("Async Query Service Benchmark")
+    print("="*60)
+    for key, value in stats.items():
+        print(f"{key:>18}: {value:.3f}" if isinstance(value, float) else f"{key:>18}: {value}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the async query service")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait", type=float, default=0.01, help="Micro-batch window in seconds")
+    parser.add_argument("--stub", action="store_true", help="Use a local stub LLM instead of Gemini")
+    parser.add_argument("--stub-latency", type=float, default=0.2)
+    parser.add_argument("--no-cache", action="store_true", help="Bypass retrieval and answer caches")
+    parser.add_argument("--question", action="append", default=None)
+    args = parser.parse_args()
+    args.question = args.question or ["What is parthenogenesis?", "Explain the types of reproduction"]
+    asyncio.run(_main(args))
@@ -0,0 +1,135 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional
+
+QUERY_CACHE_SIZE = int(os.getenv("RAG_QUERY_CACHE_SIZE", "256"))
+QUERY_CACHE_TTL = float(os.getenv("RAG_QUERY_CACHE_TTL", "3600"))
+
+
+def generation_path(vector_db_dir: str) -> str:
+    """The generation counter sits next to the store, e.g. vector_store/chroma.generation"""
+    return os.path.normpath(vector_db_dir) + ".generation"
+
+
+def read_generation(vector_db_dir: str) -> int:
+    """Current generation of a vector store (0 if it was never bumped)"""
+    try:
+        with open(generation_path(vector_db_dir), "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def bump_generation(vector_db_dir: str) -> int:
+    """
+    Mark a vector store as changed. Call after ingesting, deleting or
+    resetting so every process holding a RetrievalCache drops stale results.
+    """
+    generation = read_generation(vector_db_dir) + 1
+    path = generation_path(vector_db_dir)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(str(generation))
+    os.replace(tmp_path, path)
+    return generation
+
+
+def normalize_question(question: str) -> str:
+    """Cache key form of a question: lowercased with collapsed whitespace"""
+    return " ".join(question.lower().split())
+
+
+class LRUCache:
+    """Thread-safe LRU cache with a per-entry time-to-live"""
+
+    def __init__(self, maxsize: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        """Return the cached value or None if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class RetrievalCache:
+    """
+    Caches query embeddings and top-k search results keyed on the normalized
+    question.
+
+    Search results are dropped whenever the store's generation counter moves.
+    Query vectors only depend on the embedding model, so they survive
+    generation changes.
+    """
+
+    def __init__(self, vector_db_dir: str, maxsize: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL):
+        self.vector_db_dir = vector_db_dir
+        self.vectors = LRUCache(maxsize, ttl)
+        self.results = LRUCache(maxsize, ttl)
+        self._generation: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _sync_generation(self) -> int:
+        generation = read_generation(self.vector_db_dir)
+        with self._lock:
+            if generation != self._generation:
+                self.results.clear()
+                self._generation = generation
+        return generation
+
+    def query_vector(self, question: str, embed_query: Callable[[str], List[float]]) -> List[float]:
+        """Embed a question, reusing the vector of an earlier identical question"""
+        key = normalize_question(question)
+        vector = self.vectors.get(key)
+        if vector is None:
+            vector = embed_query(question)
+            self.vectors.put(key, vector)
+        return vector
+
+    def search(self, question: str, k: int, search: Callable[[], list], scope: Hashable = None) -> list:
+        """
+        Return cached top-k results for a question, running search() on a
+        miss. scope tells apart searches of the same question under
+        different filters.
+        """
+        generation = self._sync_generation()
+        key = (generation, normalize_question(question), k, scope)
+        docs = self.results.get(key)
+        if docs is None:
+            docs = search()
+            self.results.put(key, docs)
+        return list(docs)
+
+    def clear(self):
+        self.vectors.clear()
+        self.results.clear()
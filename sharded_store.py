@@ -0,0 +1,317 @@
+import os
+import re
+import json
+import heapq
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from filters import pinned_values
+
+# "none" keeps one Chroma collection; "type" puts each source type (pdf,
+# docx, ...) in its own shard; "hash" spreads source files over
+# RAG_SHARD_COUNT shards by a hash of the file name
+SHARD_BY = os.getenv("RAG_SHARD_BY", "none")
+SHARD_COUNT = int(os.getenv("RAG_SHARD_COUNT", "8"))
+# Threads searching shards concurrently; 0 means one per shard (up to 8)
+SHARD_WORKERS = int(os.getenv("RAG_SHARD_WORKERS", "0"))
+
+SHARDS_DIRNAME = "shards"
+LAYOUT_FILE = "layout.json"
+# Metadata field each layout assigns shards by
+SHARD_FIELDS = {"type": "type", "hash": "source"}
+
+
+def shards_dir(vector_db_dir: str) -> str:
+    """Each shard is a Chroma store in its own directory under the main store"""
+    return os.path.join(vector_db_dir, SHARDS_DIRNAME)
+
+
+def shard_layout(shard_by: str = SHARD_BY, count: int = SHARD_COUNT) -> str:
+    """Identifies a layout; the store is rebuilt when it changes"""
+    if shard_by == "hash":
+        return f"hash:{count}"
+    if shard_by not in ("none", "type"):
+        raise ValueError(f"Unknown shard layout: {shard_by}")
+    return shard_by
+
+
+def stored_layout(vector_db_dir: str) -> str:
+    """Layout of the store on disk ("none" if it is not sharded)"""
+    try:
+        with open(os.path.join(shards_dir(vector_db_dir), LAYOUT_FILE), "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return "none"
+    return shard_layout(config["shard_by"], config.get("count", SHARD_COUNT))
+
+
+class ShardedStore:
+    """
+    A vector store split over several Chroma stores ("shards") by source
+    type or by a hash of the source file name.
+
+    Every chunk of a file lands in the same shard, so ingesting or deleting
+    a file only writes to that shard. Searches fan out to the shards on a
+    thread pool and the per-shard top-k lists are merged with a heap; a
+    filter on the shard field (e.g. {"type": "pdf"}) prunes the other
+    shards before any of them is searched.
+
+    Implements the subset of the LangChain Chroma interface the ingestion
+    and query paths use.
+    """
+
+    def __init__(self, vector_db_dir: str, embedding_function=None):
+        self.vector_db_dir = vector_db_dir
+        self.directory = shards_dir(vector_db_dir)
+        self.embedding_function = embedding_function
+        with open(os.path.join(self.directory, LAYOUT_FILE), "r", encoding="utf-8") as f:
+            config = json.load(f)
+        self.shard_by = config["shard_by"]
+        self.count = config.get("count", SHARD_COUNT)
+        self.field = SHARD_FIELDS[self.shard_by]
+        self._shards: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._pool = None
+
+    @classmethod
+    def create(cls, vector_db_dir: str, embedding_function=None, shard_by: str = SHARD_BY, count: int = SHARD_COUNT) -> "ShardedStore":
+        """Record the layout (replacing any previous one) and open the store"""
+        directory = shards_dir(vector_db_dir)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, LAYOUT_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"shard_by": shard_by, "count": count}, f)
+        os.replace(tmp_path, os.path.join(directory, LAYOUT_FILE))
+        return cls(vector_db_dir, embedding_function)
+
+    def shard_name(self, value) -> str:
+        """Shard holding chunks whose shard field has this value"""
+        if self.shard_by == "hash":
+            digest = hashlib.sha1(str(value).encode("utf-8")).hexdigest()
+            return f"hash-{int(digest[:8], 16) % self.count:02d}"
+        return "type-" + re.sub(r"[^A-Za-z0-9_.-]+", "_", str(value or "unknown"))
+
+    def shard_of(self, metadata: dict) -> str:
+        return self.shard_name((metadata or {}).get(self.field))
+
+    def shard_names(self) -> List[str]:
+        """Shards that exist on disk"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if os.path.isdir(os.path.join(self.directory, name))
+        )
+
+    def shards_for(self, where: Optional[dict] = None) -> List[str]:
+        """Shards that can hold chunks matching a Chroma where clause"""
+        names = self.shard_names()
+        pinned = pinned_values(where, self.field)
+        if pinned is None:
+            return names
+        wanted = {self.shard_name(value) for value in pinned}
+        return [name for name in names if name in wanted]
+
+    def shard(self, name: str):
+        """The Chroma store of one shard, created on first write"""
+        store = self._shards.get(name)
+        if store is None:
+            with self._lock:
+                store = self._shards.get(name)
+                if store is None:
+                    from langchain_chroma import Chroma
+                    store = Chroma(
+                        persist_directory=os.path.join(self.directory, name),
+                        embedding_function=self.embedding_function
+                    )
+                    self._shards[name] = store
+        return store
+
+    def _group(self, docs: list) -> Dict[str, List[int]]:
+        groups: Dict[str, List[int]] = {}
+        for i, doc in enumerate(docs):
+            groups.setdefault(self.shard_of(doc.metadata), []).append(i)
+        return groups
+
+    # -- Writes ---------------------------------------------------------------
+
+    def upsert(self, docs: list, ids: List[str], vectors: list) -> List[str]:
+        """Write chunks with precomputed vectors; returns the shards written"""
+        groups = self._group(docs)
+        for name, rows in groups.items():
+            self.shard(name)._collection.upsert(
+                ids=[ids[i] for i in rows],
+                embeddings=[vectors[i] for i in rows],
+                documents=[docs[i].page_content for i in rows],
+                metadatas=[docs[i].metadata for i in rows]
+            )
+        return sorted(groups)
+
+    def add_documents(self, documents: list, ids: Optional[List[str]] = None, **kwargs) -> List[str]:
+        added = [None] * len(documents)
+        for name, rows in self._group(documents).items():
+            shard_ids = self.shard(name).add_documents(
+                [documents[i] for i in rows],
+                ids=None if ids is None else [ids[i] for i in rows],
+                **kwargs
+            )
+            for i, chunk_id in zip(rows, shard_ids):
+                added[i] = chunk_id
+        return added
+
+    def delete(self, ids: Optional[List[str]] = None, shards: Optional[List[str]] = None, **kwargs):
+        """Delete chunks from the given shards (all shards if None)"""
+        existing = self.shard_names()
+        for name in existing if shards is None else shards:
+            # Never create a shard just to delete from it
+            if name in existing:
+                self.shard(name).delete(ids=ids, **kwargs)
+
+    # -- Reads ----------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return sum(self.shard(name)._collection.count() for name in self.shard_names())
+
+    def _map(self, fn, names: List[str]) -> list:
+        """Run fn(shard name) on every shard, concurrently when there are several"""
+        if len(names) <= 1:
+            return [fn(name) for name in names]
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=SHARD_WORKERS or min(8, len(names)),
+                        thread_name_prefix="shard-search"
+                    )
+        return list(self._pool.map(fn, names))
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs) -> list:
+        """Top-k (document, distance) pairs over the shards the filter allows"""
+        results = self._map(
+            lambda name: self.shard(name).similarity_search_by_vector_with_relevance_scores(
+                embedding, k=k, filter=filter, **kwargs
+            ),
+            self.shards_for(filter)
+        )
+        # Chroma returns distances, so the nearest k across shards are the smallest
+        return heapq.nsmallest(k, (pair for shard_results in results for pair in shard_results), key=lambda pair: pair[1])
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs) -> list:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter, **kwargs)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs) -> list:
+        if self.embedding_function is None:
+            raise ValueError("ShardedStore needs an embedding_function to search by text")
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k, filter, **kwargs)
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[dict] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Optional[List[str]] = None,
+        shards: Optional[List[str]] = None
+    ) -> dict:
+        """
+        Chroma-style get; paging with limit/offset walks the shards in name
+        order. shards limits the read to the listed shards (e.g. those a
+        file's chunks were written to).
+        """
+        include = include or ["documents", "metadatas"]
+        found = {"ids": [], **{field: [] for field in include}}
+
+        def merge(page: dict):
+            found["ids"].extend(page["ids"])
+            for field in include:
+                found[field].extend(page[field])
+
+        names = self.shards_for(where)
+        if shards is not None:
+            listed = set(shards)
+            names = [name for name in names if name in listed]
+        if ids is not None or (limit is None and not offset):
+            for page in self._map(lambda name: self.shard(name).get(ids=ids, where=where, include=include), names):
+                merge(page)
+            return found
+
+        skip, remaining = offset or 0, limit
+        for name in names:
+            if remaining is not None and remaining <= 0:
+                break
+            shard = self.shard(name)
+            size = shard._collection.count() if where is None else len(shard.get(where=where, include=[])["ids"])
+            if skip >= size:
+                skip -= size
+                continue
+            page = shard.get(where=where, limit=remaining, offset=skip, include=include)
+            merge(page)
+            skip = 0
+            if remaining is not None:
+                remaining -= len(page["ids"])
+        return found
+
+
+def open_store(vector_db_dir: str, embedding_function=None):
+    """The store as laid out on disk: a ShardedStore or a single Chroma store"""
+    if stored_layout(vector_db_dir) != "none":
+        return ShardedStore(vector_db_dir, embedding_function)
+    from langchain_chroma import Chroma
+    return Chroma(persist_directory=vector_db_dir, embedding_function=embedding_function)
+
+
+def create_store(vector_db_dir: str, embedding_function=None, shard_by: str = SHARD_BY, count: int = SHARD_COUNT):
+    """Open the store for writing with the configured layout, recording it on disk"""
+    if shard_by == "none":
+        layout_path = os.path.join(shards_dir(vector_db_dir), LAYOUT_FILE)
+        if os.path.exists(layout_path):
+            os.remove(layout_path)
+        return open_store(vector_db_dir, embedding_function)
+    shard_layout(shard_by, count)
+    return ShardedStore.create(vector_db_dir, embedding_function, shard_by, count)
+
+
+def store_count(db) -> int:
+    """Number of chunks in a ShardedStore or a Chroma store"""
+    return len(db) if isinstance(db, ShardedStore) else db._collection.count()
+
+
+def delete_chunks(db, ids: List[str], shards: Optional[List[str]] = None):
+    """Delete chunks, touching only the listed shards of a ShardedStore"""
+    if isinstance(db, ShardedStore):
+        db.delete(ids=ids, shards=shards)
+    else:
+        db.delete(ids=ids)
+
+
+def iter_chunks(db, ids: List[str], include: List[str], shards: Optional[List[str]] = None, page_size: int = 1000):
+    """
+    (chunk_id, *include fields) tuples for chunks of a store, read by ID a
+    page at a time, from the listed shards only if given
+    """
+    for start in range(0, len(ids), page_size):
+        batch = ids[start:start + page_size]
+        if isinstance(db, ShardedStore):
+            page = db.get(ids=batch, include=include, shards=shards)
+        else:
+            page = db.get(ids=batch, include=include)
+        yield from zip(page["ids"], *(page[field] for field in include))
+
+
+def iter_store(db, include: List[str], page_size: int = 1000):
+    """
+    (chunk_id, *include fields) tuples for every chunk of a store. A
+    ShardedStore is read one shard at a time, paging within each shard.
+    """
+    stores = [db.shard(name) for name in db.shard_names()] if isinstance(db, ShardedStore) else [db]
+    for store in stores:
+        offset = 0
+        while True:
+            page = store.get(limit=page_size, offset=offset, include=include)
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            yield from zip(ids, *(page[field] for field in include))
+            offset += len(ids)
@@ -0,0 +1,64 @@
+import random
+
+from bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+CHUNKS = [
+    ("a:1:0", "Hydra reproduces by budding in fresh water", {"source": "a.pdf", "page": 1}),
+    ("a:1:1", "Binary fission splits amoeba into two cells", {"source": "a.pdf", "page": 2}),
+    ("b:2:0", "Budding yeast and budding hydra compared", {"source": "b.pdf", "page": 1}),
+    ("b:2:1", "Parthenogenesis develops an egg without fertilisation", {"source": "b.pdf", "page": 2}),
+]
+
+
+def test_tokenize_drops_stopwords_and_single_characters():
+    assert tokenize("What is the Budding of a Hydra?") == ["budding", "hydra"]
+
+
+def test_search_ranks_by_bm25():
+    index = BM25Index.build(CHUNKS)
+    ranked = [chunk_id for chunk_id, _ in index.search("budding hydra", k=3)]
+    assert ranked[:2] == ["b:2:0", "a:1:0"]
+    assert index.search("photosynthesis") == []
+
+
+def test_search_within_filter_candidates():
+    index = BM25Index.build(CHUNKS)
+    allowed, exact = index.candidates({"source": "a.pdf"})
+    assert exact
+    assert [chunk_id for chunk_id, _ in index.search("budding", 4, allowed)] == ["a:1:0"]
+
+
+def test_update_matches_a_rebuild():
+    rng = random.Random(7)
+    words = "alpha beta gamma delta epsilon zeta eta theta".split()
+
+    def chunk(i):
+        text = " ".join(rng.choices(words, k=rng.randint(1, 10)))
+        return f"f{i % 5}:x:{i}", text, {"source": f"f{i % 5}", "page": i % 3}
+
+    chunks = [chunk(i) for i in range(60)]
+    removed = {chunk_id for chunk_id, _, _ in chunks if chunk_id.startswith("f2")}
+    added = [chunk(i) for i in range(60, 75)] + [(chunks[1][0], "theta theta", {"source": "f1", "page": 9})]
+
+    index = BM25Index.build(chunks)
+    index.update(removed, added)
+    rebuilt = BM25Index.build([c for c in chunks if c[0] not in removed and c[0] != chunks[1][0]] + added)
+
+    assert index.ids == rebuilt.ids
+    assert index.terms == rebuilt.terms
+    assert index.post_docs == rebuilt.post_docs and index.post_tfs == rebuilt.post_tfs
+    assert index.fields.postings == rebuilt.fields.postings
+    assert index.search("theta gamma", 5) == rebuilt.search("theta gamma", 5)
+
+
+def test_save_and_load(tmp_path):
+    index = BM25Index.build(CHUNKS)
+    path = str(tmp_path / "bm25.pkl")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert loaded.search("budding", 4) == index.search("budding", 4)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    assert reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "a"]])[0] == "b"
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+from context_builder import build_context, estimate_tokens, format_history, merge_chunks
+
+
+def doc(text, chunk_id=None, **metadata):
+    return SimpleNamespace(page_content=text, metadata={"source": "a.pdf", **metadata}, id=chunk_id)
+
+
+def test_overlapping_chunks_merge_in_document_order():
+    first = "Hydra reproduces by budding. A small bud grows on the body wall."
+    second = "A small bud grows on the body wall. It detaches as a new hydra."
+    passages = merge_chunks([doc(second, "a.pdf:h:1", page=1), doc(first, "a.pdf:h:0", page=1)])
+    assert passages == [(0, "Hydra reproduces by budding. A small bud grows on the body wall. It detaches as a new hydra.")]
+
+
+def test_adjacent_chunks_with_a_short_overlap_merge():
+    passages = merge_chunks([doc("The bud grows", "a.pdf:h:0"), doc("grows into a polyp", "a.pdf:h:1")])
+    assert passages == [(0, "The bud grows into a polyp")]
+
+
+def test_chunks_from_other_locations_stay_apart():
+    passages = merge_chunks([doc("Budding in hydra.", page=1), doc("Budding in yeast.", page=2)])
+    assert passages == [(0, "Budding in hydra."), (1, "Budding in yeast.")]
+
+
+def test_repeated_sentences_are_dropped():
+    docs = [doc("Hydra buds. Yeast buds.", page=1), doc("Yeast buds. Amoeba splits.", page=2)]
+    context, stats = build_context(docs, budget=100)
+    assert context == "Hydra buds. Yeast buds.\n\nAmoeba splits."
+    assert stats.duplicates == 1 and stats.passages == 2
+
+
+def test_budget_drops_lower_ranked_sentences():
+    docs = [doc("First passage sentence here.", page=1), doc(" ".join(f"Sentence number {i}." for i in range(20)), page=2)]
+    context, stats = build_context(docs, budget=20)
+    assert context.startswith("First passage sentence here.")
+    assert estimate_tokens(context) <= 20
+    assert stats.dropped > 0
+
+
+def test_an_over_long_first_sentence_is_cut_to_the_budget():
+    context, _ = build_context([doc("x" * 1000)], budget=10)
+    assert context == "x" * 40
+
+
+def test_history_keeps_the_newest_exchanges_within_budget():
+    exchanges = [{"question": f"question {i}", "answer": "answer " * 50} for i in range(5)]
+    history = format_history(exchanges, budget=60)
+    assert "question 4" in history and "question 0" not in history
+    assert format_history(exchanges, budget=None).count("User:") == 5
+    assert format_history([]) == ""
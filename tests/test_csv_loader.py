@@ -0,0 +1,14 @@
+from loaders.csv_loader import iter_csv_documents, load_csv_file
+
+
+def test_csv_stream_keeps_every_row_of_the_preview(tmp_path):
+    path = tmp_path / "people.csv"
+    path.write_text("name,age\n" + "".join(f"person{i},{20 + i}\n" for i in range(7)), encoding="utf-8")
+
+    eager = [line for line in load_csv_file(str(path))[0]["content"].splitlines() if line.startswith("Row ")]
+    docs = list(iter_csv_documents(str(path), chunksize=3, rows_per_doc=2))
+    streamed = [line for doc in docs for line in doc["content"].splitlines() if line.startswith("Row ")]
+
+    assert streamed == eager
+    assert [(d["metadata"]["row_start"], d["metadata"]["row_end"]) for d in docs] == [(1, 2), (3, 4), (5, 6), (7, 7)]
+    assert load_csv_file(str(path), stream=True) == list(iter_csv_documents(str(path)))
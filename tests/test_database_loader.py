@@ -0,0 +1,101 @@
+import sqlite3
+
+import pytest
+
+from loaders.database_loader import iter_database_documents, load_database_file
+
+
+def drain(generator):
+    """Documents of a streaming loader plus the generator's return value"""
+    docs = []
+    while True:
+        try:
+            docs.append(next(generator))
+        except StopIteration as stop:
+            return docs, stop.value
+
+
+def make_database(path, rows):
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS notes (id INTEGER PRIMARY KEY, body TEXT, changed INTEGER)")
+        conn.executemany("INSERT OR REPLACE INTO notes VALUES (?, ?, ?)", rows)
+
+
+def row_lines(docs, prefix=""):
+    return [line.strip() for doc in docs for line in doc["content"].splitlines() if line.startswith(prefix + "id: ") and " | " in line]
+
+
+def test_database_stream_reads_every_row_of_the_sample(tmp_path):
+    path = str(tmp_path / "notes.db")
+    make_database(path, [(i, f"note {i}", i) for i in range(1, 8)])
+
+    docs, state = drain(iter_database_documents(path, batch_size=3, changed_column=None))
+    assert row_lines(docs) == row_lines(load_database_file(path), "  ")
+    assert [d["metadata"]["rows"] for d in docs] == [3, 3, 1]
+    assert state == {
+        "tables": {"notes": {"key_column": "id", "key": 7, "changed_column": None, "changed": None}},
+        "incremental": False
+    }
+
+
+@pytest.mark.parametrize("changed_column", [None, "changed"])
+def test_database_stream_reads_only_appended_rows(tmp_path, changed_column):
+    path = str(tmp_path / "notes.db")
+    make_database(path, [(i, f"note {i}", i) for i in range(1, 5)])
+    _, state = drain(iter_database_documents(path, batch_size=2, changed_column=changed_column))
+
+    make_database(path, [(5, "note 5", 11), (6, "note 6", None)])
+    docs, state = drain(iter_database_documents(path, batch_size=2, since=state, changed_column=changed_column))
+
+    assert row_lines(docs) == ["id: 5 | body: note 5 | changed: 11", "id: 6 | body: note 6 | changed: None"]
+    assert state["incremental"]
+    assert state["tables"]["notes"]["key"] == 6
+    assert state["tables"]["notes"]["changed"] == (11 if changed_column else None)
+
+
+def test_edited_rows_make_the_database_read_whole(tmp_path):
+    path = str(tmp_path / "notes.db")
+    make_database(path, [(i, f"note {i}", i) for i in range(1, 5)])
+    _, state = drain(iter_database_documents(path, changed_column="changed"))
+
+    make_database(path, [(2, "note 2 edited", 10), (5, "note 5", 11)])
+    docs, state = drain(iter_database_documents(path, since=state, changed_column="changed"))
+
+    assert [line.split(" | ")[1] for line in row_lines(docs)] == [
+        "body: note 1", "body: note 2 edited", "body: note 3", "body: note 4", "body: note 5"
+    ]
+    assert not state["incremental"]
+
+    # Once re-read, later appends are incremental again
+    make_database(path, [(6, "note 6", 12)])
+    docs, state = drain(iter_database_documents(path, since=state, changed_column="changed"))
+    assert row_lines(docs) == ["id: 6 | body: note 6 | changed: 12"] and state["incremental"]
+
+
+def test_one_table_read_whole_rereads_every_table(tmp_path):
+    path = str(tmp_path / "notes.db")
+    make_database(path, [(1, "note 1", 1)])
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE tags (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.execute("INSERT INTO tags VALUES (1, 'biology')")
+    _, state = drain(iter_database_documents(path))
+
+    # A checkpoint from another paging column cannot be resumed
+    state["tables"]["tags"]["key_column"] = "rowid"
+    docs, state = drain(iter_database_documents(path, since=state))
+    assert sorted(row_lines(docs)) == ["id: 1 | body: note 1 | changed: 1", "id: 1 | name: biology"]
+    assert not state["incremental"]
+
+
+def test_dropped_table_makes_the_database_read_whole(tmp_path):
+    path = str(tmp_path / "notes.db")
+    make_database(path, [(1, "note 1", 1)])
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE tags (id INTEGER PRIMARY KEY, name TEXT)")
+    _, state = drain(iter_database_documents(path))
+
+    with sqlite3.connect(path) as conn:
+        conn.execute("DROP TABLE tags")
+    docs, state = drain(iter_database_documents(path, since=state))
+    assert row_lines(docs) == ["id: 1 | body: note 1 | changed: 1"]
+    assert not state["incremental"]
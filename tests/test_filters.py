@@ -0,0 +1,66 @@
+import numpy as np
+
+from filters import FieldIndex, format_where, matches, parse_query, pinned_values
+
+
+def test_parse_query_splits_off_filter_terms():
+    question, where = parse_query('type:pdf source:"annual report.pdf" what is budding?')
+    assert question == "what is budding?"
+    assert where == {"$and": [{"type": "pdf"}, {"source": "annual report.pdf"}]}
+
+
+def test_repeated_field_matches_any_value():
+    question, where = parse_query("type:pdf type:docx page:3 budding")
+    assert question == "budding"
+    assert where == {"$and": [{"type": {"$in": ["pdf", "docx"]}}, {"page": 3}]}
+
+
+def test_terms_of_the_wrong_type_stay_in_the_question():
+    question, where = parse_query("page:three budding")
+    assert question == "page:three budding"
+    assert where is None
+
+
+def test_format_where_round_trips():
+    text = 'source:"annual report.pdf" type:pdf type:docx'
+    _, where = parse_query(text + " question")
+    assert parse_query(format_where(where) + " question")[1] == where
+
+
+def test_matches_and_pinned_values():
+    where = {"$and": [{"type": {"$in": ["pdf", "docx"]}}, {"page": 3}]}
+    assert matches({"type": "pdf", "page": 3}, where)
+    assert not matches({"type": "pdf", "page": 4}, where)
+    assert pinned_values(where, "type") == {"pdf", "docx"}
+    assert pinned_values({"$or": [{"type": "pdf"}, {"page": 1}]}, "type") is None
+
+
+def field_index(metadatas):
+    index = FieldIndex(("source", "page"))
+    for position, metadata in enumerate(metadatas):
+        index.add(position, metadata)
+    return index
+
+
+def test_candidates_intersect_indexed_fields():
+    index = field_index([
+        {"source": "a", "page": 1}, {"source": "b", "page": 1}, {"source": "a", "page": 2}, {"source": "a"}
+    ])
+    positions, exact = index.candidates({"$and": [{"source": "a"}, {"page": {"$in": [1, 2]}}]})
+    assert positions.tolist() == [0, 2]
+    assert exact
+
+
+def test_candidates_on_unindexed_fields_are_not_exact():
+    index = field_index([{"source": "a", "type": "pdf"}, {"source": "b", "type": "pdf"}])
+    positions, exact = index.candidates({"$and": [{"source": "a"}, {"type": "pdf"}]})
+    assert positions.tolist() == [0]
+    assert not exact
+    assert index.candidates({"type": "pdf"}) == (None, False)
+
+
+def test_remap_drops_and_renumbers_positions():
+    index = field_index([{"source": "a"}, {"source": "b"}, {"source": "a"}, {"source": "b"}])
+    index.remap(np.array([-1, 0, 1, -1]))
+    assert index.candidates({"source": "a"})[0].tolist() == [1]
+    assert index.candidates({"source": "b"})[0].tolist() == [0]
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+import ingest
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+def entry(path, **changes):
+    stat = os.stat(path)
+    values = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": ingest.file_hash(str(path)), "chunk_ids": []}
+    values.update(changes)
+    return values
+
+
+def test_unchanged_files_are_skipped(data_dir):
+    path = data_dir / "a.txt"
+    path.write_text("budding", encoding="utf-8")
+    manifest = {"files": {"a.txt": entry(path)}}
+    assert ingest.plan_changes(manifest, ["a.txt"]) == ([], [], {})
+
+
+def test_new_and_edited_files_are_ingested(data_dir):
+    (data_dir / "a.txt").write_text("budding", encoding="utf-8")
+    (data_dir / "b.txt").write_text("fission", encoding="utf-8")
+    manifest = {"files": {"a.txt": entry(data_dir / "a.txt", size=1, sha256="old")}}
+
+    to_ingest, removed, touched = ingest.plan_changes(manifest, ["a.txt", "b.txt"])
+    assert [(file, digest) for file, _, digest in to_ingest] == [
+        ("a.txt", ingest.file_hash(str(data_dir / "a.txt"))),
+        ("b.txt", ingest.file_hash(str(data_dir / "b.txt"))),
+    ]
+    assert removed == [] and touched == {}
+
+
+def test_touched_files_are_not_reingested(data_dir):
+    path = data_dir / "a.txt"
+    path.write_text("budding", encoding="utf-8")
+    manifest = {"files": {"a.txt": entry(path, mtime=0.0)}}
+
+    to_ingest, removed, touched = ingest.plan_changes(manifest, ["a.txt"])
+    assert to_ingest == [] and removed == []
+    assert touched["a.txt"].st_mtime == os.stat(path).st_mtime
+
+
+def test_missing_files_are_removed(data_dir):
+    path = data_dir / "a.txt"
+    path.write_text("budding", encoding="utf-8")
+    manifest = {"files": {"a.txt": entry(path), "gone.pdf": entry(path)}}
+    assert ingest.plan_changes(manifest, ["a.txt"]) == ([], ["gone.pdf"], {})
+
+
+def test_only_files_with_a_loader_are_listed(data_dir):
+    for name in ("notes.TXT", "report.pdf", "image.png", "backup.pdf.bak"):
+        (data_dir / name).write_bytes(b"x")
+    (data_dir / "nested.txt").mkdir()
+    assert ingest.list_data_files() == ["notes.TXT", "report.pdf"]
@@ -0,0 +1,55 @@
+import io
+import json
+import random
+
+import pytest
+
+from loaders.json_loader import JSON_READ_SIZE, _JSONStream, iter_json_documents, load_json_file
+
+
+def test_json_stream_matches_eager_for_a_plain_object(tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps({"title": "x", "meta": {"a": 1, "tags": ["p", "q"]}}), encoding="utf-8")
+    docs = list(iter_json_documents(str(path)))
+    assert [doc["content"] for doc in docs] == [load_json_file(str(path))[0]["content"]]
+
+
+def test_json_stream_splits_arrays_into_records(tmp_path):
+    path = tmp_path / "dump.json"
+    path.write_text(json.dumps({"title": "x", "data": [{"n": 1}, {"n": 2}], "more": [3]}), encoding="utf-8")
+    docs = list(iter_json_documents(str(path)))
+    assert [(d["metadata"]["pointer"], d["content"]) for d in docs] == [
+        ("", "title: x"), ("/data/0", "n: 1"), ("/data/1", "n: 2"), ("/more/0", "more[0]: 3")
+    ]
+    eager = load_json_file(str(path))[0]["content"]
+    assert "data[1].n: 2" in eager and "more:\n[0]: 3" in eager
+
+
+def test_json_lines_load_through_the_stream(tmp_path):
+    path = tmp_path / "events.jsonl"
+    path.write_text('{"n": 1}\n\n{"n": 2}\n', encoding="utf-8")
+    assert load_json_file(str(path)) == list(iter_json_documents(str(path)))
+    assert [d["content"] for d in load_json_file(str(path))] == ["n: 1", "n: 2"]
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 3, 5, 7, 64])
+def test_numbers_cut_by_a_read_are_decoded_whole(read_size):
+    text = '{"a": [1.5e3, 2, -0.25, 123, true, null, false, 1E-2], "b": 12.75}'
+    stream = _JSONStream(io.StringIO(text), read_size=read_size)
+    assert list(stream.iter_object("")) == [
+        ("/a/0", 1500.0), ("/a/1", 2), ("/a/2", -0.25), ("/a/3", 123),
+        ("/a/4", True), ("/a/5", None), ("/a/6", False), ("/a/7", 0.01), ("", {"b": 12.75})
+    ]
+
+
+def test_large_numeric_array_streams_across_reads(tmp_path):
+    rng = random.Random(3)
+    readings = [round(rng.uniform(-1000, 1000), 3) for _ in range(20000)]
+    path = tmp_path / "readings.json"
+    path.write_text(json.dumps({"title": "sensor", "readings": readings}), encoding="utf-8")
+    assert path.stat().st_size > 2 * JSON_READ_SIZE
+
+    docs = list(iter_json_documents(str(path)))
+    values = [float(doc["content"].split(": ")[1]) for doc in docs[1:]]
+    assert docs[0]["content"] == "title: sensor"
+    assert values == readings
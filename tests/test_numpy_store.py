@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from numpy_store import NumpyVectorStore, index_dir, update_export, write_index
+
+DIM = 16
+
+
+def make_rows(count, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, DIM)).astype(np.float32)
+    return [
+        (f"doc{i % 4}:h:{i}", f"text {i}", {"source": f"doc{i % 4}", "page": i % 3}, vectors[i])
+        for i in range(count)
+    ]
+
+
+def write(tmp_path, rows, **kwargs):
+    directory = index_dir(str(tmp_path))
+    write_index(directory, iter(rows), len(rows), DIM, **kwargs)
+    return NumpyVectorStore(directory)
+
+
+def brute_force(rows, query, k, keep=lambda metadata: True):
+    distances = [
+        (float(((vector - query) ** 2).sum()), chunk_id)
+        for chunk_id, _, metadata, vector in rows if keep(metadata)
+    ]
+    return [chunk_id for _, chunk_id in sorted(distances)[:k]]
+
+
+def ids_of(store, found):
+    return [store._string(0, row) for row, _ in found]
+
+
+def test_exact_search_matches_brute_force(tmp_path):
+    rows = make_rows(300)
+    store = write(tmp_path, rows)
+    query = np.random.default_rng(1).normal(size=DIM).astype(np.float32)
+    assert ids_of(store, store.search_rows(query.tolist(), k=5, block_rows=64)) == brute_force(rows, query, 5)
+
+
+def test_filtered_search_only_returns_matching_rows(tmp_path):
+    rows = make_rows(300)
+    store = write(tmp_path, rows)
+    query = np.random.default_rng(2).normal(size=DIM).astype(np.float32)
+    where = {"$and": [{"source": "doc1"}, {"page": 2}]}
+    expected = brute_force(rows, query, 5, lambda m: m["source"] == "doc1" and m["page"] == 2)
+    assert ids_of(store, store.search_rows(query.tolist(), k=5, where=where)) == expected
+
+
+@pytest.mark.parametrize("compression", ["int8", "pca", "pca-int8"])
+def test_compressed_search_rescored_finds_the_nearest(tmp_path, compression):
+    rows = make_rows(300)
+    store = write(tmp_path, rows, compression=compression, keep_exact=True, pca_dim=8)
+    assert store.codec is not None and store.vectors is not None
+    query = rows[17][3] + 0.01
+    found = ids_of(store, store.search_rows(query.tolist(), k=3, rescore=50))
+    assert found[0] == rows[17][0]
+
+
+class FakeCollection:
+    def __init__(self, store):
+        self.store = store
+
+    def count(self):
+        return len(self.store.rows)
+
+
+class FakeStore:
+    """In-memory stand-in for the Chroma get() calls update_export makes"""
+
+    def __init__(self, rows):
+        self.rows = {chunk_id: (text, metadata, vector) for chunk_id, text, metadata, vector in rows}
+        self._collection = FakeCollection(self)
+
+    def get(self, ids, include):
+        found = [chunk_id for chunk_id in ids if chunk_id in self.rows]
+        fields = {"documents": 0, "metadatas": 1, "embeddings": 2}
+        return {"ids": found, **{name: [self.rows[i][fields[name]] for i in found] for name in include}}
+
+
+@pytest.mark.parametrize("compression", ["none", "int8"])
+def test_update_export_matches_a_full_export(tmp_path, compression):
+    rows = make_rows(100)
+    write(tmp_path, rows, compression=compression)
+    removed = [chunk_id for chunk_id, _, _, _ in rows if chunk_id.startswith("doc2")]
+    added = make_rows(110, seed=3)[100:]
+    remaining = [row for row in rows if row[0] not in removed] + added
+
+    count = update_export(FakeStore(remaining), str(tmp_path), removed, [row[0] for row in added], compression=compression)
+    assert count == len(remaining)
+
+    store = NumpyVectorStore(index_dir(str(tmp_path)))
+    assert [store._string(0, row) for row in range(len(store))] == [row[0] for row in remaining]
+    expected = [position for position, row in enumerate(remaining) if row[2]["source"] == "doc2"]
+    assert store.filter_rows({"source": "doc2"}).tolist() == expected
+    if compression == "none":
+        query = added[4][3]
+        assert ids_of(store, store.search_rows(query.tolist(), k=3)) == brute_force(remaining, query, 3)
+
+
+def test_update_export_defers_to_a_full_export_when_settings_change(tmp_path):
+    rows = make_rows(20)
+    write(tmp_path, rows)
+    assert update_export(FakeStore(rows), str(tmp_path), [], [], dtype="float16") is None
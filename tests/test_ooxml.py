@@ -0,0 +1,41 @@
+import pytest
+
+
+def test_docx_fast_path_matches_python_docx(tmp_path):
+    docx = pytest.importorskip("docx")
+    from loaders.docx_loader import load_docx_file
+
+    document = docx.Document()
+    document.add_heading("Budding", level=1)
+    paragraph = document.add_paragraph("Hydra ")
+    paragraph.add_run("reproduces").bold = True
+    paragraph.add_run(" by budding.")
+    table = document.add_table(rows=2, cols=2)
+    for r, row in enumerate(table.rows):
+        for c, cell in enumerate(row.cells):
+            cell.text = f"r{r}c{c}"
+    path = str(tmp_path / "notes.docx")
+    document.save(path)
+
+    assert load_docx_file(path, fast=True) == load_docx_file(path, fast=False)
+
+
+def test_pptx_fast_path_matches_python_pptx(tmp_path):
+    pptx = pytest.importorskip("pptx")
+    from pptx.util import Inches
+    from loaders.pptx_loader import load_pptx_file
+
+    presentation = pptx.Presentation()
+    slide = presentation.slides.add_slide(presentation.slide_layouts[5])
+    slide.shapes.title.text = "Budding"
+    slide.shapes.add_textbox(Inches(1), Inches(2), Inches(4), Inches(1)).text_frame.text = "Hydra buds"
+    table = slide.shapes.add_table(2, 2, Inches(1), Inches(3), Inches(4), Inches(1)).table
+    table.cell(0, 0).text, table.cell(1, 1).text = "kind", "yeast"
+    presentation.slides.add_slide(presentation.slide_layouts[6])
+    presentation.slides.add_slide(presentation.slide_layouts[5]).shapes.title.text = "Fission"
+    path = str(tmp_path / "notes.pptx")
+    presentation.save(path)
+
+    docs = load_pptx_file(path, fast=True)
+    assert docs == load_pptx_file(path, fast=False)
+    assert any("yeast" in doc["content"] for doc in docs)
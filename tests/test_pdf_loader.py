@@ -0,0 +1,25 @@
+import pytest
+
+from loaders import pdf_loader
+
+
+@pytest.fixture
+def in_worker(monkeypatch):
+    monkeypatch.setattr(pdf_loader.multiprocessing, "parent_process", lambda: object())
+    return monkeypatch
+
+
+def test_page_workers_in_the_main_process(monkeypatch):
+    monkeypatch.setenv(pdf_loader.PDF_NESTED_PAGE_WORKERS_ENV, "2")
+    assert pdf_loader._page_workers(6) == 6
+
+
+def test_worker_processes_extract_serially_by_default(in_worker):
+    in_worker.delenv(pdf_loader.PDF_NESTED_PAGE_WORKERS_ENV, raising=False)
+    assert pdf_loader._page_workers(6) == 1
+
+
+def test_worker_processes_use_their_granted_share(in_worker):
+    in_worker.setenv(pdf_loader.PDF_NESTED_PAGE_WORKERS_ENV, "4")
+    assert pdf_loader._page_workers(6) == 4
+    assert pdf_loader._page_workers(2) == 2
@@ -0,0 +1,41 @@
+import pytest
+
+from loaders import registry
+
+
+@pytest.fixture(autouse=True)
+def isolated_registry(monkeypatch):
+    monkeypatch.setattr(registry, "_loaders", dict(registry._loaders))
+    monkeypatch.setattr(registry, "_mime_types", dict(registry._mime_types))
+    monkeypatch.setattr(registry, "_streaming_loaders", dict(registry._streaming_loaders))
+    monkeypatch.setattr(registry, "STREAMING_LOADERS_ENABLED", True)
+
+
+def custom_loader(path):
+    return {"content": "custom", "metadata": {"source": path}}
+
+
+def test_built_in_extensions_stream_by_default():
+    assert registry.get_streaming_loader("data/rows.CSV").__name__ == "iter_csv_documents"
+
+
+def test_registered_loader_replaces_the_built_in_stream(tmp_path):
+    registry.register_loader(".csv", custom_loader)
+    path = tmp_path / "rows.csv"
+    path.write_text("a\n1\n", encoding="utf-8")
+
+    assert registry.get_streaming_loader(str(path)) is None
+    assert registry.stream_file(str(path)) is None
+    assert registry.load_file(str(path)) == [{"content": "custom", "metadata": {"source": str(path)}}]
+    assert registry.get_streaming_loader("rows.json") is not None
+
+
+def test_registered_streaming_loader_is_kept():
+    registry.register_streaming_loader("csv", custom_loader)
+    registry.register_loader(".csv", custom_loader)
+    assert registry.get_streaming_loader("rows.csv") is custom_loader
+
+
+def test_re_registering_the_built_in_keeps_streaming():
+    registry.register_loader(".csv", registry._BUILTIN_LOADERS[".csv"])
+    assert registry.get_streaming_loader("rows.csv") is not None
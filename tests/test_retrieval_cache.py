@@ -0,0 +1,55 @@
+from retrieval_cache import RetrievalCache, bump_generation, read_generation
+
+
+def counting_search(results):
+    calls = []
+
+    def search():
+        calls.append(1)
+        return results
+    return search, calls
+
+
+def test_results_are_reused_for_the_same_question(tmp_path):
+    cache = RetrievalCache(str(tmp_path / "store"))
+    search, calls = counting_search(["doc"])
+    assert cache.search("What is budding?", 4, search) == ["doc"]
+    assert cache.search("  what is   BUDDING? ", 4, search) == ["doc"]
+    assert len(calls) == 1
+
+
+def test_k_and_scope_are_part_of_the_key(tmp_path):
+    cache = RetrievalCache(str(tmp_path / "store"))
+    search, calls = counting_search(["doc"])
+    cache.search("budding", 4, search)
+    cache.search("budding", 8, search)
+    cache.search("budding", 4, search, scope="type:pdf")
+    assert len(calls) == 3
+
+
+def test_bumping_the_generation_drops_results_but_not_vectors(tmp_path):
+    store = str(tmp_path / "store")
+    cache = RetrievalCache(store)
+    search, calls = counting_search(["doc"])
+    embeds = []
+    cache.search("budding", 4, search)
+    cache.query_vector("budding", lambda q: embeds.append(q) or [1.0])
+
+    assert read_generation(store) == 0
+    assert bump_generation(store) == 1
+    assert read_generation(store) == 1
+
+    cache.search("budding", 4, search)
+    assert cache.query_vector("budding", lambda q: embeds.append(q) or [2.0]) == [1.0]
+    assert len(calls) == 2 and len(embeds) == 1
+
+
+def test_other_processes_see_the_bump(tmp_path):
+    store = str(tmp_path / "store")
+    first, second = RetrievalCache(store), RetrievalCache(store)
+    search, calls = counting_search(["doc"])
+    first.search("budding", 4, search)
+    second.search("budding", 4, search)
+    bump_generation(store)
+    first.search("budding", 4, search)
+    assert len(calls) == 3
@@ -0,0 +1,50 @@
+from loaders.xml_loader import iter_xml_documents, load_xml_file
+
+
+def write(tmp_path, text):
+    path = tmp_path / "doc.xml"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_records_are_children_of_the_root(tmp_path):
+    path = write(tmp_path, "<export><item id='1'>one</item><item id='2'>two</item></export>")
+    docs = list(iter_xml_documents(path))
+    assert [d["metadata"]["xpath"] for d in docs] == ["/export[1]/item[1]", "/export[1]/item[2]"]
+    assert 'id="2"' in docs[1]["content"] and "two" in docs[1]["content"]
+
+
+def test_root_only_file_becomes_one_document(tmp_path):
+    path = write(tmp_path, "<note lang='en'>Remember the budding notes</note>")
+    docs = list(iter_xml_documents(path))
+    assert len(docs) == 1
+    assert 'lang="en"' in docs[0]["content"]
+    assert "Remember the budding notes" in docs[0]["content"]
+    assert docs[0]["content"] == load_xml_file(path)[0]["content"]
+
+
+def test_unmatched_record_tag_falls_back_to_the_root(tmp_path):
+    path = write(tmp_path, "<export version='2'>intro<item>one</item><item>two</item></export>")
+    docs = list(iter_xml_documents(path, record_tag="record"))
+    assert len(docs) == 1
+    assert docs[0]["content"] == load_xml_file(path)[0]["content"]
+    assert 'version="2"' in docs[0]["content"] and "two" in docs[0]["content"]
+
+
+def test_elements_before_the_first_record_are_not_kept(tmp_path):
+    path = write(
+        tmp_path,
+        "<export><header>h</header><rows><record>a</record><record>b</record></rows></export>"
+    )
+    docs = list(iter_xml_documents(path, record_tag="record"))
+    assert [d["content"] for d in docs] == ["<record>\n  a\n</record>", "<record>\n  b\n</record>"]
+
+
+def test_streamed_records_cover_the_eager_document(tmp_path):
+    path = write(tmp_path, "<export><item id='1'>one</item><item id='2'><name>two</name></item></export>")
+    eager = load_xml_file(path)[0]["content"]
+    docs = list(iter_xml_documents(path))
+    assert len(docs) == 2
+    for doc in docs:
+        for line in doc["content"].splitlines():
+            assert line.strip() in eager